@@ -8,17 +8,157 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # 数据存储目录
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 RESUMES_DIR = os.path.join(DATA_DIR, 'resumes')
+RESUME_BLOBS_DIR = os.path.join(RESUMES_DIR, 'blobs')  # 按内容哈希存放的简历文件
 INTERVIEWS_DIR = os.path.join(DATA_DIR, 'interviews')
+PROFILES_DIR = os.path.join(DATA_DIR, 'profiles')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+RESUME_CATALOG_PATH = os.path.join(DATA_DIR, 'resume_catalog.json')
 
 # 确保数据目录存在
 os.makedirs(RESUMES_DIR, exist_ok=True)
+os.makedirs(RESUME_BLOBS_DIR, exist_ok=True)
 os.makedirs(INTERVIEWS_DIR, exist_ok=True)
+os.makedirs(PROFILES_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
 
 # LLM模型配置
 LLM_CONFIG = {
     'api_key': os.environ.get('ARK_API_KEY', 'bbbb2dd9-de42-416b-9fb4-59ad0f45dc94'),
     'model': 'doubao-seed-1-6-thinking-250715',
-    'timeout': 1800,  # 30分钟超时时间
+    'connect_timeout': 10,  # 建立连接超时时间（秒）
+    'timeout': 300,  # 默认读取超时时间（秒），各任务见LLM_TASK_TIMEOUTS
+    'max_concurrency': 4,  # 异步调用时的最大并发请求数
+}
+
+# 各类任务的读取超时时间（秒）；流式请求针对相邻两段输出之间的间隔
+LLM_TASK_TIMEOUTS = {
+    'default': 300,
+    'chat': 120,
+    'extract': 180,
+    'analyze': 300,
+    'predict': 300,
+    'summary': 600,
+}
+
+# 模型调用重试配置（指数退避 + 随机抖动，仅针对超时、连接失败、限流和服务端错误）
+LLM_RETRY_CONFIG = {
+    'max_retries': 3,  # 最大重试次数
+    'base_delay': 1.0,  # 首次重试的退避上限（秒）
+    'max_delay': 20.0,  # 单次退避的最大等待时间（秒）
+}
+
+# 熔断器配置：连续失败达到阈值后快速失败，冷却后放行试探请求
+LLM_BREAKER_CONFIG = {
+    'failure_threshold': 5,  # 连续失败多少次后熔断
+    'recovery_timeout': 60,  # 熔断持续时间（秒）
+}
+
+# 模型调用限流配置（令牌桶，进程内共享，同步和异步调用共用）
+LLM_RATE_LIMIT_CONFIG = {
+    'requests_per_minute': None,  # 每分钟最多发起的请求数，None表示不限流
+    'burst': 5,  # 允许的突发请求数
+}
+
+# 模型请求优先级调度配置：各优先级独立排队，按权重分配并发名额
+# 仅在单个进程内生效，不协调GUI、命令行和worker等多个进程之间的请求
+LLM_SCHEDULER_CONFIG = {
+    'max_concurrency': 8,  # 同时进行中的模型请求总数
+    'classes': {
+        'interactive': {'weight': 8, 'max_concurrency': 8},  # 用户正在等待的请求：对话、回答分析
+        'normal': {'weight': 3, 'max_concurrency': 6},  # 默认优先级
+        'bulk': {'weight': 1, 'max_concurrency': 3},  # 批量总结、后台任务、批量导入，始终为其他请求留出名额
+    },
+    'stats_window': 200,  # 统计等待时间时保留的最近请求数
+}
+
+# 提示的token预算：按优先级装入内容，超出预算的内容截断或舍弃（token数为本地估算值）
+PROMPT_BUDGET_CONFIG = {
+    'budgets': {
+        'default': 8000,
+        'chat': 8000,
+        'extract': 12000,
+        'analyze': 4000,
+        'predict': 3000,
+        'summary': 12000,
+    },
+    'min_part_tokens': 50,  # 截断后剩余不足该值的内容直接舍弃
+    'max_prompt_tokens': 60000,  # 任何提示预计超过该值时拒绝发送
+}
+
+# 面试总结配置
+SUMMARY_CONFIG = {
+    # incremental：每个问答单独生成摘要并保存，再次总结时只处理新增或修改过的问答；
+    # auto：面试内容超过chunk_tokens时分段并发总结再合并；single：始终一次总结全部内容
+    'mode': 'incremental',
+    'chunk_tokens': 3000,  # 分段总结时每段面试内容的token预算
+    'batch_workers': 4,  # 批量总结时同时处理的面试数
+}
+
+# 方舟客户端连接池配置（进程内共享，长连接复用）
+LLM_POOL_CONFIG = {
+    'max_connections': 20,  # 最大并发连接数
+    'max_keepalive_connections': 10,  # 最大保持的空闲长连接数
+    'keepalive_expiry': 60,  # 空闲长连接保持时间（秒）
+}
+
+# 模型响应缓存配置（SQLite磁盘缓存，CLI与GUI进程共享）
+LLM_CACHE_CONFIG = {
+    'enabled': True,
+    'path': os.path.join(CACHE_DIR, 'llm_cache.sqlite3'),
+    'max_entries': 2000,  # 最大缓存条数
+    'max_bytes': 50 * 1024 * 1024,  # 缓存内容最大总大小（字节）
+    'ttl': 7 * 24 * 3600,  # 过期时间（秒），None表示永不过期
+    'access_flush_interval': 30,  # 访问时间和命中统计先在内存中累积，最长间隔多少秒批量写入数据库
+}
+
+# 文件解析结果缓存配置（压缩后存放在磁盘上，前面加一层进程内LRU）
+PARSE_CACHE_CONFIG = {
+    'enabled': True,
+    'dir': os.path.join(CACHE_DIR, 'parsed'),
+    'memory_entries': 32,  # 进程内保留的解析结果条数
+    'max_entries': 1000,  # 磁盘上保留的最大条数，超出时按最近访问时间淘汰
+}
+
+# PDF解析配置：页数较多时按页码区间分给多个进程并行提取
+PDF_PARSE_CONFIG = {
+    'strategy': 'adaptive',  # adaptive：先用PyPDF2快速提取，质量差的页面再用pdfplumber；pdfplumber：全部使用pdfplumber
+    'min_page_chars': 1,  # 非空白字符少于该值的页面视为空白页
+    'max_garbled_ratio': 0.3,  # 乱码字符占比超过该值的页面需要重新提取
+    'parallel': True,
+    'parallel_min_pages': 8,  # 页数低于该值时单进程提取
+    'max_workers': None,  # 最大进程数，None表示使用CPU核数
+    'time_budget': 60,  # 并行提取的时间预算（秒），超时后返回已完成的页面
+}
+
+# 简历批量导入配置
+INGEST_CONFIG = {
+    'manifest_dir': os.path.join(DATA_DIR, 'ingest'),  # 检查点清单目录
+    'parse_workers': None,  # 解析进程数，None表示使用CPU核数
+    'extract_concurrency': 4,  # 同时进行信息提取的简历数
+}
+
+# 后台任务队列配置（SQLite，CLI、GUI和worker进程共享）
+JOB_QUEUE_CONFIG = {
+    'path': os.path.join(DATA_DIR, 'jobs.sqlite3'),
+    'workers': 2,  # worker进程中的执行线程数
+    'max_attempts': 3,  # 最大尝试次数（含第一次）
+    'retry_delay': 30,  # 首次重试前的等待时间（秒），之后按指数增长
+    'lease_seconds': 900,  # 任务租约时间（秒），worker执行期间定期续租，进程退出后过期由其他worker接手
+    'poll_interval': 2,  # 队列为空时的查询间隔（秒）
+}
+
+
+# 简历信息提取配置
+RESUME_EXTRACTION_CONFIG = {
+    'mode': 'structured',  # structured：一次调用提取全部字段；per_field：每个字段单独调用
+    'local_fields': True,  # 姓名（有标注时）、联系方式、邮箱先用规则在本地提取，找到的字段不再请求模型
+    'sections': True,  # 按“教育背景”“工作经历”等标题分段，每个字段只把相关段落发送给模型
+}
+
+# 结构化（JSON）提取配置
+STRUCTURED_EXTRACTION_CONFIG = {
+    'max_reask': 1,  # 缺失字段的最大重新询问次数
+    'missing_value': '未提及',  # 要求模型在文本中没有相关信息时填写的值
 }
 
 # 文件格式配置
@@ -8,6 +8,7 @@ from datetime import datetime
 from main import InterviewAssistant
 from config import LLM_CONFIG, SUPPORTED_RESUME_FORMATS
 from services.llm_service import LLMService
+from services.resilience import PriorityScheduler
 
 class InterviewAssistantGUI:
     """个人面试助手GUI界面"""
@@ -20,7 +21,7 @@ class InterviewAssistantGUI:
         
         # 初始化面试助手
         self.assistant = InterviewAssistant()
-        self.llm_service = LLMService()
+        self.llm_service = LLMService(priority=PriorityScheduler.INTERACTIVE)
         
         # 创建标签页
         self.tab_control = ttk.Notebook(root)
@@ -336,16 +337,16 @@ class InterviewAssistantGUI:
         # 从文件系统加载简历信息
         from models.resume import Resume
         try:
-            # 获取所有简历文件
+            # 从简历目录获取所有简历
             import os
-            from config import RESUMES_DIR
-            resume_files = [f for f in os.listdir(RESUMES_DIR) if os.path.isfile(os.path.join(RESUMES_DIR, f))]
+            from services.storage import StorageService
+            entries = StorageService().list_resume_entries()
             
             # 添加到列表
-            for file_name in resume_files:
-                resume_id = os.path.splitext(file_name)[0]
-                # 显示文件名而不是ID，更友好
-                self.resume_listbox.insert(tk.END, file_name)
+            for entry in entries:
+                # 显示 简历ID + 文件扩展名，更友好
+                ext = os.path.splitext(entry['file_path'])[1]
+                self.resume_listbox.insert(tk.END, f"{entry['resume_id']}{ext}")
         except Exception as e:
             print(f"加载简历列表失败: {e}")
     
@@ -515,6 +516,10 @@ class InterviewAssistantGUI:
                 with open(file_path, 'wb') as f:
                     f.write(resume_content)
                 
+                # 登记到简历目录
+                from services.storage import StorageService
+                StorageService().register_resume(file_path)
+                
                 # 更新简历对象的文件路径
                 resume.file_path = file_path
                 
@@ -748,31 +753,57 @@ class InterviewAssistantGUI:
             self.generate_summary_button.config(state=tk.DISABLED)
     
     def _generate_summary(self):
-        """生成面试总结"""
+        """生成面试总结（后台线程流式生成，模型输出实时追加到总结文本框）"""
         if hasattr(self, 'current_summary_interview_id') and self.current_summary_interview_id:
-            try:
-                # 显示加载中提示
-                self.summary_text.config(state=tk.NORMAL)
-                self.summary_text.delete(1.0, tk.END)
-                self.summary_text.insert(tk.END, "正在生成面试总结，请稍候...")
-                self.summary_text.update()
+            interview_id = self.current_summary_interview_id
                 
-                # 调用生成总结功能
-                summary = self.assistant.summarize_interview(self.current_summary_interview_id)
+            # 显示加载中提示
+            self.summary_text.config(state=tk.NORMAL)
+            self.summary_text.delete(1.0, tk.END)
+            self.summary_text.insert(tk.END, "正在生成面试总结，请稍候...\n")
+            self.summary_text.tag_config("reasoning", foreground="gray")
+            self.summary_text.config(state=tk.DISABLED)
+            self.generate_summary_button.config(state=tk.DISABLED)
                 
-                if summary:
-                    self.summary_text.delete(1.0, tk.END)
-                    self.summary_text.insert(tk.END, summary)
-                else:
-                    self.summary_text.delete(1.0, tk.END)
-                    self.summary_text.insert(tk.END, "生成总结失败")
+            def on_delta(delta):
+                # 在主线程中追加输出
+                self.root.after(0, lambda: self._append_summary_delta(delta))
                 
-                self.summary_text.config(state=tk.DISABLED)
-            except Exception as e:
-                self.summary_text.config(state=tk.NORMAL)
-                self.summary_text.delete(1.0, tk.END)
-                self.summary_text.insert(tk.END, f"生成总结时发生错误：{str(e)}")
-                self.summary_text.config(state=tk.DISABLED)
+            def process_summary():
+                try:
+                    summary = self.assistant.summarize_interview(interview_id, on_delta=on_delta)
+                    self.root.after(0, lambda: self._finish_summary(interview_id, summary or "生成总结失败"))
+                except Exception as e:
+                    error_message = f"生成总结时发生错误：{str(e)}"
+                    self.root.after(0, lambda: self._finish_summary(interview_id, error_message))
+            
+            import threading
+            thread = threading.Thread(target=process_summary)
+            thread.daemon = True
+            thread.start()
+    
+    def _append_summary_delta(self, delta):
+        """追加一段流式输出，思考过程以灰色显示"""
+        self.summary_text.config(state=tk.NORMAL)
+        if delta.kind == 'reasoning':
+            self.summary_text.insert(tk.END, delta.text, "reasoning")
+        else:
+            self.summary_text.insert(tk.END, delta.text)
+        self.summary_text.see(tk.END)
+        self.summary_text.config(state=tk.DISABLED)
+    
+    def _finish_summary(self, interview_id, summary):
+        """流式生成结束后，用最终总结替换文本框内容"""
+        self.summary_text.config(state=tk.NORMAL)
+        self.summary_text.delete(1.0, tk.END)
+        self.summary_text.insert(tk.END, summary)
+        self.summary_text.config(state=tk.DISABLED)
+        self.generate_summary_button.config(state=tk.NORMAL)
+        
+        # 同步更新列表中缓存的面试对象，重新选择时显示最新总结
+        for interview in self.summary_interviews_dict.values():
+            if interview.interview_id == interview_id:
+                interview.summary = summary
     
     def _save_model_config(self):
         """保存模型配置"""
@@ -804,7 +835,6 @@ class InterviewAssistantGUI:
             # 更新当前服务的配置
             self.llm_service.api_key = api_key
             self.llm_service.model = model
-            self.llm_service.client = self.llm_service._init_client()
             
             messagebox.showinfo("成功", "模型配置已保存")
         except Exception as e:
@@ -833,7 +863,7 @@ class InterviewAssistantGUI:
             
             # 发送测试请求
             test_prompt = "你好"
-            response = self.llm_service.generate_response(test_prompt)
+            response = self.llm_service.generate_response(test_prompt, use_cache=False, task='chat')
             
             # 关闭测试窗口
             test_window.destroy()
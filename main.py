@@ -1,11 +1,17 @@
 # 个人面试助手主程序
 
 import os
+import time
 import argparse
 from models.resume import Resume
 from models.interview import Interview
 from models.prediction import Prediction
 from services.llm_service import LLMService
+from services.resilience import PriorityScheduler
+from services.storage import StorageService
+from services.ingest_service import IngestService
+from services.summary_service import SummaryService
+from services.job_queue import JobQueue, JobWorker
 from config import BASE_DIR
 
 class InterviewAssistant:
@@ -13,7 +19,8 @@ class InterviewAssistant:
     
     def __init__(self):
         """初始化面试助手"""
-        self.llm_service = LLMService()
+        # 对话等请求由用户等待结果，优先于批量任务调度
+        self.llm_service = LLMService(priority=PriorityScheduler.INTERACTIVE)
     
     def upload_resume(self, file_path):
         """上传简历
@@ -25,15 +32,14 @@ class InterviewAssistant:
             str: 简历ID
         """
         try:
-            # 读取文件内容
-            with open(file_path, 'rb') as f:
-                resume_content = f.read()
-            
-            # 创建并保存简历对象
+            # 创建简历对象并导入文件（复制、哈希和解析只读取一次源文件）
             resume = Resume()
-            resume.save(resume_content, os.path.basename(file_path))
+            resume.ingest(file_path)
             
-            print(f"简历上传成功！简历ID: {resume.resume_id}")
+            if resume.duplicate:
+                print(f"该简历与已上传的简历内容相同，直接使用已有简历。简历ID: {resume.resume_id}")
+            else:
+                print(f"简历上传成功！简历ID: {resume.resume_id}")
             print(f"提取的简历信息: {resume.user_info}")
             
             return resume.resume_id
@@ -41,6 +47,71 @@ class InterviewAssistant:
             print(f"简历上传失败: {e}")
             return None
     
+    def refresh_resume(self, resume_id):
+        """重新提取简历信息（忽略已保存的提取结果）
+        
+        Args:
+            resume_id (str): 简历ID
+            
+        Returns:
+            dict: 重新提取的简历信息
+        """
+        try:
+            resume = Resume().load(resume_id, extract=False)
+            user_info = resume.extract_info(force=True)
+            
+            print(f"简历信息重新提取成功！")
+            print(f"提取的简历信息: {user_info}")
+            
+            return user_info
+        except Exception as e:
+            print(f"重新提取简历信息失败: {e}")
+            return None
+    
+    def ingest_resumes(self, directory, recursive=False, restart=False, workers=None, concurrency=None):
+        """批量导入目录下的简历，中断后重新运行会跳过已完成的文件
+        
+        Args:
+            directory (str): 简历所在目录
+            recursive (bool, optional): 是否包含子目录
+            restart (bool, optional): 是否忽略检查点，全部重新导入
+            workers (int, optional): 解析进程数
+            concurrency (int, optional): 同时进行信息提取的简历数
+            
+        Returns:
+            dict: 导入结果统计
+        """
+        def on_progress(progress):
+            eta = f"{progress['eta']:.0f}秒" if progress['eta'] is not None else "未知"
+            status = progress['resume_id'] if progress['status'] == 'done' else f"失败: {progress['error']}"
+            print(f"[{progress['processed']}/{progress['pending']}] {os.path.basename(progress['file_path'])} -> {status} "
+                  f"| {progress['rate']:.2f}份/秒 | 预计剩余{eta}")
+        
+        try:
+            stats = IngestService(workers, concurrency).ingest_directory(directory, recursive, restart, on_progress)
+            print(f"导入完成：共{stats['total']}份，跳过已完成{stats['skipped']}份，成功{stats['done']}份"
+                  f"（其中重复{stats['duplicate']}份），失败{stats['failed']}份")
+            if stats['failed']:
+                print("失败的文件会在下次运行时重试")
+            return stats
+        except Exception as e:
+            print(f"批量导入简历失败: {e}")
+            return None
+    
+    def rebuild_resume_catalog(self):
+        """根据磁盘上的简历文件重建简历目录
+        
+        Returns:
+            int: 目录中的简历数量
+        """
+        try:
+            count = StorageService().rebuild_resume_catalog()
+            print(f"简历目录重建完成，共 {count} 份简历")
+            return count
+        except Exception as e:
+            print(f"重建简历目录失败: {e}")
+            return None
+    
     def create_interview(self, title, company, position, interview_date):
         """创建新的面试记录
         
@@ -92,27 +163,75 @@ class InterviewAssistant:
             print(f"添加面试问答失败: {e}")
             return False
     
-    def summarize_interview(self, interview_id):
+    def summarize_interview(self, interview_id, on_delta=None, force=False):
         """生成面试总结
         
         Args:
             interview_id (str): 面试ID
+            on_delta (callable, optional): 流式回调，默认将模型输出实时打印到控制台
+            force (bool, optional): 是否忽略已保存的总结和问答摘要，全部重新生成
             
         Returns:
             str: 面试总结
         """
         try:
             interview = Interview().load(interview_id)
-            summary = interview.generate_summary()
+            summary = interview.generate_summary(on_delta=on_delta or _print_stream_delta(), force=force)
             
-            print(f"面试总结生成成功！")
-            print(f"总结内容: {summary}")
+            print(f"\n面试总结生成成功！")
             
             return summary
         except Exception as e:
             print(f"生成面试总结失败: {e}")
             return None
     
+    def summarize_all_interviews(self, force=False, workers=None, requests_per_minute=None):
+        """并发总结全部面试，内容未变化的面试直接使用已保存的总结
+        
+        Args:
+            force (bool, optional): 是否全部强制重新生成
+            workers (int, optional): 同时总结的面试数
+            requests_per_minute (float, optional): 每分钟最多发起的模型请求数
+            
+        Returns:
+            list: 每个面试的总结结果
+        """
+        def on_result(result, progress):
+            eta = f"{progress['eta']:.0f}秒" if progress['eta'] is not None else "未知"
+            if 'error' in result:
+                status = f"失败: {result['error']}"
+            elif result['cached']:
+                status = "未变化，跳过"
+            else:
+                status = f"完成（{result['elapsed']:.1f}秒）"
+            print(f"[{progress['processed']}/{progress['total']}] {result['interview_id']} -> {status} "
+                  f"| {progress['rate'] * 60:.1f}场/分钟 | 预计剩余{eta}")
+        
+        try:
+            interview_ids = [data['interview_id'] for data in StorageService().list_interviews() if data.get('interview_id')]
+            if not interview_ids:
+                print("没有面试记录")
+                return []
+            
+            started = time.monotonic()
+            results = SummaryService().batch_summarize_interviews(
+                interview_ids, force=force, workers=workers,
+                requests_per_minute=requests_per_minute, on_result=on_result
+            )
+            elapsed = time.monotonic() - started
+            
+            failed = [r for r in results if 'error' in r]
+            skipped = sum(1 for r in results if r.get('cached') and 'error' not in r)
+            print(f"批量总结完成：共{len(results)}场，生成{len(results) - len(failed) - skipped}场，"
+                  f"未变化跳过{skipped}场，失败{len(failed)}场，用时{elapsed:.1f}秒"
+                  f"（{len(results) / elapsed * 60 if elapsed > 0 else 0:.1f}场/分钟）")
+            for r in failed:
+                print(f"  {r['interview_id']}: {r['error']}")
+            return results
+        except Exception as e:
+            print(f"批量总结面试失败: {e}")
+            return None
+    
     def analyze_answer(self, interview_id, qa_index):
         """分析面试回答质量
         
@@ -125,7 +244,8 @@ class InterviewAssistant:
         """
         try:
             interview = Interview().load(interview_id)
-            analysis = interview.analyze_answer(qa_index)
+            with PriorityScheduler.use(PriorityScheduler.INTERACTIVE):
+                analysis = interview.analyze_answer(qa_index)
             
             print(f"回答分析成功！")
             print(f"分析结果: {analysis}")
@@ -135,6 +255,39 @@ class InterviewAssistant:
             print(f"分析回答失败: {e}")
             return None
     
+    def analyze_all_answers(self, interview_id, skip_analyzed=False):
+        """分析一场面试中全部回答的质量
+        
+        Args:
+            interview_id (str): 面试ID
+            skip_analyzed (bool, optional): 是否跳过已有分析结果的回答
+            
+        Returns:
+            dict: 问题回答的索引 -> 分析结果
+        """
+        try:
+            interview = Interview().load(interview_id)
+            started = time.monotonic()
+            with PriorityScheduler.use(PriorityScheduler.INTERACTIVE):
+                results = interview.analyze_all_answers(skip_analyzed)
+            elapsed = time.monotonic() - started
+            if not results:
+                print("没有需要分析的回答")
+                return results
+            
+            for index, analysis in results.items():
+                print(f"\n[{index}] {interview.questions_answers[index]['question']}")
+                print(f"分析结果: {analysis}")
+            
+            failed = [index for index, analysis in results.items() if analysis.startswith("错误:")]
+            print(f"\n回答分析完成：共{len(results)}个，成功{len(results) - len(failed)}个，失败{len(failed)}个，用时{elapsed:.1f}秒")
+            if failed:
+                print(f"失败的索引: {failed}，可以使用 --skip_analyzed 只重新分析未成功的回答")
+            return results
+        except Exception as e:
+            print(f"分析回答失败: {e}")
+            return None
+    
     def predict_questions(self, target_position, target_company=None, resume_id=None):
         """预测面试题目
         
@@ -174,6 +327,99 @@ class InterviewAssistant:
             print(f"预测面试题目失败: {e}")
             return None
     
+    def submit_job(self, job_type, payload, priority=None, idempotency_key=None):
+        """提交后台任务，立即返回，由worker进程执行
+        
+        Args:
+            job_type (str): 任务类型
+            payload (dict): 任务参数
+            priority (str, optional): 优先级（high/normal/low）
+            idempotency_key (str, optional): 幂等键，相同的键只会提交一次
+            
+        Returns:
+            str: 任务ID
+        """
+        try:
+            job = JobQueue().enqueue(job_type, payload, priority, idempotency_key)
+            if job['created']:
+                print(f"任务已提交，任务ID: {job['job_id']}")
+            else:
+                print(f"已有相同的任务，任务ID: {job['job_id']}（状态: {job['status']}）")
+            print(f"使用 job_status --job_id {job['job_id']} 查询进度，需要运行 worker 命令执行任务")
+            return job['job_id']
+        except Exception as e:
+            print(f"提交任务失败: {e}")
+            return None
+    
+    def job_status(self, job_id, wait=False):
+        """查询后台任务状态
+        
+        Args:
+            job_id (str): 任务ID
+            wait (bool, optional): 是否等待任务结束
+            
+        Returns:
+            dict: 任务信息
+        """
+        queue = JobQueue()
+        job = queue.wait(job_id) if wait else queue.get(job_id)
+        if job is None:
+            print(f"未找到任务: {job_id}")
+            return None
+        
+        print(f"任务 {job['job_id']}（{job['job_type']}）状态: {job['status']}，已尝试{job['attempts']}/{job['max_attempts']}次")
+        if job['error']:
+            print(f"错误: {job['error']}")
+        if job['status'] == JobQueue.DONE:
+            print(f"结果: {job['result']}")
+        return job
+    
+    def list_jobs(self, status=None):
+        """列出后台任务
+        
+        Args:
+            status (str, optional): 只列出该状态的任务
+            
+        Returns:
+            list: 任务列表
+        """
+        jobs = JobQueue().list(status)
+        print(f"找到 {len(jobs)} 个任务:")
+        for job in jobs:
+            created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(job['created_at']))
+            print(f"{job['job_id']} - {job['job_type']} - {job['status']} - 优先级{job['priority']} - {created}")
+        return jobs
+    
+    def cancel_job(self, job_id):
+        """取消排队中的后台任务
+        
+        Args:
+            job_id (str): 任务ID
+            
+        Returns:
+            bool: 是否取消成功
+        """
+        cancelled = JobQueue().cancel(job_id)
+        print("任务已取消" if cancelled else "只能取消排队中的任务")
+        return cancelled
+    
+    def run_worker(self, workers=None, once=False):
+        """运行后台任务worker，直到按Ctrl+C停止
+        
+        Args:
+            workers (int, optional): 执行线程数
+            once (bool, optional): 执行完队列中的任务后退出
+        """
+        def on_job(job, status):
+            print(f"任务 {job['job_id']}（{job['job_type']}）-> {status}")
+        
+        worker = JobWorker(workers=workers)
+        print(f"worker已启动（{worker.workers}个执行线程），按Ctrl+C停止")
+        try:
+            worker.run(once=once, on_job=on_job)
+        except KeyboardInterrupt:
+            print("\nworker已停止，执行中的任务已放回队列")
+    
     def list_interviews(self):
         """列出所有面试记录
         
@@ -198,13 +444,40 @@ class InterviewAssistant:
             str: 模型生成的响应
         """
         try:
-            response = self.llm_service.generate_response(prompt)
-            print(f"模型响应: {response}")
-            return response
+            on_delta = _print_stream_delta()
+            response_parts = []
+            for delta in self.llm_service.generate_response(prompt, stream=True, task='chat'):
+                if delta.kind == 'content':
+                    response_parts.append(delta.text)
+                on_delta(delta)
+            print()
+            return ''.join(response_parts)
         except Exception as e:
             print(f"获取模型响应失败: {e}")
             return None
 
+def _print_stream_delta():
+    """创建把流式输出实时打印到控制台的回调，思考过程与回答内容分段显示
+    
+    Returns:
+        callable: 接收StreamDelta的回调函数
+    """
+    state = {'kind': None}
+    
+    def on_delta(delta):
+        if delta.kind != state['kind']:
+            print("\n[思考过程]" if delta.kind == 'reasoning' else "\n[模型响应]")
+            state['kind'] = delta.kind
+        print(delta.text, end='', flush=True)
+    
+    return on_delta
+
+def add_background_arguments(parser):
+    """为可以提交到后台任务队列的命令添加参数"""
+    parser.add_argument('--background', action='store_true', help='提交到后台任务队列，立即返回任务ID')
+    parser.add_argument('--priority', choices=list(JobQueue.PRIORITIES), help='后台任务优先级')
+    parser.add_argument('--idempotency_key', help='幂等键，相同的键只会提交一次任务')
+
 # 命令行接口
 def main():
     parser = argparse.ArgumentParser(description='个人面试助手')
@@ -214,6 +487,22 @@ def main():
     upload_parser = subparsers.add_parser('upload_resume', help='上传简历')
     upload_parser.add_argument('file_path', help='简历文件路径')
     
+    # 重新提取简历信息命令
+    refresh_parser = subparsers.add_parser('refresh_resume', help='重新提取简历信息')
+    refresh_parser.add_argument('--resume_id', required=True, help='简历ID')
+    add_background_arguments(refresh_parser)
+    
+    # 批量导入简历命令
+    ingest_parser = subparsers.add_parser('ingest_resumes', help='批量导入目录下的简历')
+    ingest_parser.add_argument('directory', help='简历所在目录')
+    ingest_parser.add_argument('--recursive', action='store_true', help='包含子目录')
+    ingest_parser.add_argument('--restart', action='store_true', help='忽略检查点，全部重新导入')
+    ingest_parser.add_argument('--workers', type=int, help='解析进程数')
+    ingest_parser.add_argument('--concurrency', type=int, help='同时进行信息提取的简历数')
+    
+    # 重建简历目录命令
+    catalog_parser = subparsers.add_parser('rebuild_catalog', help='根据简历文件重建简历目录')
+    
     # 创建面试命令
     create_parser = subparsers.add_parser('create_interview', help='创建面试记录')
     create_parser.add_argument('--title', required=True, help='面试标题')
@@ -231,17 +520,46 @@ def main():
     # 生成面试总结命令
     summary_parser = subparsers.add_parser('summarize', help='生成面试总结')
     summary_parser.add_argument('--interview_id', required=True, help='面试ID')
+    summary_parser.add_argument('--force', action='store_true', help='忽略已保存的总结和问答摘要，全部重新生成')
+    add_background_arguments(summary_parser)
+    
+    # 批量总结全部面试命令
+    summary_all_parser = subparsers.add_parser('summarize_all', help='并发总结全部面试')
+    summary_all_parser.add_argument('--force', action='store_true', help='忽略已保存的总结和问答摘要，全部重新生成')
+    summary_all_parser.add_argument('--workers', type=int, help='同时总结的面试数')
+    summary_all_parser.add_argument('--rpm', type=float, help='每分钟最多发起的模型请求数')
     
     # 分析回答命令
     analyze_parser = subparsers.add_parser('analyze_answer', help='分析面试回答质量')
     analyze_parser.add_argument('--interview_id', required=True, help='面试ID')
     analyze_parser.add_argument('--index', type=int, required=True, help='问题回答的索引')
     
+    # 批量分析回答命令
+    analyze_all_parser = subparsers.add_parser('analyze_all', help='并发分析一场面试的全部回答')
+    analyze_all_parser.add_argument('--interview_id', required=True, help='面试ID')
+    analyze_all_parser.add_argument('--skip_analyzed', action='store_true', help='跳过已有分析结果的回答')
+    
     # 预测面试题目命令
     predict_parser = subparsers.add_parser('predict', help='预测面试题目')
     predict_parser.add_argument('--position', required=True, help='目标岗位')
     predict_parser.add_argument('--company', help='目标公司')
     predict_parser.add_argument('--resume_id', help='简历ID')
+    add_background_arguments(predict_parser)
+    
+    # 后台任务命令
+    worker_parser = subparsers.add_parser('worker', help='运行后台任务worker')
+    worker_parser.add_argument('--workers', type=int, help='执行线程数')
+    worker_parser.add_argument('--once', action='store_true', help='执行完队列中的任务后退出')
+    
+    job_status_parser = subparsers.add_parser('job_status', help='查询后台任务状态')
+    job_status_parser.add_argument('--job_id', required=True, help='任务ID')
+    job_status_parser.add_argument('--wait', action='store_true', help='等待任务结束')
+    
+    list_jobs_parser = subparsers.add_parser('list_jobs', help='列出后台任务')
+    list_jobs_parser.add_argument('--status', choices=['queued', 'running', 'done', 'failed', 'cancelled'], help='任务状态')
+    
+    cancel_job_parser = subparsers.add_parser('cancel_job', help='取消排队中的后台任务')
+    cancel_job_parser.add_argument('--job_id', required=True, help='任务ID')
     
     # 列出面试记录命令
     list_parser = subparsers.add_parser('list_interviews', help='列出所有面试记录')
@@ -254,18 +572,47 @@ def main():
     
     assistant = InterviewAssistant()
     
-    if args.command == 'upload_resume':
+    if getattr(args, 'background', False):
+        # 提交到后台任务队列，不在当前进程中等待模型
+        if args.command == 'refresh_resume':
+            job_type, payload = 'extract_resume', {'resume_id': args.resume_id, 'force': True}
+        elif args.command == 'summarize':
+            job_type, payload = 'summarize_interview', {'interview_id': args.interview_id, 'force': args.force}
+        else:
+            job_type, payload = 'predict_questions', {
+                'target_position': args.position, 'target_company': args.company, 'resume_id': args.resume_id
+            }
+        assistant.submit_job(job_type, payload, args.priority, args.idempotency_key)
+    elif args.command == 'upload_resume':
         assistant.upload_resume(args.file_path)
+    elif args.command == 'refresh_resume':
+        assistant.refresh_resume(args.resume_id)
+    elif args.command == 'ingest_resumes':
+        assistant.ingest_resumes(args.directory, args.recursive, args.restart, args.workers, args.concurrency)
+    elif args.command == 'rebuild_catalog':
+        assistant.rebuild_resume_catalog()
     elif args.command == 'create_interview':
         assistant.create_interview(args.title, args.company, args.position, args.date)
     elif args.command == 'add_qa':
         assistant.add_interview_qa(args.interview_id, args.question, args.answer, args.notes)
     elif args.command == 'summarize':
-        assistant.summarize_interview(args.interview_id)
+        assistant.summarize_interview(args.interview_id, force=args.force)
+    elif args.command == 'summarize_all':
+        assistant.summarize_all_interviews(args.force, args.workers, args.rpm)
     elif args.command == 'analyze_answer':
         assistant.analyze_answer(args.interview_id, args.index)
+    elif args.command == 'analyze_all':
+        assistant.analyze_all_answers(args.interview_id, args.skip_analyzed)
     elif args.command == 'predict':
         assistant.predict_questions(args.position, args.company, args.resume_id)
+    elif args.command == 'worker':
+        assistant.run_worker(args.workers, args.once)
+    elif args.command == 'job_status':
+        assistant.job_status(args.job_id, args.wait)
+    elif args.command == 'list_jobs':
+        assistant.list_jobs(args.status)
+    elif args.command == 'cancel_job':
+        assistant.cancel_job(args.job_id)
     elif args.command == 'list_interviews':
         assistant.list_interviews()
     elif args.command == 'chat':
@@ -11,7 +11,7 @@ class Interview:
     """面试模型类，用于管理面试数据和操作"""
     
     def __init__(self, interview_id=None, title=None, company=None, position=None, interview_date=None, 
-                 questions_answers=None, summary=None):
+                 questions_answers=None, summary=None, qa_digests=None, summary_fingerprint=None):
         """初始化面试对象
         
         Args:
@@ -22,6 +22,8 @@ class Interview:
             interview_date (str, optional): 面试日期
             questions_answers (list, optional): 问题和回答列表
             summary (str, optional): 面试总结
+            qa_digests (dict, optional): 各问答的摘要，按问答内容的哈希保存，供增量总结复用
+            summary_fingerprint (str, optional): 生成总结时面试内容的指纹，内容未变化时不重新生成总结
         """
         self.interview_id = interview_id or FileUtils.generate_unique_filename()
         self.title = title or f"未命名面试_{datetime.now().strftime('%Y%m%d')}"
@@ -30,10 +32,19 @@ class Interview:
         self.interview_date = interview_date or datetime.now().strftime('%Y-%m-%d')
         self.questions_answers = questions_answers or []
         self.summary = summary
+        self.qa_digests = qa_digests or {}
+        self.summary_fingerprint = summary_fingerprint
         self.save_time = datetime.now().isoformat()
         
         self._storage_service = StorageService()
-        self._summary_service = SummaryService()
+        self._summary_service_instance = None
+    
+    @property
+    def _summary_service(self):
+        """总结服务，仅在真正需要调用模型时才创建"""
+        if self._summary_service_instance is None:
+            self._summary_service_instance = SummaryService()
+        return self._summary_service_instance
     
     def save(self):
         """保存面试数据
@@ -69,6 +80,8 @@ class Interview:
             self.interview_date = interview_data.get('interview_date', self.interview_date)
             self.questions_answers = interview_data.get('questions_answers', self.questions_answers)
             self.summary = interview_data.get('summary', self.summary)
+            self.qa_digests = interview_data.get('qa_digests', self.qa_digests)
+            self.summary_fingerprint = interview_data.get('summary_fingerprint', self.summary_fingerprint)
             self.save_time = interview_data.get('save_time', datetime.now().isoformat())
             
             return self
@@ -150,16 +163,25 @@ class Interview:
         
         return self
     
-    def generate_summary(self):
-        """生成面试总结
+    def generate_summary(self, on_delta=None, force=False):
+        """生成面试总结，面试内容未变化时直接使用已保存的总结
         
+        Args:
+            on_delta (callable, optional): 流式回调，每收到一段模型输出（StreamDelta）就调用一次
+            force (bool, optional): 是否忽略已保存的总结和问答摘要，全部重新生成
+            
         Returns:
             str: 面试总结
         """
         try:
             # 使用总结服务生成面试总结
-            summary_result = self._summary_service.summarize_interview(self.interview_id)
+            summary_result = self._summary_service.summarize_interview(self.interview_id, on_delta=on_delta, force=force)
             self.summary = summary_result['summary']
+            if summary_result['cached']:
+                return self.summary
+            
+            self.qa_digests = summary_result['qa_digests']
+            self.summary_fingerprint = summary_result['summary_fingerprint']
             
             # 保存更新
             self.save()
@@ -197,6 +219,40 @@ class Interview:
         else:
             raise IndexError(f"索引 {index} 超出范围")
     
+    def analyze_all_answers(self, skip_analyzed=False):
+        """分析全部问题的回答质量，各问答并发分析，全部完成后只保存一次
+        
+        Args:
+            skip_analyzed (bool, optional): 是否跳过已有分析结果的问答
+            
+        Returns:
+            dict: 问题回答的索引 -> 分析结果；分析失败的结果不保存，下次可以重新分析
+        """
+        indices = [
+            i for i, qa in enumerate(self.questions_answers)
+            if not (skip_analyzed and qa.get('analysis'))
+        ]
+        analyses = self._summary_service.analyze_answers_quality(
+            [(self.questions_answers[i]['question'], self.questions_answers[i]['answer']) for i in indices]
+        )
+        
+        results = dict(zip(indices, analyses))
+        timestamp = datetime.now().isoformat()
+        saved = 0
+        for index, analysis in results.items():
+            if analysis.startswith("错误:"):
+                continue
+            self.questions_answers[index].setdefault('analysis', []).append({
+                'content': analysis,
+                'timestamp': timestamp
+            })
+            saved += 1
+        
+        if saved:
+            self.save()
+        
+        return results
+    
     def delete(self):
         """删除面试数据
         
@@ -224,6 +280,8 @@ class Interview:
             'interview_date': self.interview_date,
             'questions_answers': self.questions_answers,
             'summary': self.summary,
+            'qa_digests': self.qa_digests,
+            'summary_fingerprint': self.summary_fingerprint,
             'save_time': self.save_time
         }
     
@@ -244,7 +302,9 @@ class Interview:
             position=data.get('position'),
             interview_date=data.get('interview_date'),
             questions_answers=data.get('questions_answers'),
-            summary=data.get('summary')
+            summary=data.get('summary'),
+            qa_digests=data.get('qa_digests'),
+            summary_fingerprint=data.get('summary_fingerprint')
         )
     
     @classmethod
@@ -48,31 +48,21 @@ class Prediction:
         if not resume_content and self.resume_id:
             try:
                 resume = Resume().load(self.resume_id)
-                # 这里简化处理，实际应该根据文件格式提取文本内容
-                resume_content = f"简历信息：{resume.to_dict()}"
+                # 只使用与面试问题相关的段落（经历、项目、技能等），JSON格式的简历使用提取出的信息
+                resume_content = resume.get_text(Resume.PREDICTION_SECTIONS) or f"简历信息：{resume.to_dict()}"
             except Exception as e:
                 print(f"加载简历失败: {e}")
                 resume_content = ""
         
-        # 预测面试问题
-        self.recommended_questions = self._prediction_service.predict_interview_questions(
-            resume_content or "", 
-            self.target_position, 
-            self.target_company
-        )
-        
-        # 推荐学习主题
-        self.recommended_topics = self._prediction_service.recommend_study_topics(
-            self.target_position, 
-            resume_content
-        )
-        
-        # 生成准备计划
-        self.preparation_plan = self._prediction_service.prepare_interview(
+        # 预测问题、推荐学习主题（并发执行）并生成准备计划
+        result = self._prediction_service.prepare_interview(
             resume_content or "", 
             self.target_position, 
             self.target_company
         )
+        self.recommended_questions = result['predicted_questions']
+        self.recommended_topics = result['recommended_topics']
+        self.preparation_plan = result['preparation_plan']
         
         # 更新生成时间
         self.generated_time = datetime.now().isoformat()
@@ -1,16 +1,44 @@
 # 简历管理模型
 
 import os
+import json
+import asyncio
 from datetime import datetime
 from utils.file_utils import FileUtils
 from utils.file_parser import FileParser
+from utils.rule_extractor import RuleExtractor
+from utils.resume_segmenter import ResumeSegmenter
 from services.storage import StorageService
-from services.llm_service import LLMService
-from config import RESUMES_DIR
+from services.async_llm_service import AsyncLLMService
+from config import RESUMES_DIR, RESUME_EXTRACTION_CONFIG
 
 class Resume:
     """简历模型类，用于管理简历数据和操作"""
     
+    # 从简历中提取的信息字段，user_info的键与此一致
+    INFO_FIELDS = [
+        "姓名", "联系方式", "邮箱", "学历背景", "工作经历", 
+        "项目经验",  "专业证书" , "学术著作"
+    ]
+    
+    # 各字段需要的简历段落（段名见ResumeSegmenter），没有找到对应段落时使用全文
+    FIELD_SECTIONS = {
+        "姓名": ['header', 'basic'],
+        "联系方式": ['header', 'basic'],
+        "邮箱": ['header', 'basic'],
+        "学历背景": ['education'],
+        "工作经历": ['work'],
+        "项目经验": ['project'],
+        "专业证书": ['certificate'],
+        "学术著作": ['publication'],
+    }
+    
+    # 预测面试问题时使用的简历段落
+    PREDICTION_SECTIONS = ['summary', 'education', 'work', 'project', 'skill']
+    
+    # 提取逻辑版本，修改提取方式或提示后递增，已保存的提取结果会在下次加载时重新生成
+    EXTRACTOR_VERSION = 4
+    
     def __init__(self, resume_id=None, file_path=None, upload_time=None, user_info=None):
         """初始化简历对象
         
@@ -24,8 +52,11 @@ class Resume:
         self.file_path = file_path
         self.upload_time = upload_time or datetime.now().isoformat()
         self.user_info = user_info or {}
+        self.content_hash = None
+        # 是否为与已有简历内容相同的重复上传
+        self.duplicate = False
         self._storage_service = StorageService()
-        self._llm_service = LLMService()
+        self._llm_service = AsyncLLMService()
     
     def save(self, resume_content, original_filename=None):
         """保存简历文件
@@ -37,42 +68,63 @@ class Resume:
         Returns:
             Resume: 当前简历对象
         """
-        self.file_path = self._storage_service.save_resume(resume_content, original_filename)
-        self.resume_id = os.path.basename(self.file_path).split('.')[0]
-        self.upload_time = datetime.now().isoformat()
+        self._apply_entry(self._storage_service.store_resume(resume_content, original_filename))
         
-        # 尝试从简历中提取信息
+        # 尝试从简历中提取信息（上传时提取一次并保存，之后加载直接读取；重复上传时直接读取已有结果）
         self.extract_info()
         
         return self
     
-    def load(self, resume_id):
-        """加载简历文件
+    def ingest(self, source_path, original_filename=None):
+        """从本地文件导入简历：源文件只读取一次
+        
+        源文件以内存映射方式打开，哈希计算和解析都直接使用映射的内容，
+        保存副本时在内核中复制，进程内不会同时持有两份完整内容。
         
         Args:
-            resume_id (str): 简历ID
+            source_path (str): 源文件路径
+            original_filename (str, optional): 原始文件名，默认使用源文件名
             
         Returns:
             Resume: 当前简历对象
         """
-        # 查找对应ID的简历文件
-        resume_files = self._storage_service.list_resumes()
-        target_file = None
+        original_filename = original_filename or os.path.basename(source_path)
+        with FileUtils.map_file(source_path) as resume_content:
+            self._apply_entry(self._storage_service.store_resume(resume_content, original_filename, source_path=source_path))
+            
+            # 重复上传的简历已有提取结果，不需要再解析文件
+            if self.duplicate:
+                self.extract_info()
+            else:
+                self.extract_info(file_content=resume_content)
         
-        for file_path in resume_files:
-            if os.path.basename(file_path).startswith(resume_id):
-                target_file = file_path
-                break
+        return self
+    
+    def _apply_entry(self, entry):
+        """用简历目录条目设置简历ID、文件路径、上传时间和内容哈希"""
+        self.resume_id = entry['resume_id']
+        self.file_path = entry['file_path']
+        self.upload_time = entry['upload_time']
+        self.content_hash = entry['content_hash']
+        self.duplicate = entry.get('duplicate', False)
+    
+    def load(self, resume_id, extract=True):
+        """加载简历文件
         
-        if not target_file:
+        Args:
+            resume_id (str): 简历ID
+            extract (bool, optional): 是否读取（没有时生成）提取结果，为False时只加载简历文件信息
+            
+        Returns:
+            Resume: 当前简历对象
+        """
+        # 按ID在简历目录中精确查找
+        entry = self._storage_service.get_resume_entry(resume_id)
+        if not entry:
             raise FileNotFoundError(f"未找到ID为 {resume_id} 的简历")
         
-        self.file_path = target_file
-        self.resume_id = os.path.basename(target_file).split('.')[0]
-        
-        # 尝试从文件名或文件内容中获取上传时间
-        # 这里简单处理，实际可以根据需要实现更复杂的逻辑
-        self.upload_time = datetime.fromtimestamp(os.path.getctime(target_file)).isoformat()
+        self._apply_entry(entry)
+        target_file = self.file_path
         
         # 如果是JSON格式的简历文件，直接加载其中的信息
         file_ext = os.path.splitext(target_file)[1].lower()
@@ -89,14 +141,21 @@ class Resume:
             except Exception as e:
                 print(f"加载JSON格式简历失败: {e}")
         
-        # 对于非JSON格式的简历，尝试从中提取信息
-        self.extract_info()
+        # 对于非JSON格式的简历，优先读取上传时保存的提取结果，没有时才重新提取
+        if extract:
+            self.extract_info()
         
         return self
     
-    def extract_info(self):
+    def extract_info(self, force=False, file_content=None):
         """从简历文件中提取信息
         
+        提取结果按简历内容哈希保存，相同内容且提取逻辑版本未变化时直接读取已保存的结果。
+        
+        Args:
+            force (bool, optional): 是否忽略已保存的结果，强制重新提取
+            file_content (bytes, optional): 已读入的简历内容，提供时不再从磁盘读取
+            
         Returns:
             dict: 提取的用户信息
         """
@@ -107,39 +166,163 @@ class Resume:
                 # 检查是否已经加载了user_info
                 if self.user_info:
                     return self.user_info
-                
+            
+            if not self.content_hash:
+                self.content_hash = FileUtils.hash_file(self.file_path)
+            
+            if not force:
+                profile = self._storage_service.get_profile(self.content_hash)
+                if profile and profile.get('extractor_version') == self._extractor_version():
+                    self.user_info = profile['user_info']
+                    return self.user_info
+            
             # 使用FileParser解析不同格式的简历文件
+            parsed = True
             try:
-                file_content = self._storage_service.get_resume(self.file_path)
-                content = FileParser.parse_file(self.file_path, file_content)
-                # 清理解析后的文本
-                content = FileParser.clean_text(content)
+                if file_content is None:
+                    file_content = self._storage_service.get_resume(self.file_path)
+                content, meta = FileParser.parse_file_with_meta(self.file_path, file_content, content_hash=self.content_hash)
+                # 清理解析后的文本，保留换行以便按段落选取
+                # 解析器出错时返回错误信息而非抛出异常，这类文本不交给规则和模型提取
+                parsed = not FileParser.is_error_text(content)
+                content = FileParser.clean_text(content, keep_layout=True)
+                sections = meta.get('sections') or []
             except Exception as e:
                 print(f"解析简历文件失败: {e}")
                 content = f"解析简历文件失败: {str(e)}"
+                sections = []
+                parsed = False
+            
+            if not parsed:
+                print(f"简历文件解析失败，跳过信息提取: {content}")
+                self.user_info = {info_type: "未提取到" for info_type in self.INFO_FIELDS}
+                return self.user_info
+            
+            # 邮箱、电话等格式固定的字段先用规则在本地提取，其余字段再交给LLM
+            rule_info = RuleExtractor.extract(content)
+            local_info = {}
+            if RESUME_EXTRACTION_CONFIG['local_fields']:
+                local_info = RuleExtractor.fill_fields(rule_info, self.INFO_FIELDS)
+            info_types = [info_type for info_type in self.INFO_FIELDS if info_type not in local_info]
             
-            # 使用LLM提取信息
-            info_types = [
-                "姓名", "联系方式", "邮箱", "学历背景", "工作经历", 
-                "项目经验",  "专业证书" , "学术著作"
-            ]
-            
-            extracted_info = {}
-            for info_type in info_types:
-                try:
-                    info = self._llm_service.extract_info_from_text(content, info_type)
-                    extracted_info[info_type] = info
-                except Exception as e:
-                    print(f"提取{info_type}失败: {e}")
-                    extracted_info[info_type] = "未提取到"
+            # 模型服务熔断中时直接降级，不再逐个字段等待失败
+            if info_types and not self._llm_service.is_available():
+                print(f"模型服务暂时不可用，跳过简历信息提取: {self._llm_service.breaker_state()}")
+                self.user_info = {info_type: local_info.get(info_type, "未提取到") for info_type in self.INFO_FIELDS}
+                return self.user_info
             
+            if not info_types:
+                llm_info = {}
+            elif RESUME_EXTRACTION_CONFIG['mode'] == 'structured':
+                # 一次调用返回包含全部字段的JSON，只对缺失字段重新询问
+                context = self._field_context(content, sections, info_types)
+                llm_info = self._llm_service.extract_structured_info(context, info_types, use_cache=not force)
+            else:
+                # 各字段相互独立，在同一个事件循环中并发提取
+                results = AsyncLLMService.run(self._aextract_fields(content, sections, info_types, use_cache=not force))
+                
+                llm_info = {}
+                for info_type, info in zip(info_types, results):
+                    if isinstance(info, Exception):
+                        print(f"提取{info_type}失败: {info}")
+                        info = "未提取到"
+                    llm_info[info_type] = info
+            
+            # 按INFO_FIELDS的顺序合并本地提取和LLM提取的结果
+            extracted_info = {
+                info_type: local_info[info_type] if info_type in local_info else llm_info.get(info_type, "未提取到")
+                for info_type in self.INFO_FIELDS
+            }
             self.user_info = extracted_info
+            
+            # 只保存有效的提取结果，模型调用失败时下次加载重新提取
+            if self._is_valid_profile(extracted_info):
+                self._storage_service.save_profile(self.content_hash, {
+                    'content_hash': self.content_hash,
+                    'extractor_version': self._extractor_version(),
+                    'user_info': extracted_info,
+                    'rule_info': rule_info,
+                    'local_fields': list(local_info),
+                    'created_time': datetime.now().isoformat()
+                })
+                self._storage_service.update_resume_entry(self.resume_id, profile=self.content_hash)
+            
             return extracted_info
         except Exception as e:
             print(f"提取简历信息失败: {e}")
             self.user_info = {"error": str(e)}
             return self.user_info
     
+    def _extractor_version(self):
+        """当前提取逻辑的版本标识（版本号 + 提取模式）"""
+        return f"{self.EXTRACTOR_VERSION}-{RESUME_EXTRACTION_CONFIG['mode']}"
+    
+    @staticmethod
+    def _is_valid_profile(user_info):
+        """判断提取结果是否值得保存：没有模型调用错误，且至少提取到一个字段"""
+        values = list(user_info.values())
+        if any(isinstance(v, str) and v.startswith("错误:") for v in values):
+            return False
+        return any(v != "未提取到" for v in values)
+    
+    async def _aextract_fields(self, content, sections, info_types, use_cache=True):
+        """并发提取多个字段，每个字段只发送相关段落，返回与info_types顺序一致的结果（失败的字段为异常对象）"""
+        return await asyncio.gather(
+            *(
+                self._llm_service.aextract_info_from_text(
+                    self._field_context(content, sections, [info_type]), info_type, use_cache
+                )
+                for info_type in info_types
+            ),
+            return_exceptions=True
+        )
+    
+    def _field_context(self, content, sections, info_types):
+        """提取指定字段时放入提示的文本：已找到的各字段对应段落的并集，加上第一个标题之前的内容
+        
+        找不到对应段落的字段（如多数简历没有的学术著作）不会使提示扩大为全文，由模型按缺失处理；
+        所有字段都找不到对应段落时才使用全文。
+        """
+        if not RESUME_EXTRACTION_CONFIG['sections'] or not sections:
+            return content
+        
+        found = ResumeSegmenter.names(sections)
+        names = set()
+        for info_type in info_types:
+            names |= found.intersection(self.FIELD_SECTIONS.get(info_type, []))
+        if not names:
+            return content
+        names.add(ResumeSegmenter.HEADER)
+        return ResumeSegmenter.select(content, sections, names)
+    
+    def get_text(self, section_names=None):
+        """获取简历文本（保留换行）
+        
+        Args:
+            section_names (list, optional): 只返回这些段落，简历中没有识别出段落时返回全文
+            
+        Returns:
+            str: 简历文本，JSON格式的简历或解析失败时返回空字符串
+        """
+        if not self.file_path or os.path.splitext(self.file_path)[1].lower() == '.json':
+            return ""
+        
+        try:
+            text, meta = FileParser.parse_file_with_meta(self.file_path, content_hash=self.content_hash)
+        except Exception as e:
+            print(f"解析简历文件失败: {e}")
+            return ""
+        if FileParser.is_error_text(text):
+            return ""
+        
+        content = FileParser.clean_text(text, keep_layout=True)
+        sections = meta.get('sections') or []
+        if section_names and sections:
+            selected = ResumeSegmenter.select(content, sections, section_names)
+            if selected:
+                return selected
+        return content
+    
     def get_content(self):
         """获取简历文件内容
         
@@ -161,7 +344,7 @@ class Resume:
             raise ValueError("简历文件路径未设置")
         
         try:
-            self._storage_service.delete_resume(self.file_path)
+            self._storage_service.delete_resume_entry(self.resume_id)
             self.file_path = None
             return True
         except Exception as e:
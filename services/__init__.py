@@ -1,8 +1,9 @@
 # services 包初始化文件
 
 from .llm_service import LLMService
+from .async_llm_service import AsyncLLMService
 from .storage import StorageService
 from .summary_service import SummaryService
 from .prediction_service import PredictionService
 
-__all__ = ['LLMService', 'StorageService', 'SummaryService', 'PredictionService']
\ No newline at end of file
+__all__ = ['LLMService', 'AsyncLLMService', 'StorageService', 'SummaryService', 'PredictionService']
\ No newline at end of file
@@ -0,0 +1,232 @@
+# 异步大语言模型服务类
+
+import os
+import atexit
+import asyncio
+import threading
+import contextvars
+import concurrent.futures
+from config import LLM_CONFIG, LLM_RETRY_CONFIG
+from services.client_pool import ClientPool
+from services.llm_service import LLMService
+from services.resilience import CircuitOpenError, is_retryable_error, backoff_delay
+
+class AsyncLLMService(LLMService):
+    """异步大语言模型服务类，在同一个事件循环中并发执行相互独立的模型调用
+    
+    与LLMService共用提示构建、响应缓存和优先级调度；通过信号量限制本实例同时进行中的请求数。
+    """
+    
+    def __init__(self, max_concurrency=None, priority=None, rate_limiter=None):
+        """初始化异步LLM服务
+        
+        Args:
+            max_concurrency (int, optional): 最大并发请求数，默认使用配置中的值
+            priority (str, optional): 请求优先级，见LLMService
+            rate_limiter (RateLimiter, optional): 只作用于本实例请求的限流器，见LLMService
+        """
+        super().__init__(priority, rate_limiter)
+        self.max_concurrency = max_concurrency or LLM_CONFIG['max_concurrency']
+        self._semaphore = None
+        self._semaphore_loop = None
+    
+    def _get_semaphore(self):
+        """获取当前事件循环对应的并发信号量"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+    
+    def _init_async_client(self):
+        """获取当前事件循环共享的异步方舟客户端"""
+        return ClientPool.get_async_client(
+            os.environ.get("ARK_API_KEY", self.api_key),
+            self.timeout,
+            self.connect_timeout,
+        )
+    
+    async def _acall_with_retry(self, arequest):
+        """异步版本的熔断保护与退避重试，等待重试期间不占用并发名额
+        
+        Args:
+            arequest (callable): 返回一次模型请求协程的无参函数
+            
+        Returns:
+            object: 请求的返回值
+            
+        Raises:
+            CircuitOpenError: 熔断器处于打开状态
+        """
+        breaker = self.circuit_breaker
+        attempt = 0
+        while True:
+            if not breaker.allow_request():
+                raise CircuitOpenError(breaker.retry_after())
+            
+            try:
+                async with self._get_semaphore():
+                    async with self.scheduler.aslot(self._request_priority()):
+                        await self.rate_limiter.aacquire()
+                        if self.scoped_rate_limiter:
+                            await self.scoped_rate_limiter.aacquire()
+                        result = await arequest()
+            except Exception as e:
+                if not is_retryable_error(e):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if attempt >= LLM_RETRY_CONFIG['max_retries']:
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"LLM API调用失败，{delay:.1f}秒后重试（第{attempt + 1}次）: {e}")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            
+            breaker.record_success()
+            return result
+    
+    async def agenerate_response(self, prompt, system_prompt=None, use_cache=True, task='default'):
+        """异步生成模型响应
+        
+        Args:
+            prompt (str): 用户输入的提示
+            system_prompt (str, optional): 系统提示
+            use_cache (bool, optional): 是否使用响应缓存，为False时强制重新请求模型
+            task (str, optional): 任务类型，决定请求的超时时间，见LLM_TASK_TIMEOUTS
+            
+        Returns:
+            str: 模型生成的响应内容
+        """
+        # 读写磁盘缓存可能等待其他进程的数据库锁，放到线程中执行，不阻塞事件循环
+        cache_key, cached = await asyncio.to_thread(self._cache_lookup, prompt, system_prompt, use_cache)
+        if cached is not None:
+            return cached
+        
+        error = self._oversized_prompt_error(prompt, system_prompt)
+        if error:
+            return error
+        
+        try:
+            response = await self._acall_with_retry(lambda: self._init_async_client().chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(prompt, system_prompt),
+                timeout=self._request_timeout(task)
+            ))
+            content = response.choices[0].message.content
+            await asyncio.to_thread(self._cache_store, cache_key, content)
+            return content
+        except Exception as e:
+            print(f"LLM API调用失败: {e}")
+            return f"错误: 无法获取模型响应 - {str(e)}"
+    
+    async def asummarize_text(self, text, max_length=300):
+        """异步总结文本内容
+        
+        Args:
+            text (str): 要总结的文本
+            max_length (int, optional): 总结的最大长度
+            
+        Returns:
+            str: 总结后的文本
+        """
+        return await self.agenerate_response(*self._summarize_prompts(text, max_length), task='summary')
+    
+    async def aextract_info_from_text(self, text, info_type, use_cache=True):
+        """异步从文本中提取特定类型的信息
+        
+        Args:
+            text (str): 源文本
+            info_type (str): 要提取的信息类型描述
+            use_cache (bool, optional): 是否使用响应缓存
+            
+        Returns:
+            str: 提取的信息
+        """
+        return await self.agenerate_response(*self._extract_info_prompts(text, info_type), use_cache=use_cache, task='extract')
+    
+    async def aanalyze_interview_answer(self, question, answer, resume_info=None):
+        """异步分析面试回答质量
+        
+        Args:
+            question (str): 面试问题
+            answer (str): 面试回答
+            resume_info (str, optional): 个人简历信息
+            
+        Returns:
+            str: 分析结果和改进建议
+        """
+        return await self.agenerate_response(*self._analyze_answer_prompts(question, answer, resume_info), task='analyze')
+    
+    # 同步代码调用协程时使用的后台事件循环，进程内共享；异步客户端绑定在该事件循环上，连接在多次调用之间复用
+    _loop = None
+    _loop_pid = None
+    _loop_lock = threading.Lock()
+    
+    @classmethod
+    def _get_loop(cls):
+        """获取（必要时启动）后台事件循环"""
+        with cls._loop_lock:
+            # fork出的子进程没有父进程的事件循环线程，需要重新启动
+            if cls._loop is None or cls._loop_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='async-llm-loop', daemon=True).start()
+                if cls._loop_pid is None:
+                    atexit.register(cls.shutdown)
+                cls._loop, cls._loop_pid = loop, os.getpid()
+            return cls._loop
+    
+    @classmethod
+    def shutdown(cls, timeout=5):
+        """关闭后台事件循环上的异步客户端并停止事件循环（进程退出时自动调用）"""
+        with cls._loop_lock:
+            loop, cls._loop = cls._loop, None
+            if loop is None or cls._loop_pid != os.getpid():
+                return
+        try:
+            asyncio.run_coroutine_threadsafe(ClientPool.aclose_async_clients(), loop).result(timeout)
+        except Exception as e:
+            print(f"关闭异步方舟客户端失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+    
+    @classmethod
+    def run(cls, coro):
+        """在同步代码中运行协程并返回结果
+        
+        协程提交到进程内共享的后台事件循环执行，调用线程阻塞等待结果；
+        在事件循环内部调用时同样会阻塞该事件循环直到协程结束，异步代码中应直接await。
+        
+        Args:
+            coro (coroutine): 要运行的协程
+            
+        Returns:
+            object: 协程的返回值
+        """
+        loop = cls._get_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise RuntimeError("不能在后台事件循环中同步等待协程，请直接await")
+        
+        future = concurrent.futures.Future()
+        
+        def _start():
+            task = loop.create_task(coro)
+            
+            def _done(task):
+                if task.cancelled():
+                    future.cancel()
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result())
+            
+            task.add_done_callback(_done)
+        
+        # 在调用方的上下文中创建任务，沿用其中的请求优先级等设置
+        loop.call_soon_threadsafe(_start, context=contextvars.copy_context())
+        return future.result()
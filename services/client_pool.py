@@ -0,0 +1,123 @@
+# 方舟客户端共享池
+
+import asyncio
+import threading
+import weakref
+import httpx
+from volcenginesdkarkruntime import Ark, AsyncArk
+from config import LLM_POOL_CONFIG
+
+class ClientPool:
+    """方舟客户端共享池，进程内按 (api_key, timeout, connect_timeout) 复用客户端及其HTTP长连接
+    
+    客户端在第一次真正发起模型调用时才创建，之后所有LLMService实例共享同一个客户端，
+    底层的httpx连接池开启keep-alive，避免每次调用都重新建立TLS连接。
+    SDK自带的重试被关闭，重试与熔断统一由LLMService负责。
+    """
+    
+    _clients = {}
+    # 异步客户端的连接绑定在事件循环上，因此按事件循环分别维护
+    _async_clients = weakref.WeakKeyDictionary()
+    _lock = threading.Lock()
+    
+    @classmethod
+    def get_client(cls, api_key, timeout, connect_timeout=None):
+        """获取（必要时创建）共享的方舟客户端
+        
+        Args:
+            api_key (str): 方舟API Key
+            timeout (float): 默认读取超时时间（秒）
+            connect_timeout (float, optional): 建立连接的超时时间（秒）
+            
+        Returns:
+            Ark: 共享的方舟客户端
+        """
+        key = (api_key, timeout, connect_timeout)
+        client = cls._clients.get(key)
+        if client is not None:
+            return client
+        
+        with cls._lock:
+            # 双重检查，避免并发时重复创建
+            client = cls._clients.get(key)
+            if client is None:
+                client = cls._create_client(api_key, timeout, connect_timeout)
+                cls._clients[key] = client
+        
+        return client
+    
+    @classmethod
+    def get_async_client(cls, api_key, timeout, connect_timeout=None):
+        """获取当前事件循环共享的异步方舟客户端（必须在事件循环中调用）
+        
+        Args:
+            api_key (str): 方舟API Key
+            timeout (float): 默认读取超时时间（秒）
+            connect_timeout (float, optional): 建立连接的超时时间（秒）
+            
+        Returns:
+            AsyncArk: 当前事件循环共享的异步方舟客户端
+        """
+        loop = asyncio.get_running_loop()
+        key = (api_key, timeout, connect_timeout)
+        
+        with cls._lock:
+            clients = cls._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                http_timeout = httpx.Timeout(timeout, connect=connect_timeout)
+                client = AsyncArk(
+                    api_key=api_key,
+                    timeout=http_timeout,
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(timeout=http_timeout, limits=cls._limits()),
+                )
+                clients[key] = client
+        
+        return client
+    
+    @staticmethod
+    def _limits():
+        """连接池限制配置"""
+        return httpx.Limits(
+            max_connections=LLM_POOL_CONFIG['max_connections'],
+            max_keepalive_connections=LLM_POOL_CONFIG['max_keepalive_connections'],
+            keepalive_expiry=LLM_POOL_CONFIG['keepalive_expiry'],
+        )
+    
+    @classmethod
+    def _create_client(cls, api_key, timeout, connect_timeout=None):
+        """创建带长连接池的方舟客户端"""
+        http_timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        return Ark(
+            api_key=api_key,
+            timeout=http_timeout,
+            max_retries=0,
+            http_client=httpx.Client(timeout=http_timeout, limits=cls._limits()),
+        )
+    
+    @classmethod
+    def close_all(cls):
+        """关闭并清空所有共享客户端"""
+        with cls._lock:
+            clients = list(cls._clients.values())
+            cls._clients.clear()
+        
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                print(f"关闭方舟客户端失败: {e}")
+    
+    @classmethod
+    async def aclose_async_clients(cls):
+        """关闭当前事件循环上的异步客户端（事件循环结束前调用）"""
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            clients = list(cls._async_clients.pop(loop, {}).values())
+        
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                print(f"关闭异步方舟客户端失败: {e}")
\ No newline at end of file
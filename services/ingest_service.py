@@ -0,0 +1,231 @@
+# 简历批量导入服务类
+
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from utils.file_utils import FileUtils
+from utils.file_parser import FileParser
+from services.llm_service import LLMService
+from services.resilience import PriorityScheduler
+from services.storage import StorageService
+from config import INGEST_CONFIG, SUPPORTED_RESUME_FORMATS, PDF_PARSE_CONFIG
+
+def _init_parse_worker():
+    """解析进程的初始化函数：关闭PDF的多进程解析，避免每个解析进程再各自创建进程池"""
+    PDF_PARSE_CONFIG['parallel'] = False
+
+def _warm_parse_cache(file_path):
+    """在工作进程中解析简历文件，结果写入磁盘上的解析缓存，供主进程导入时直接读取
+    
+    Args:
+        file_path (str): 简历文件路径
+        
+    Returns:
+        str: 简历文件路径
+    """
+    with FileUtils.map_file(file_path) as content:
+        FileParser.parse_file(file_path, content)
+    return file_path
+
+class IngestService:
+    """简历批量导入服务类，把一个目录下的简历全部导入
+    
+    文件解析（CPU密集）在进程池中完成并写入解析缓存（解析进程内不再并行解析PDF），解析完成的文件随即交给有限大小的线程池，
+    复用Resume.ingest完成保存、去重和大模型信息提取，同时进行的模型调用数不超过线程数。
+    每个文件处理完后记录到检查点清单中，中断后重新运行会跳过已完成且未修改的文件。
+    """
+    
+    def __init__(self, parse_workers=None, extract_concurrency=None):
+        """初始化批量导入服务
+        
+        Args:
+            parse_workers (int, optional): 解析进程数，默认使用CPU核数
+            extract_concurrency (int, optional): 同时进行信息提取的简历数
+        """
+        self.parse_workers = parse_workers or INGEST_CONFIG['parse_workers'] or os.cpu_count() or 1
+        self.extract_concurrency = extract_concurrency or INGEST_CONFIG['extract_concurrency']
+        self.llm_service = LLMService()
+        self.storage_service = StorageService()
+        self._lock = threading.Lock()
+    
+    def ingest_directory(self, directory, recursive=False, restart=False, on_progress=None):
+        """导入目录下的全部简历
+        
+        Args:
+            directory (str): 简历所在目录
+            recursive (bool, optional): 是否包含子目录
+            restart (bool, optional): 是否忽略检查点清单，全部重新导入
+            on_progress (callable, optional): 每处理完一个文件调用一次，参数为进度字典
+            
+        Returns:
+            dict: 导入结果统计，包含total、skipped、done、duplicate、failed和各文件的结果
+        """
+        directory = os.path.abspath(directory)
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"目录不存在: {directory}")
+        
+        manifest_path = self._manifest_path(directory)
+        manifest = {} if restart else self._load_manifest(manifest_path)
+        files = self._list_files(directory, recursive)
+        
+        # 跳过检查点中已完成且大小、修改时间未变化的文件
+        pending = []
+        for file_path in files:
+            key = os.path.relpath(file_path, directory)
+            record = manifest.get(key)
+            if record and record.get('status') == 'done' and record.get('signature') == self._signature(file_path):
+                continue
+            pending.append(file_path)
+        
+        stats = {
+            'total': len(files),
+            'skipped': len(files) - len(pending),
+            'done': 0,
+            'duplicate': 0,
+            'failed': 0,
+            'results': [],
+        }
+        if not pending:
+            return stats
+        
+        started = time.monotonic()
+        processed = 0
+        with ProcessPoolExecutor(max_workers=min(self.parse_workers, len(pending)), initializer=_init_parse_worker) as parse_pool, \
+                ThreadPoolExecutor(max_workers=self.extract_concurrency) as extract_pool:
+            parse_futures = {parse_pool.submit(_warm_parse_cache, file_path): file_path for file_path in pending}
+            extract_futures = set()
+            
+            # 解析和提取在同一个循环中处理：解析完成一个就提交提取，提取完成一个就写检查点并报告进度
+            while parse_futures or extract_futures:
+                done, _ = wait(set(parse_futures) | extract_futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in parse_futures:
+                        file_path = parse_futures.pop(future)
+                        try:
+                            future.result()
+                        except Exception as e:
+                            # 解析进程出错时仍然交给导入流程，由其在主进程中重新解析并记录错误
+                            print(f"预解析简历失败 ({file_path}): {e}")
+                        extract_futures.add(extract_pool.submit(self._ingest_file, file_path))
+                        continue
+                    
+                    extract_futures.discard(future)
+                    result = future.result()
+                    processed += 1
+                    self._record_result(result, directory, manifest, manifest_path, stats)
+                    if on_progress:
+                        self._report_progress(on_progress, result, processed, len(pending), started)
+        
+        return stats
+    
+    def _record_result(self, result, directory, manifest, manifest_path, stats):
+        """把单个文件的处理结果写入检查点清单并计入统计"""
+        key = os.path.relpath(result['file_path'], directory)
+        with self._lock:
+            manifest[key] = {
+                'status': result['status'],
+                'signature': result['signature'],
+                'resume_id': result.get('resume_id'),
+                'error': result.get('error'),
+                'time': datetime.now().isoformat(),
+            }
+            self._save_manifest(manifest_path, directory, manifest)
+        
+        stats['results'].append(result)
+        stats['failed' if result['status'] == 'failed' else 'done'] += 1
+        if result.get('duplicate'):
+            stats['duplicate'] += 1
+    
+    @staticmethod
+    def _report_progress(on_progress, result, processed, pending, started):
+        """报告进度、吞吐量和预计剩余时间"""
+        elapsed = time.monotonic() - started
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        on_progress({
+            'processed': processed,
+            'pending': pending,
+            'file_path': result['file_path'],
+            'status': result['status'],
+            'resume_id': result.get('resume_id'),
+            'error': result.get('error'),
+            'rate': rate,
+            'eta': (pending - processed) / rate if rate > 0 else None,
+        })
+    
+    def _ingest_file(self, file_path):
+        """导入单个文件（在线程池中执行），返回处理结果"""
+        from models.resume import Resume
+        
+        result = {'file_path': file_path, 'signature': self._signature(file_path)}
+        
+        # 模型服务熔断中时不再提交新的提取，保留为未完成，下次运行时重试
+        if not self.llm_service.is_available():
+            result.update(status='failed', error=f"模型服务暂时不可用: {self.llm_service.breaker_state()}")
+            return result
+        
+        try:
+            # 批量导入让位于交互请求
+            with PriorityScheduler.use(PriorityScheduler.BULK):
+                resume = Resume().ingest(file_path)
+        except Exception as e:
+            result.update(status='failed', error=str(e))
+            return result
+        
+        result.update(resume_id=resume.resume_id, duplicate=resume.duplicate)
+        # 只有提取结果已保存才算完成，否则下次运行时重新提取
+        entry = self.storage_service.get_resume_entry(resume.resume_id, refresh=False)
+        if entry and entry.get('profile'):
+            result['status'] = 'done'
+        else:
+            result.update(status='failed', error=resume.user_info.get('error', "未提取到有效的简历信息"))
+        return result
+    
+    @staticmethod
+    def _list_files(directory, recursive):
+        """列出目录下支持的简历文件"""
+        if not recursive:
+            return sorted(FileUtils.list_files(directory, SUPPORTED_RESUME_FORMATS))
+        
+        files = []
+        for root, _, names in os.walk(directory):
+            files.extend(
+                os.path.join(root, name) for name in names
+                if FileUtils.get_file_extension(name) in SUPPORTED_RESUME_FORMATS
+            )
+        return sorted(files)
+    
+    @staticmethod
+    def _signature(file_path):
+        """文件的大小和修改时间，用于判断已完成的文件之后是否被修改"""
+        stat = os.stat(file_path)
+        return [stat.st_size, stat.st_mtime_ns]
+    
+    @staticmethod
+    def _manifest_path(directory):
+        """目录对应的检查点清单路径"""
+        digest = hashlib.sha256(directory.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(INGEST_CONFIG['manifest_dir'], f"{digest}.json")
+    
+    @staticmethod
+    def _load_manifest(manifest_path):
+        """读取检查点清单"""
+        if not os.path.exists(manifest_path):
+            return {}
+        try:
+            return FileUtils.load_json(manifest_path).get('files', {})
+        except Exception as e:
+            print(f"读取导入检查点失败，将重新导入全部文件: {e}")
+            return {}
+    
+    @staticmethod
+    def _save_manifest(manifest_path, directory, files):
+        """原子写入检查点清单"""
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'directory': directory, 'files': files}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, manifest_path)
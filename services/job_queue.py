@@ -0,0 +1,480 @@
+# 后台任务队列
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from services.resilience import PriorityScheduler
+from config import JOB_QUEUE_CONFIG
+
+class JobQueue:
+    """持久化的后台任务队列，保存在SQLite数据库中，CLI、GUI和worker进程共享
+    
+    任务按优先级（数值越小越先执行）和提交时间依次领取；领取时加租约，worker定期续租，
+    worker进程异常退出后租约过期，任务会被其他worker重新领取。
+    失败的任务按指数退避重试，超过最大尝试次数后标记为失败。
+    相同的幂等键只会对应一个任务；未指定幂等键时，相同类型和参数的任务在排队或执行中时不会重复提交。
+    """
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    
+    # 优先级名称，数值越小越先执行
+    PRIORITIES = {'high': 0, 'normal': 5, 'low': 9}
+    
+    def __init__(self, db_path=None):
+        """初始化任务队列
+        
+        Args:
+            db_path (str, optional): 队列数据库路径
+        """
+        self.db_path = db_path or JOB_QUEUE_CONFIG['path']
+        
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, job_type TEXT, payload TEXT, priority INTEGER, status TEXT, "
+                "attempts INTEGER, max_attempts INTEGER, idempotency_key TEXT UNIQUE, fingerprint TEXT, "
+                "result TEXT, error TEXT, worker TEXT, lease_until REAL, run_after REAL, "
+                "created_at REAL, updated_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, priority, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_fingerprint ON jobs(fingerprint)")
+    
+    @contextmanager
+    def _connect(self):
+        """打开数据库连接（每次操作一个连接，便于多线程、多进程共享），结束时提交并关闭"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _fingerprint(job_type, payload):
+        """任务类型和参数的哈希，用于避免重复提交相同的任务"""
+        text = json.dumps({'type': job_type, 'payload': payload}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _to_dict(row):
+        """把数据库行转换为任务字典"""
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload']) if job['payload'] else {}
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+    
+    @classmethod
+    def priority_value(cls, priority):
+        """把优先级名称或数值转换为数值"""
+        if priority is None:
+            return cls.PRIORITIES['normal']
+        if isinstance(priority, str):
+            if priority not in cls.PRIORITIES:
+                raise ValueError(f"未知的优先级: {priority}")
+            return cls.PRIORITIES[priority]
+        return int(priority)
+    
+    def enqueue(self, job_type, payload=None, priority=None, idempotency_key=None, max_attempts=None):
+        """提交任务
+        
+        Args:
+            job_type (str): 任务类型，见JobWorker.HANDLERS
+            payload (dict, optional): 任务参数（可JSON序列化）
+            priority (str|int, optional): 优先级名称（high/normal/low）或数值，数值越小越先执行
+            idempotency_key (str, optional): 幂等键，相同的键始终返回同一个任务
+            max_attempts (int, optional): 最大尝试次数
+            
+        Returns:
+            dict: 任务字典，created表示是否新建；命中幂等键或已有相同任务在排队、执行中时返回已有任务
+        """
+        payload = payload or {}
+        fingerprint = self._fingerprint(job_type, payload)
+        now = time.time()
+        
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if idempotency_key:
+                row = conn.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE fingerprint = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                    (fingerprint, self.QUEUED, self.RUNNING)
+                ).fetchone()
+            if row is not None:
+                job = self._to_dict(row)
+                # 重复提交的优先级更高时，提升仍在排队的任务的优先级
+                value = self.priority_value(priority)
+                if job['status'] == self.QUEUED and value < job['priority']:
+                    conn.execute("UPDATE jobs SET priority = ?, updated_at = ? WHERE job_id = ?", (value, now, job['job_id']))
+                    job['priority'] = value
+                job['created'] = False
+                return job
+            
+            job_id = uuid.uuid4().hex[:16]
+            conn.execute(
+                "INSERT INTO jobs (job_id, job_type, payload, priority, status, attempts, max_attempts, "
+                "idempotency_key, fingerprint, run_after, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?)",
+                (
+                    job_id, job_type, json.dumps(payload, ensure_ascii=False), self.priority_value(priority),
+                    self.QUEUED, max_attempts or JOB_QUEUE_CONFIG['max_attempts'], idempotency_key,
+                    fingerprint, now, now, now,
+                )
+            )
+            job = self._to_dict(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone())
+            job['created'] = True
+            return job
+    
+    def claim(self, worker, job_types=None):
+        """领取一个可执行的任务：排队中且已到重试时间的任务，或租约已过期且未用完尝试次数的执行中任务
+        
+        租约过期通常意味着worker在执行中崩溃，已用完尝试次数的这类任务直接标记为失败，不再领取。
+        
+        Args:
+            worker (str): worker标识
+            job_types (list, optional): 只领取这些类型的任务
+            
+        Returns:
+            dict: 领取到的任务，没有可执行的任务时返回None
+        """
+        now = time.time()
+        query = (
+            "SELECT * FROM jobs WHERE ((status = ? AND run_after <= ?) "
+            "OR (status = ? AND lease_until < ? AND attempts < max_attempts))"
+        )
+        params = [self.QUEUED, now, self.RUNNING, now]
+        if job_types:
+            query += f" AND job_type IN ({', '.join('?' for _ in job_types)})"
+            params.extend(job_types)
+        query += " ORDER BY priority, created_at LIMIT 1"
+        
+        with self._connect() as conn:
+            # 加写锁后再查询，保证同一个任务只会被一个worker领取
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                (self.FAILED, "执行超时或worker异常退出，已达到最大尝试次数", now, self.RUNNING, now)
+            )
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, lease_until = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (self.RUNNING, worker, now + JOB_QUEUE_CONFIG['lease_seconds'], now, row['job_id'])
+            )
+            return self._to_dict(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (row['job_id'],)).fetchone())
+    
+    def renew(self, job_id, worker):
+        """续租：延长执行中任务的租约
+        
+        Returns:
+            bool: 任务仍由该worker执行时返回True
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE job_id = ? AND status = ? AND worker = ?",
+                (now + JOB_QUEUE_CONFIG['lease_seconds'], now, job_id, self.RUNNING, worker)
+            )
+            return cursor.rowcount > 0
+    
+    def complete(self, job_id, worker, result=None):
+        """标记任务完成并保存结果
+        
+        Args:
+            job_id (str): 任务ID
+            worker (str): 执行该任务的worker标识
+            result (object, optional): 任务结果（可JSON序列化）
+            
+        Returns:
+            bool: 任务仍由该worker执行时返回True；租约已失效、任务被其他worker重新领取时不写入结果，返回False
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE job_id = ? AND status = ? AND worker = ?",
+                (self.DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id, self.RUNNING, worker)
+            )
+            return cursor.rowcount > 0
+    
+    def fail(self, job_id, worker, error, retryable=True):
+        """记录任务失败：未超过最大尝试次数时按指数退避重新排队，否则标记为失败
+        
+        Args:
+            job_id (str): 任务ID
+            worker (str): 执行该任务的worker标识
+            error (str): 错误信息
+            retryable (bool, optional): 是否允许重试
+            
+        Returns:
+            str: 任务的新状态；任务已不由该worker执行（租约失效后被重新领取）时不做修改，返回None
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND status = ? AND worker = ?",
+                (job_id, self.RUNNING, worker)
+            ).fetchone()
+            if row is None:
+                return None
+            if retryable and row['attempts'] < row['max_attempts']:
+                status = self.QUEUED
+                run_after = now + JOB_QUEUE_CONFIG['retry_delay'] * (2 ** (row['attempts'] - 1))
+            else:
+                status, run_after = self.FAILED, now
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, run_after = ?, lease_until = NULL, updated_at = ? WHERE job_id = ?",
+                (status, error, run_after, now, job_id)
+            )
+        return status
+    
+    def release(self, job_id, worker):
+        """worker停止时把执行中的任务放回队列，不计入尝试次数；任务已被其他worker重新领取时不做修改"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), lease_until = NULL, run_after = ?, "
+                "updated_at = ? WHERE job_id = ? AND status = ? AND worker = ?",
+                (self.QUEUED, time.time(), time.time(), job_id, self.RUNNING, worker)
+            )
+    
+    def cancel(self, job_id):
+        """取消排队中的任务
+        
+        Returns:
+            bool: 是否取消成功（执行中或已结束的任务不能取消）
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+                (self.CANCELLED, time.time(), job_id, self.QUEUED)
+            )
+            return cursor.rowcount > 0
+    
+    def get(self, job_id):
+        """按任务ID查询
+        
+        Returns:
+            dict: 任务字典，不存在时返回None
+        """
+        with self._connect() as conn:
+            return self._to_dict(conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone())
+    
+    def list(self, status=None, limit=50):
+        """列出任务，按提交时间倒序
+        
+        Args:
+            status (str, optional): 只列出该状态的任务
+            limit (int, optional): 最多返回的任务数
+            
+        Returns:
+            list: 任务字典列表
+        """
+        with self._connect() as conn:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+    
+    def wait(self, job_id, timeout=None, poll_interval=None):
+        """等待任务结束（完成、失败或取消）
+        
+        Args:
+            job_id (str): 任务ID
+            timeout (float, optional): 最长等待秒数，None表示一直等待
+            poll_interval (float, optional): 查询间隔（秒）
+            
+        Returns:
+            dict: 任务字典，超时时返回当前状态
+        """
+        poll_interval = poll_interval or JOB_QUEUE_CONFIG['poll_interval']
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in (self.DONE, self.FAILED, self.CANCELLED):
+                return job
+            if deadline and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+class JobError(Exception):
+    """任务执行失败；retryable为False时不再重试（如参数错误、数据不存在）"""
+    
+    def __init__(self, message, retryable=True):
+        self.retryable = retryable
+        super().__init__(message)
+
+class JobWorker:
+    """后台任务执行器，从队列中领取任务并执行，可在独立进程中长期运行
+    
+    多个执行线程各自领取任务；执行期间由后台线程定期续租，进程异常退出后任务会被重新领取。
+    """
+    
+    # 任务类型 -> 执行方法
+    HANDLERS = {
+        'summarize_interview': '_run_summarize_interview',
+        'predict_questions': '_run_predict_questions',
+        'extract_resume': '_run_extract_resume',
+    }
+    
+    def __init__(self, queue=None, workers=None, job_types=None):
+        """初始化任务执行器
+        
+        Args:
+            queue (JobQueue, optional): 任务队列
+            workers (int, optional): 执行线程数
+            job_types (list, optional): 只执行这些类型的任务
+        """
+        self.queue = queue or JobQueue()
+        self.workers = max(1, workers or JOB_QUEUE_CONFIG['workers'])
+        self.job_types = job_types or list(self.HANDLERS)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        # 各执行线程正在执行的任务，中断时放回队列
+        self._running = {}
+    
+    def run(self, once=False, on_job=None):
+        """运行执行器，直到被中断；once为True时执行完当前可执行的任务后退出
+        
+        Args:
+            once (bool, optional): 队列为空时是否退出
+            on_job (callable, optional): 每个任务结束时调用，参数为任务字典和状态
+        """
+        threads = [
+            threading.Thread(target=self._loop, args=(f"{self.worker_id}:{i}", once, on_job), daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            # 停止领取新任务，执行中的任务放回队列，不必等待租约过期
+            self._stop.set()
+            for worker, job_id in list(self._running.items()):
+                self.queue.release(job_id, worker)
+            raise
+    
+    def stop(self):
+        """通知执行线程在当前任务结束后退出"""
+        self._stop.set()
+    
+    def _loop(self, worker, once, on_job):
+        """执行线程：循环领取并执行任务"""
+        while not self._stop.is_set():
+            job = self.queue.claim(worker, self.job_types)
+            if job is None:
+                if once:
+                    return
+                self._stop.wait(JOB_QUEUE_CONFIG['poll_interval'])
+                continue
+            
+            self._running[worker] = job['job_id']
+            try:
+                status = self._execute(job, worker)
+            finally:
+                self._running.pop(worker, None)
+            if on_job:
+                on_job(job, status)
+    
+    def _execute(self, job, worker):
+        """执行一个任务并记录结果，返回任务的新状态；租约已失效、任务被其他worker重新领取时丢弃结果并返回None"""
+        handler = getattr(self, self.HANDLERS.get(job['job_type'], ''), None)
+        if handler is None:
+            return self.queue.fail(job['job_id'], worker, f"未知的任务类型: {job['job_type']}", retryable=False)
+        
+        # 执行期间定期续租
+        done = threading.Event()
+        
+        def heartbeat():
+            while not done.wait(JOB_QUEUE_CONFIG['lease_seconds'] / 3):
+                self.queue.renew(job['job_id'], worker)
+        
+        threading.Thread(target=heartbeat, daemon=True).start()
+        # 后台任务的模型请求让位于交互请求，高优先级任务按normal调度
+        priority = PriorityScheduler.NORMAL if job['priority'] <= JobQueue.PRIORITIES['high'] else PriorityScheduler.BULK
+        try:
+            with PriorityScheduler.use(priority):
+                result = handler(**job['payload'])
+        except JobError as e:
+            status = self.queue.fail(job['job_id'], worker, str(e), e.retryable)
+        except (FileNotFoundError, KeyError, ValueError, TypeError) as e:
+            status = self.queue.fail(job['job_id'], worker, f"{type(e).__name__}: {e}", retryable=False)
+        except Exception as e:
+            status = self.queue.fail(job['job_id'], worker, f"{type(e).__name__}: {e}")
+        else:
+            status = JobQueue.DONE if self.queue.complete(job['job_id'], worker, result) else None
+        finally:
+            done.set()
+        
+        if status is None:
+            print(f"任务 {job['job_id']} 的租约已失效并被重新领取，丢弃本次执行结果")
+        return status
+    
+    @staticmethod
+    def _run_summarize_interview(interview_id, force=False):
+        """生成面试总结"""
+        from models.interview import Interview
+        
+        summary = Interview().load(interview_id).generate_summary(force=force)
+        if summary.startswith("错误:"):
+            raise JobError(summary)
+        return {'interview_id': interview_id, 'summary': summary}
+    
+    @staticmethod
+    def _run_predict_questions(target_position, target_company=None, resume_id=None):
+        """预测面试题目"""
+        from models.prediction import Prediction
+        
+        prediction = Prediction(target_position=target_position, target_company=target_company, resume_id=resume_id)
+        recommendations = prediction.generate_predictions().get_recommendations()
+        # 模型调用失败时各部分为以“错误:”开头的信息
+        errors = [
+            item for item in recommendations['recommended_questions'] + recommendations['recommended_topics']
+            + [recommendations['preparation_plan'] or '']
+            if isinstance(item, str) and item.startswith("错误:")
+        ]
+        if errors:
+            raise JobError(errors[0])
+        # 模型调用失败时解析不出列表项，问题列表为空
+        if not recommendations['recommended_questions']:
+            raise JobError("未能生成预测的面试问题")
+        return recommendations
+    
+    @staticmethod
+    def _run_extract_resume(resume_id, force=False):
+        """提取简历信息"""
+        from models.resume import Resume
+        
+        # 强制重新提取时加载简历不再先提取一次
+        resume = Resume().load(resume_id, extract=not force)
+        user_info = resume.extract_info(force=True) if force else resume.user_info
+        if 'error' in user_info:
+            raise JobError(user_info['error'])
+        # 模型调用失败或熔断降级时各字段为“错误:”信息或“未提取到”，不作为成功结果保存
+        if not Resume._is_valid_profile(user_info):
+            errors = [v for v in user_info.values() if isinstance(v, str) and v.startswith("错误:")]
+            raise JobError(errors[0] if errors else "未能提取到有效的简历信息")
+        return {'resume_id': resume_id, 'user_info': user_info}
@@ -0,0 +1,244 @@
+# 大模型响应缓存
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import atexit
+import threading
+from contextlib import contextmanager
+from config import LLM_CACHE_CONFIG
+
+class LLMCache:
+    """大模型响应的磁盘缓存，按 (model, system_prompt, prompt, params) 的哈希寻址
+
+    缓存存放在SQLite数据库中，CLI和GUI进程可以同时读写；超过容量上限时按最近访问时间
+    淘汰（LRU），并支持可选的过期时间（TTL）。
+
+    读取只执行查询，不开启写事务：命中时的访问时间和命中统计先记在内存中，
+    每隔access_flush_interval秒或写入缓存时批量写回，多个进程同时读取时不会相互阻塞。
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path=None, max_entries=None, max_bytes=None, ttl=None):
+        """初始化缓存
+
+        Args:
+            db_path (str, optional): 缓存数据库路径
+            max_entries (int, optional): 最大缓存条数
+            max_bytes (int, optional): 缓存内容的最大总字节数
+            ttl (float, optional): 过期时间（秒），None表示永不过期
+        """
+        self.db_path = db_path or LLM_CACHE_CONFIG['path']
+        self.max_entries = max_entries or LLM_CACHE_CONFIG['max_entries']
+        self.max_bytes = max_bytes or LLM_CACHE_CONFIG['max_bytes']
+        self.ttl = ttl if ttl is not None else LLM_CACHE_CONFIG['ttl']
+        # 当前进程内的命中统计
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 尚未写回数据库的访问时间和统计计数
+        self._pending_access = {}
+        self._pending_counts = {}
+        self._last_flush = time.monotonic()
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, "
+                "created_at REAL, accessed_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+
+    @classmethod
+    def shared(cls):
+        """获取进程内共享的默认缓存实例
+
+        Returns:
+            LLMCache: 默认缓存实例
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+                    # 进程退出前写回尚未写入的访问时间和统计
+                    atexit.register(cls._shared.flush)
+        return cls._shared
+
+    @contextmanager
+    def _connect(self):
+        """打开数据库连接（每次操作一个连接，便于多线程、多进程共享），结束时提交并关闭"""
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model, system_prompt, prompt, params=None):
+        """计算缓存键
+
+        Args:
+            model (str): 模型名称
+            system_prompt (str): 系统提示
+            prompt (str): 用户提示
+            params (dict, optional): 其他影响输出的调用参数
+
+        Returns:
+            str: SHA-256缓存键
+        """
+        payload = json.dumps({
+            'model': model,
+            'system_prompt': system_prompt,
+            'prompt': prompt,
+            'params': params or {},
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """读取缓存
+
+        Args:
+            key (str): 缓存键
+
+        Returns:
+            str: 缓存的响应内容，未命中或已过期时返回None
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+        # 过期的条目视为未命中，在下次写入缓存时统一删除
+        if row and self.ttl and now - row[1] > self.ttl:
+            row = None
+
+        name = 'hits' if row else 'misses'
+        with self._lock:
+            if row:
+                self.hits += 1
+                self._pending_access[key] = now
+            else:
+                self.misses += 1
+            self._pending_counts[name] = self._pending_counts.get(name, 0) + 1
+            flush_due = time.monotonic() - self._last_flush >= LLM_CACHE_CONFIG['access_flush_interval']
+
+        if flush_due:
+            self.flush()
+
+        return row[0] if row else None
+
+    def flush(self, conn=None):
+        """把内存中累积的访问时间和统计计数批量写入数据库
+
+        Args:
+            conn (sqlite3.Connection, optional): 已打开的连接，在其事务中写入
+        """
+        with self._lock:
+            access, counts = self._pending_access, self._pending_counts
+            self._pending_access, self._pending_counts = {}, {}
+            self._last_flush = time.monotonic()
+        if not access and not counts:
+            return
+
+        try:
+            if conn is not None:
+                self._write_pending(conn, access, counts)
+            else:
+                with self._connect() as conn:
+                    self._write_pending(conn, access, counts)
+        except sqlite3.OperationalError as e:
+            # 数据库繁忙时放回内存，下次再写
+            with self._lock:
+                for key, accessed_at in access.items():
+                    self._pending_access[key] = max(accessed_at, self._pending_access.get(key, 0))
+                for name, value in counts.items():
+                    self._pending_counts[name] = self._pending_counts.get(name, 0) + value
+            print(f"写入缓存访问记录失败，稍后重试: {e}")
+
+    @staticmethod
+    def _write_pending(conn, access, counts):
+        """在一个事务中写入访问时间和统计计数"""
+        conn.executemany(
+            "UPDATE entries SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in access.items()]
+        )
+        conn.executemany(
+            "INSERT INTO stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            list(counts.items())
+        )
+
+    def set(self, key, response, model=None):
+        """写入缓存，并在超出容量时按LRU淘汰
+
+        Args:
+            key (str): 缓存键
+            response (str): 响应内容
+            model (str, optional): 模型名称
+        """
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, model, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now)
+            )
+            # 淘汰前写回访问时间，LRU按最新的访问顺序淘汰
+            self.flush(conn)
+            self._evict(conn)
+
+    def _evict(self, conn):
+        """淘汰过期条目以及最久未访问的条目，直到满足容量限制"""
+        if self.ttl:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl,))
+
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        rows = conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+        evicted = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def stats(self):
+        """获取缓存统计信息
+
+        Returns:
+            dict: 包含本进程和全局命中/未命中次数、条目数和总大小
+        """
+        self.flush()
+        with self._connect() as conn:
+            totals = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'total_hits': totals.get('hits', 0),
+            'total_misses': totals.get('misses', 0),
+            'entries': count,
+            'bytes': total,
+        }
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._pending_access = {}
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
@@ -1,53 +1,399 @@
 # 大语言模型服务类
 
 import os
-from volcenginesdkarkruntime import Ark
-from config import LLM_CONFIG
+import re
+import json
+import time
+from collections import namedtuple
+import httpx
+from config import LLM_CONFIG, LLM_CACHE_CONFIG, LLM_TASK_TIMEOUTS, LLM_RETRY_CONFIG, STRUCTURED_EXTRACTION_CONFIG, PROMPT_BUDGET_CONFIG
+from services.client_pool import ClientPool
+from services.llm_cache import LLMCache
+from services.resilience import CircuitBreaker, RateLimiter, PriorityScheduler, CircuitOpenError, is_retryable_error, backoff_delay
+from services.prompt_builder import PromptBuilder
+
+# 流式输出的增量片段：kind为'reasoning'（思考过程）或'content'（回答内容）
+StreamDelta = namedtuple('StreamDelta', ['kind', 'text'])
 
 class LLMService:
     """大语言模型服务类，封装火山引擎方舟大模型API调用"""
     
-    def __init__(self):
-        """初始化LLM服务"""
+    def __init__(self, priority=None, rate_limiter=None):
+        """初始化LLM服务
+        
+        这里只记录配置，不创建客户端；第一次调用模型时才从共享池中借用客户端。
+        
+        Args:
+            priority (str, optional): 请求优先级（interactive/normal/bulk），未指定时使用调用时上下文中的优先级，
+                见PriorityScheduler.use；都未设置时为normal
+            rate_limiter (RateLimiter, optional): 只作用于本实例请求的限流器（如一次批量总结的速率），
+                与共享限流器同时生效
+        """
+        self.priority = priority
+        self.scoped_rate_limiter = rate_limiter
         self.api_key = LLM_CONFIG['api_key']
         self.model = LLM_CONFIG['model']
         self.timeout = LLM_CONFIG['timeout']
-        self.client = self._init_client()
+        self.connect_timeout = LLM_CONFIG['connect_timeout']
+        self.cache = LLMCache.shared() if LLM_CACHE_CONFIG['enabled'] else None
+    
+    @property
+    def circuit_breaker(self):
+        """当前模型对应的进程内共享熔断器"""
+        return CircuitBreaker.get(self.model)
+    
+    @property
+    def rate_limiter(self):
+        """当前模型对应的进程内共享限流器"""
+        return RateLimiter.get(self.model)
+    
+    @property
+    def scheduler(self):
+        """当前模型对应的进程内共享优先级调度器"""
+        return PriorityScheduler.get(self.model)
+    
+    def scheduler_state(self):
+        """获取优先级调度器各类别的排队数、执行数和排队等待时间"""
+        return self.scheduler.stats()
+    
+    def _request_priority(self):
+        """本次请求的优先级"""
+        return self.priority or PriorityScheduler.current()
+    
+    def is_available(self):
+        """模型服务当前是否可用（熔断器未打开）
+        
+        Returns:
+            bool: 是否可用，为False时调用会立即返回错误，调用方可直接降级
+        """
+        return self.circuit_breaker.state != CircuitBreaker.OPEN
+    
+    def breaker_state(self):
+        """获取熔断器状态
+        
+        Returns:
+            dict: 包含状态（closed/open/half_open）和距离下次试探的秒数
+        """
+        breaker = self.circuit_breaker
+        return {
+            'state': breaker.state,
+            'retry_after': breaker.retry_after(),
+        }
+    
+    @property
+    def client(self):
+        """从共享池中获取方舟客户端（按需创建，进程内复用）"""
+        return self._init_client()
     
     def _init_client(self):
-        """初始化方舟客户端"""
-        return Ark(
-            api_key=os.environ.get("ARK_API_KEY", self.api_key),
-            timeout=self.timeout,
+        """获取方舟客户端"""
+        return ClientPool.get_client(
+            os.environ.get("ARK_API_KEY", self.api_key),
+            self.timeout,
+            self.connect_timeout,
         )
     
-    def generate_response(self, prompt, system_prompt=None):
-        """生成模型响应
+    def _request_timeout(self, task):
+        """获取指定任务的请求超时（连接超时 + 读取超时）
+        
+        流式请求的读取超时针对相邻两段输出之间的间隔，而不是整个响应。
+        """
+        read_timeout = LLM_TASK_TIMEOUTS.get(task, LLM_TASK_TIMEOUTS['default'])
+        return httpx.Timeout(read_timeout, connect=self.connect_timeout)
+    
+    def _call_with_retry(self, request):
+        """在熔断器保护下执行请求，可重试的错误按指数退避加抖动重试
+        
+        每次请求先按优先级领取调度名额再获取限流令牌；流式请求在流建立后即归还名额。
         
         Args:
-            prompt (str): 用户输入的提示
-            system_prompt (str, optional): 系统提示
+            request (callable): 发起一次模型请求的无参函数
             
         Returns:
-            str: 模型生成的响应内容
+            object: 请求的返回值
+            
+        Raises:
+            CircuitOpenError: 熔断器处于打开状态
         """
+        breaker = self.circuit_breaker
+        attempt = 0
+        while True:
+            if not breaker.allow_request():
+                raise CircuitOpenError(breaker.retry_after())
+            
+            try:
+                # 领取名额后再获取令牌，限流等待的请求不超过并发名额数，交互请求不会排在大量批量请求之后
+                with self.scheduler.slot(self._request_priority()):
+                    self.rate_limiter.acquire()
+                    if self.scoped_rate_limiter:
+                        self.scoped_rate_limiter.acquire()
+                    result = request()
+            except Exception as e:
+                if not is_retryable_error(e):
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if attempt >= LLM_RETRY_CONFIG['max_retries']:
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"LLM API调用失败，{delay:.1f}秒后重试（第{attempt + 1}次）: {e}")
+                time.sleep(delay)
+                attempt += 1
+                continue
+            
+            breaker.record_success()
+            return result
+    
+    def _build_messages(self, prompt, system_prompt=None):
+        """构建对话消息列表"""
         messages = []
         
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
-            
+        
         messages.append({"role": "user", "content": prompt})
         
+        return messages
+    
+    def estimate_prompt_tokens(self, prompt, system_prompt=None):
+        """发送前在本地估算提示的token数
+        
+        Args:
+            prompt (str): 用户输入的提示
+            system_prompt (str, optional): 系统提示
+            
+        Returns:
+            int: 估算的token数
+        """
+        return PromptBuilder.estimate_tokens(prompt) + PromptBuilder.estimate_tokens(system_prompt)
+    
+    def _oversized_prompt_error(self, prompt, system_prompt):
+        """提示预计超过上限时返回拒绝发送的错误信息，否则返回None"""
+        tokens = self.estimate_prompt_tokens(prompt, system_prompt)
+        if tokens > PROMPT_BUDGET_CONFIG['max_prompt_tokens']:
+            print(f"提示预计{tokens} tokens，超过上限{PROMPT_BUDGET_CONFIG['max_prompt_tokens']}，拒绝发送")
+            return f"错误: 提示过长，预计{tokens} tokens"
+        return None
+    
+    def _cache_lookup(self, prompt, system_prompt, use_cache):
+        """查询响应缓存
+        
+        Returns:
+            tuple: (缓存键, 缓存内容)，未启用缓存时缓存键为None，未命中时缓存内容为None
+        """
+        if not self.cache:
+            return None, None
+        
+        cache_key = LLMCache.make_key(self.model, system_prompt, prompt)
+        if not use_cache:
+            return cache_key, None
+        
+        return cache_key, self.cache.get(cache_key)
+    
+    def _cache_store(self, cache_key, content):
+        """写入响应缓存，只缓存成功的响应；强制刷新时同样写回缓存"""
+        if cache_key and content:
+            self.cache.set(cache_key, content, self.model)
+    
+    def generate_response(self, prompt, system_prompt=None, use_cache=True, stream=False, task='default'):
+        """生成模型响应
+        
+        Args:
+            prompt (str): 用户输入的提示
+            system_prompt (str, optional): 系统提示
+            use_cache (bool, optional): 是否使用响应缓存，为False时强制重新请求模型
+            stream (bool, optional): 是否流式返回，为True时返回StreamDelta生成器
+            task (str, optional): 任务类型，决定请求的超时时间，见LLM_TASK_TIMEOUTS
+            
+        Returns:
+            str: 模型生成的响应内容；stream为True时返回逐段产出StreamDelta的生成器
+        """
+        if stream:
+            return self._stream_response(prompt, system_prompt, use_cache, task)
+        
+        cache_key, cached = self._cache_lookup(prompt, system_prompt, use_cache)
+        if cached is not None:
+            return cached
+        
+        error = self._oversized_prompt_error(prompt, system_prompt)
+        if error:
+            return error
+        
         try:
-            response = self.client.chat.completions.create(
+            response = self._call_with_retry(lambda: self.client.chat.completions.create(
                 model=self.model,
-                messages=messages
-            )
-            return response.choices[0].message.content
+                messages=self._build_messages(prompt, system_prompt),
+                timeout=self._request_timeout(task)
+            ))
+            content = response.choices[0].message.content
+            self._cache_store(cache_key, content)
+            return content
         except Exception as e:
             print(f"LLM API调用失败: {e}")
             return f"错误: 无法获取模型响应 - {str(e)}"
     
+    def _stream_response(self, prompt, system_prompt, use_cache, task):
+        """流式生成模型响应，思考过程和回答内容分开产出
+        
+        Yields:
+            StreamDelta: 增量片段
+        """
+        cache_key, cached = self._cache_lookup(prompt, system_prompt, use_cache)
+        if cached is not None:
+            yield StreamDelta('content', cached)
+            return
+        
+        error = self._oversized_prompt_error(prompt, system_prompt)
+        if error:
+            yield StreamDelta('content', error)
+            return
+        
+        content_parts = []
+        response = None
+        try:
+            # 只在建立流之前重试；已经输出内容后出错不再重试，避免重复输出
+            response = self._call_with_retry(lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(prompt, system_prompt),
+                stream=True,
+                timeout=self._request_timeout(task)
+            ))
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                reasoning = getattr(delta, 'reasoning_content', None)
+                if reasoning:
+                    yield StreamDelta('reasoning', reasoning)
+                if delta.content:
+                    content_parts.append(delta.content)
+                    yield StreamDelta('content', delta.content)
+        except Exception as e:
+            # 流建立之后的中断同样计入熔断统计（建立之前的失败已在重试逻辑中计入）
+            if response is not None and is_retryable_error(e):
+                self.circuit_breaker.record_failure()
+            print(f"LLM API调用失败: {e}")
+            yield StreamDelta('content', f"错误: 无法获取模型响应 - {str(e)}")
+            return
+        
+        self._cache_store(cache_key, ''.join(content_parts))
+    
+    def _summarize_prompts(self, text, max_length):
+        """构建文本总结的提示，返回 (prompt, system_prompt)"""
+        system_prompt = f"你是一个专业的文本总结助手。请将下面的文本总结为{max_length}字以内的内容，保持关键信息完整。"
+        prompt = text
+        
+        return prompt, system_prompt
+    
+    def _extract_info_prompts(self, text, info_type):
+        """构建信息提取的提示，返回 (prompt, system_prompt)"""
+        system_prompt = "你是一个信息提取助手。请根据用户要求从文本中提取相关信息。"
+        prompt = f"请从下面的文本中提取{info_type}：\n\n{text}"
+        
+        return prompt, system_prompt
+    
+    def _structured_extract_prompts(self, text, fields):
+        """构建一次提取多个字段的提示，要求模型返回JSON对象，返回 (prompt, system_prompt)"""
+        system_prompt = "你是一个信息提取助手。请根据用户要求从文本中提取相关信息，只输出一个JSON对象，不要输出其他内容。"
+        keys = "、".join(f'"{field}"' for field in fields)
+        prompt = (
+            f"请从下面的文本中提取以下信息，并以JSON对象返回，键必须为：{keys}。\n"
+            f"每个键的值为字符串；文本中没有相关信息时填写\"{STRUCTURED_EXTRACTION_CONFIG['missing_value']}\"。\n\n{text}"
+        )
+        
+        return prompt, system_prompt
+    
+    @staticmethod
+    def _parse_structured_response(response, fields):
+        """解析并校验结构化提取结果
+        
+        Args:
+            response (str): 模型响应文本
+            fields (list): 期望的字段列表
+            
+        Returns:
+            dict: 通过校验的字段（值为非空字符串），缺失或无效的字段不包含在内
+        """
+        if not response or response.startswith("错误:"):
+            return {}
+        
+        # 去掉可能存在的 ```json 代码块标记，取第一个 { 到最后一个 } 之间的内容
+        text = re.sub(r'^```(?:json)?|```$', '', response.strip(), flags=re.MULTILINE)
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end <= start:
+            return {}
+        
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        
+        valid = {}
+        for field in fields:
+            value = data.get(field)
+            # 列表和对象统一转为字符串，保持user_info中的值均为字符串
+            if isinstance(value, list):
+                value = "\n".join(v if isinstance(v, str) else json.dumps(v, ensure_ascii=False) for v in value)
+            elif isinstance(value, dict):
+                value = json.dumps(value, ensure_ascii=False)
+            elif value is not None and not isinstance(value, str):
+                value = str(value)
+            if value and value.strip():
+                valid[field] = value.strip()
+        
+        return valid
+    
+    def extract_structured_info(self, text, fields, max_reask=None, use_cache=True):
+        """一次调用提取多个字段，校验后只针对缺失的字段重新询问
+        
+        Args:
+            text (str): 源文本
+            fields (list): 要提取的字段列表
+            max_reask (int, optional): 缺失字段的最大重新询问次数
+            use_cache (bool, optional): 首次询问是否使用响应缓存
+            
+        Returns:
+            dict: 字段到提取结果的映射，顺序与fields一致，始终包含全部字段
+        """
+        if max_reask is None:
+            max_reask = STRUCTURED_EXTRACTION_CONFIG['max_reask']
+        
+        extracted = {}
+        missing = list(fields)
+        for attempt in range(max_reask + 1):
+            if attempt > 0:
+                print(f"结构化提取缺少字段，重新询问: {missing}")
+            # 重新询问时跳过缓存，避免重复拿到同一个无法解析的响应
+            response = self.generate_response(
+                *self._structured_extract_prompts(text, missing),
+                use_cache=(use_cache and attempt == 0),
+                task='extract'
+            )
+            extracted.update(self._parse_structured_response(response, missing))
+            missing = [field for field in missing if field not in extracted]
+            if not missing:
+                break
+        
+        return {field: extracted.get(field, "未提取到") for field in fields}
+    
+    def _analyze_answer_prompts(self, question, answer, resume_info=None):
+        """构建面试回答分析的提示，返回 (prompt, system_prompt)"""
+        system_prompt = "你是一个行业专家。请分析下面的面试回答，提供反馈和改进建议。"
+        prompt = f"面试问题：{question}\n\n面试回答：{answer}\n\n请分析这个回答的优点和不足，并给出具体的改进建议。"
+        if resume_info:
+            prompt = f"个人简历：{resume_info}\n\n" + prompt
+        
+        return prompt, system_prompt
+    
+    def _predict_questions_prompts(self, resume_info, job_description, num_questions):
+        """构建面试问题预测的提示，返回 (prompt, system_prompt)"""
+        system_prompt = "你是一个经验丰富的面试官。请根据候选人的简历和岗位描述，预测可能的面试问题。"
+        prompt = f"简历摘要：{resume_info}\n\n岗位描述：{job_description}\n\n请预测{num_questions}个最可能的面试问题，包括技术问题和行为问题，主要针对候选人的过往经历以及延伸的技术问题，你的问题应当聚焦，项目的出发点，项目的难点，项目的解决方法。"
+        
+        return prompt, system_prompt
+    
     def summarize_text(self, text, max_length=300):
         """总结文本内容
         
@@ -58,40 +404,33 @@ class LLMService:
         Returns:
             str: 总结后的文本
         """
-        system_prompt = f"你是一个专业的文本总结助手。请将下面的文本总结为{max_length}字以内的内容，保持关键信息完整。"
-        prompt = text
-        
-        return self.generate_response(prompt, system_prompt)
+        return self.generate_response(*self._summarize_prompts(text, max_length), task='summary')
     
-    def extract_info_from_text(self, text, info_type):
+    def extract_info_from_text(self, text, info_type, use_cache=True):
         """从文本中提取特定类型的信息
         
         Args:
             text (str): 源文本
             info_type (str): 要提取的信息类型描述
+            use_cache (bool, optional): 是否使用响应缓存
             
         Returns:
             str: 提取的信息
         """
-        system_prompt = "你是一个信息提取助手。请根据用户要求从文本中提取相关信息。"
-        prompt = f"请从下面的文本中提取{info_type}：\n\n{text}"
-        
-        return self.generate_response(prompt, system_prompt)
+        return self.generate_response(*self._extract_info_prompts(text, info_type), use_cache=use_cache, task='extract')
     
-    def analyze_interview_answer(self, question, answer):
+    def analyze_interview_answer(self, question, answer, resume_info=None):
         """分析面试回答质量
         
         Args:
             question (str): 面试问题
             answer (str): 面试回答
+            resume_info (str, optional): 个人简历信息
             
         Returns:
             str: 分析结果和改进建议
         """
-        system_prompt = "你是一个行业专家。请分析下面的面试回答，提供反馈和改进建议。"
-        prompt = f"个人简历：{resume_info}\n\n面试问题：{question}\n\n面试回答：{answer}\n\n请分析这个回答的优点和不足，并给出具体的改进建议。"
-        
-        return self.generate_response(prompt, system_prompt)
+        return self.generate_response(*self._analyze_answer_prompts(question, answer, resume_info), task='analyze')
     
     def predict_questions(self, resume_info, job_description, num_questions=10):
         """根据简历和岗位描述预测可能的面试问题
@@ -104,7 +443,4 @@ class LLMService:
         Returns:
             str: 预测的面试问题列表
         """
-        system_prompt = "你是一个经验丰富的面试官。请根据候选人的简历和岗位描述，预测可能的面试问题。"
-        prompt = f"简历摘要：{resume_info}\n\n岗位描述：{job_description}\n\n请预测{num_questions}个最可能的面试问题，包括技术问题和行为问题，主要针对候选人的过往经历以及延伸的技术问题，你的问题应当聚焦，项目的出发点，项目的难点，项目的解决方法。"
-        
-        return self.generate_response(prompt, system_prompt)
\ No newline at end of file
+        return self.generate_response(*self._predict_questions_prompts(resume_info, job_description, num_questions), task='predict')
@@ -1,14 +1,16 @@
 # 面试预测服务类
 
-from services.llm_service import LLMService
+import asyncio
+from services.async_llm_service import AsyncLLMService
 from services.storage import StorageService
+from services.prompt_builder import PromptBuilder
 
 class PredictionService:
     """面试预测服务类，负责基于简历和岗位信息预测面试题目"""
     
     def __init__(self):
         """初始化预测服务"""
-        self.llm_service = LLMService()
+        self.llm_service = AsyncLLMService()
         self.storage_service = StorageService()
     
     def predict_interview_questions(self, resume_content, target_position, target_company=None, num_questions=10):
@@ -23,34 +25,10 @@ class PredictionService:
         Returns:
             list: 预测的面试问题列表
         """
-        # 获取历史面试数据，用于参考
-        historical_interviews = self.storage_service.list_interviews()
-        
-        # 构建历史面试问题参考文本
-        historical_questions = []
-        for interview in historical_interviews:
-            # 如果有相同或相似岗位的面试，优先参考
-            if target_position.lower() in interview.get('position', '').lower():
-                for qa in interview.get('questions_answers', []):
-                    historical_questions.append(qa.get('question', ''))
-        
-        # 构建预测提示
-        system_prompt = "你是一个经验丰富的面试官。请根据候选人的简历、目标岗位和历史面试问题，预测可能的面试问题。"
-        
-        prompt = f"简历内容：{resume_content[:1000]}...\n\n"
-        prompt += f"目标岗位：{target_position}\n\n"
-        
-        if target_company:
-            prompt += f"目标公司：{target_company}\n\n"
-        
-        if historical_questions:
-            prompt += "历史类似岗位的面试问题参考：\n"
-            prompt += "\n".join(historical_questions[:10]) + "\n\n"
-        
-        prompt += f"请预测{num_questions}个最可能的面试问题，你的问题应当聚焦，项目的出发点，项目的难点，项目的解决方法。，按重要性排序。"
+        prompt, system_prompt = self._question_prompts(resume_content, target_position, target_company, num_questions)
         
         # 获取预测结果
-        prediction_result = self.llm_service.generate_response(prompt, system_prompt)
+        prediction_result = self.llm_service.generate_response(prompt, system_prompt, task='predict')
         
         # 解析预测结果为问题列表
         questions = self._parse_prediction_result(prediction_result)
@@ -67,17 +45,10 @@ class PredictionService:
         Returns:
             list: 推荐的学习主题列表
         """
-        system_prompt = "你是一个专业的职业顾问。请根据目标岗位和候选人简历，推荐需要学习和准备的主题。"
-        
-        prompt = f"目标岗位：{target_position}\n\n"
-        
-        if resume_content:
-            prompt += f"候选人简历摘要：{resume_content[:500]}...\n\n"
-        
-        prompt += "请列出10个最重要的学习和准备主题，包括技术技能、知识点和面试技巧。"
+        prompt, system_prompt = self._topic_prompts(target_position, resume_content)
         
         # 获取推荐结果
-        recommendation_result = self.llm_service.generate_response(prompt, system_prompt)
+        recommendation_result = self.llm_service.generate_response(prompt, system_prompt, task='predict')
         
         # 解析推荐结果为主题列表
         topics = self._parse_prediction_result(recommendation_result)
@@ -96,15 +67,97 @@ class PredictionService:
         Returns:
             dict: 包含预测问题、学习主题和准备建议的综合结果
         """
-        # 预测面试问题
-        predicted_questions = self.predict_interview_questions(
-            resume_content, target_position, target_company
+        return AsyncLLMService.run(
+            self.aprepare_interview(resume_content, target_position, target_company, interview_date)
         )
+    
+    async def aprepare_interview(self, resume_content, target_position, target_company=None, interview_date=None):
+        """异步综合准备面试，预测问题和推荐学习主题并发执行，完成后再生成准备计划
         
-        # 推荐学习主题
-        recommended_topics = self.recommend_study_topics(target_position, resume_content)
+        Args:
+            resume_content (str): 简历内容文本
+            target_position (str): 目标岗位
+            target_company (str, optional): 目标公司
+            interview_date (str, optional): 面试日期
+            
+        Returns:
+            dict: 包含预测问题、学习主题和准备建议的综合结果
+        """
+        num_questions = 10
+        
+        # 预测面试问题和推荐学习主题相互独立，并发请求
+        prediction_result, recommendation_result = await asyncio.gather(
+            self.llm_service.agenerate_response(
+                *self._question_prompts(resume_content, target_position, target_company, num_questions),
+                task='predict'
+            ),
+            self.llm_service.agenerate_response(
+                *self._topic_prompts(target_position, resume_content),
+                task='predict'
+            ),
+        )
+        predicted_questions = self._parse_prediction_result(prediction_result)[:num_questions]
+        recommended_topics = self._parse_prediction_result(recommendation_result)[:10]
         
         # 生成综合准备建议
+        preparation_plan = await self.llm_service.agenerate_response(
+            *self._plan_prompts(target_position, target_company, interview_date, predicted_questions, recommended_topics),
+            task='predict'
+        )
+        
+        return {
+            'predicted_questions': predicted_questions,
+            'recommended_topics': recommended_topics,
+            'preparation_plan': preparation_plan
+        }
+    
+    def _question_prompts(self, resume_content, target_position, target_company, num_questions):
+        """构建面试问题预测的提示，返回 (prompt, system_prompt)"""
+        # 获取历史面试数据，用于参考
+        historical_interviews = self.storage_service.list_interviews()
+        
+        # 构建历史面试问题参考文本
+        historical_questions = []
+        for interview in historical_interviews:
+            # 如果有相同或相似岗位的面试，优先参考
+            if target_position.lower() in interview.get('position', '').lower():
+                for qa in interview.get('questions_answers', []):
+                    historical_questions.append(qa.get('question', ''))
+        
+        # 构建预测提示
+        system_prompt = "你是一个经验丰富的面试官。请根据候选人的简历、目标岗位和历史面试问题，预测可能的面试问题。"
+        
+        # 按token预算装入内容：岗位和要求必须包含，简历优先于历史问题，超出预算时截断
+        builder = PromptBuilder(task='predict')
+        builder.add(f"简历内容：{resume_content}\n\n", priority=1, name='简历')
+        builder.add(f"目标岗位：{target_position}\n\n", required=True)
+        
+        if target_company:
+            builder.add(f"目标公司：{target_company}\n\n", required=True)
+        
+        if historical_questions:
+            builder.add("历史类似岗位的面试问题参考：\n" + "\n".join(historical_questions[:10]) + "\n\n", priority=2, name='历史问题')
+        
+        builder.add(f"请预测{num_questions}个最可能的面试问题，你的问题应当聚焦，项目的出发点，项目的难点，项目的解决方法。，按重要性排序。", required=True)
+        
+        return builder.build(system_prompt), system_prompt
+    
+    def _topic_prompts(self, target_position, resume_content=None):
+        """构建学习主题推荐的提示，返回 (prompt, system_prompt)"""
+        system_prompt = "你是一个专业的职业顾问。请根据目标岗位和候选人简历，推荐需要学习和准备的主题。"
+        
+        builder = PromptBuilder(task='predict')
+        builder.add(f"目标岗位：{target_position}\n\n", required=True)
+        
+        if resume_content:
+            builder.add(f"候选人简历摘要：{resume_content}\n\n", priority=1, name='简历')
+        
+        builder.add("请列出10个最重要的学习和准备主题，包括技术技能、知识点和面试技巧。", required=True)
+        
+        return builder.build(system_prompt), system_prompt
+    
+    def _plan_prompts(self, target_position, target_company, interview_date, predicted_questions, recommended_topics):
+        """构建面试准备计划的提示，返回 (prompt, system_prompt)"""
         system_prompt = "你是一个专业的面试教练。请根据目标岗位、预测的面试问题和推荐的学习主题，提供综合的面试准备建议。"
         
         prompt = f"目标岗位：{target_position}\n\n"
@@ -121,13 +174,7 @@ class PredictionService:
         
         prompt += "请提供一份详细的面试准备计划和建议，包括时间安排、重点内容和准备方法。"
         
-        preparation_plan = self.llm_service.generate_response(prompt, system_prompt)
-        
-        return {
-            'predicted_questions': predicted_questions,
-            'recommended_topics': recommended_topics,
-            'preparation_plan': preparation_plan
-        }
+        return prompt, system_prompt
     
     def _parse_prediction_result(self, text):
         """解析预测结果文本为列表
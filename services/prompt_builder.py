@@ -0,0 +1,207 @@
+# 提示构建工具
+
+import re
+from config import PROMPT_BUDGET_CONFIG
+
+# 中日韩文字、字母数字串和其他非空白符号
+_TOKEN_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[A-Za-z0-9]+|[^\sA-Za-z0-9]')
+
+class PromptBudgetError(Exception):
+    """必须包含的内容超出任务的token预算时抛出，表示拒绝发送该提示"""
+    
+    def __init__(self, task, estimated_tokens, budget):
+        self.task = task
+        self.estimated_tokens = estimated_tokens
+        self.budget = budget
+        super().__init__(f"提示过长：{task}任务预计{estimated_tokens} tokens，超过预算{budget} tokens")
+
+class PromptBuilder:
+    """按token预算构建提示
+    
+    各部分内容带有优先级，按优先级依次装入任务的token预算（见PROMPT_BUDGET_CONFIG），
+    放不下的可压缩内容截断到剩余预算，剩余预算过少时舍弃；必须包含的内容放不下时拒绝构建。
+    输出时各部分保持添加顺序。token数用本地规则估算，不调用分词器。
+    """
+    
+    TRUNCATED_NOTE = "……（内容过长，已截断）"
+    
+    def __init__(self, task='default', budget=None):
+        """初始化提示构建器
+        
+        Args:
+            task (str, optional): 任务类型，决定默认预算
+            budget (int, optional): token预算，默认使用任务的配置
+        """
+        budgets = PROMPT_BUDGET_CONFIG['budgets']
+        self.task = task
+        self.budget = budget or budgets.get(task, budgets['default'])
+        self.parts = []
+        self.report = None
+    
+    @staticmethod
+    def estimate_tokens(text):
+        """估算文本的token数：每个汉字计1个，字母数字串每4个字符计1个，其他符号各计1个
+        
+        Args:
+            text (str): 文本
+            
+        Returns:
+            int: 估算的token数
+        """
+        if not text:
+            return 0
+        tokens = 0
+        for match in _TOKEN_PATTERN.finditer(text):
+            word = match.group()
+            tokens += (len(word) + 3) // 4 if word[0].isascii() and word[0].isalnum() else 1
+        return tokens
+    
+    @staticmethod
+    def truncate(text, max_tokens):
+        """截断文本，使其估算token数不超过max_tokens
+        
+        Args:
+            text (str): 文本
+            max_tokens (int): 最大token数
+            
+        Returns:
+            str: 截断后的文本
+        """
+        if PromptBuilder.estimate_tokens(text) <= max_tokens:
+            return text
+        
+        # 二分查找满足预算的最长前缀
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if PromptBuilder.estimate_tokens(text[:middle]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low]
+    
+    @staticmethod
+    def split_text(text, max_tokens):
+        """把超过max_tokens的文本按行切分为多段，单行过长时再按字符切分
+        
+        Args:
+            text (str): 文本
+            max_tokens (int): 每段的最大token数
+            
+        Returns:
+            list: 文本段列表，拼接后与原文相同
+        """
+        if PromptBuilder.estimate_tokens(text) <= max_tokens:
+            return [text]
+        
+        pieces = []
+        for line in text.splitlines(keepends=True):
+            while PromptBuilder.estimate_tokens(line) > max_tokens:
+                head = PromptBuilder.truncate(line, max_tokens) or line[0]
+                pieces.append(head)
+                line = line[len(head):]
+            if line:
+                pieces.append(line)
+        return PromptBuilder.pack(pieces, max_tokens)
+    
+    @staticmethod
+    def pack(items, max_tokens):
+        """按顺序把多段文本合并为尽量少的分组，每组不超过max_tokens（单段超出时单独成组）
+        
+        Args:
+            items (list): 文本段列表
+            max_tokens (int): 每组的最大token数
+            
+        Returns:
+            list: 合并后的文本列表
+        """
+        groups = []
+        current, current_tokens = [], 0
+        for item in items:
+            tokens = PromptBuilder.estimate_tokens(item)
+            if current and current_tokens + tokens > max_tokens:
+                groups.append(''.join(current))
+                current, current_tokens = [], 0
+            current.append(item)
+            current_tokens += tokens
+        if current:
+            groups.append(''.join(current))
+        return groups
+    
+    def add(self, text, priority=1, name=None, required=False):
+        """添加一部分内容
+        
+        Args:
+            text (str): 内容
+            priority (int, optional): 优先级，数值越小越先装入预算
+            name (str, optional): 名称，用于报告截断或舍弃的内容
+            required (bool, optional): 是否必须完整包含（不截断也不舍弃）
+            
+        Returns:
+            PromptBuilder: 当前构建器，便于链式调用
+        """
+        if text:
+            self.parts.append({
+                'text': text,
+                'priority': priority,
+                'name': name or f"part{len(self.parts) + 1}",
+                'required': required,
+            })
+        return self
+    
+    def build(self, system_prompt=None):
+        """在预算内构建提示
+        
+        Args:
+            system_prompt (str, optional): 系统提示，计入预算
+            
+        Returns:
+            str: 构建的提示
+            
+        Raises:
+            PromptBudgetError: 必须包含的内容超出预算
+        """
+        remaining = self.budget - self.estimate_tokens(system_prompt)
+        required_tokens = sum(self.estimate_tokens(part['text']) for part in self.parts if part['required'])
+        if required_tokens > remaining:
+            raise PromptBudgetError(self.task, self.budget - remaining + required_tokens, self.budget)
+        remaining -= required_tokens
+        
+        note_tokens = self.estimate_tokens(self.TRUNCATED_NOTE)
+        min_tokens = PROMPT_BUDGET_CONFIG['min_part_tokens']
+        texts = {}
+        truncated, dropped = [], []
+        # 优先级相同时先添加的先装入
+        order = sorted(range(len(self.parts)), key=lambda i: self.parts[i]['priority'])
+        for i in order:
+            part = self.parts[i]
+            if part['required']:
+                texts[i] = part['text']
+                continue
+            
+            tokens = self.estimate_tokens(part['text'])
+            if tokens <= remaining:
+                texts[i] = part['text']
+                remaining -= tokens
+            elif remaining - note_tokens >= min_tokens:
+                # 截断时保留原内容末尾的换行，使后续内容仍然另起一段
+                body = part['text'].rstrip()
+                tail = part['text'][len(body):]
+                texts[i] = self.truncate(body, remaining - note_tokens) + self.TRUNCATED_NOTE + tail
+                remaining -= self.estimate_tokens(texts[i])
+                truncated.append(part['name'])
+            else:
+                dropped.append(part['name'])
+        
+        prompt = ''.join(texts[i] for i in range(len(self.parts)) if i in texts)
+        self.report = {
+            'task': self.task,
+            'budget': self.budget,
+            'estimated_tokens': self.estimate_tokens(prompt) + self.estimate_tokens(system_prompt),
+            'truncated': truncated,
+            'dropped': dropped,
+        }
+        if truncated or dropped:
+            print(f"提示超出{self.task}任务预算，预计{self.report['estimated_tokens']}/{self.budget} tokens，"
+                  f"截断: {truncated or '无'}，舍弃: {dropped or '无'}")
+        return prompt
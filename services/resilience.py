@@ -0,0 +1,427 @@
+# 模型调用容错工具：重试退避、熔断器、限流器与优先级调度器
+
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from config import LLM_RETRY_CONFIG, LLM_BREAKER_CONFIG, LLM_RATE_LIMIT_CONFIG, LLM_SCHEDULER_CONFIG
+
+# 可重试的HTTP状态码：限流和服务端错误
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+def is_retryable_error(error):
+    """判断异常是否值得重试（超时、连接失败、限流、服务端错误）
+    
+    Args:
+        error (Exception): 模型调用抛出的异常
+        
+    Returns:
+        bool: 是否可重试
+    """
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    
+    name = type(error).__name__
+    return any(keyword in name for keyword in ('Timeout', 'Connection', 'Network', 'Protocol'))
+
+def backoff_delay(attempt):
+    """计算第attempt次重试前的等待时间（指数退避 + 全抖动）
+    
+    Args:
+        attempt (int): 重试序号，从0开始
+        
+    Returns:
+        float: 等待秒数
+    """
+    ceiling = min(LLM_RETRY_CONFIG['max_delay'], LLM_RETRY_CONFIG['base_delay'] * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后进入打开状态并快速失败，冷却时间过后放行一次试探请求
+    
+    状态：closed（正常）、open（熔断中，直接拒绝）、half_open（试探中）
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    _registry = {}
+    _registry_lock = threading.Lock()
+    
+    def __init__(self, failure_threshold=None, recovery_timeout=None):
+        """初始化熔断器
+        
+        Args:
+            failure_threshold (int, optional): 连续失败多少次后熔断
+            recovery_timeout (float, optional): 熔断后多少秒允许试探请求
+        """
+        self.failure_threshold = failure_threshold or LLM_BREAKER_CONFIG['failure_threshold']
+        self.recovery_timeout = recovery_timeout or LLM_BREAKER_CONFIG['recovery_timeout']
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def get(cls, name):
+        """获取指定名称（通常为模型名）的进程内共享熔断器
+        
+        Args:
+            name (str): 熔断器名称
+            
+        Returns:
+            CircuitBreaker: 熔断器实例
+        """
+        with cls._registry_lock:
+            breaker = cls._registry.get(name)
+            if breaker is None:
+                breaker = cls()
+                cls._registry[name] = breaker
+            return breaker
+    
+    @property
+    def state(self):
+        """当前状态（open状态冷却结束后视为half_open）"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+    
+    def retry_after(self):
+        """距离允许试探请求还需等待的秒数，未熔断时为0"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+    
+    def allow_request(self):
+        """判断当前是否允许发起请求
+        
+        Returns:
+            bool: 是否允许
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            
+            # half_open：同一时间只放行一个试探请求
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+    
+    def record_success(self):
+        """记录一次成功调用，恢复为正常状态"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self):
+        """记录一次失败调用，达到阈值或试探失败时熔断"""
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+    
+    def release(self):
+        """请求以非服务端原因结束（如参数错误）时释放试探名额，不改变计数"""
+        with self._lock:
+            self._probe_in_flight = False
+
+class RateLimiter:
+    """令牌桶限流器：按固定速率补充令牌，每次请求消耗一个令牌，令牌不足时等待
+    
+    等待时先预约令牌再睡眠，多个线程或协程同时等待时按到达顺序依次放行。
+    速率为None时不限流。
+    """
+    
+    _registry = {}
+    _registry_lock = threading.Lock()
+    
+    def __init__(self, requests_per_minute=None, burst=None):
+        """初始化限流器
+        
+        Args:
+            requests_per_minute (float, optional): 每分钟允许的请求数，None表示不限流
+            burst (int, optional): 令牌桶容量，即允许的突发请求数
+        """
+        self._lock = threading.Lock()
+        self.configure(requests_per_minute, burst)
+    
+    @classmethod
+    def get(cls, name):
+        """获取指定名称（通常为模型名）的进程内共享限流器
+        
+        Args:
+            name (str): 限流器名称
+            
+        Returns:
+            RateLimiter: 限流器实例
+        """
+        with cls._registry_lock:
+            limiter = cls._registry.get(name)
+            if limiter is None:
+                limiter = cls(LLM_RATE_LIMIT_CONFIG['requests_per_minute'], LLM_RATE_LIMIT_CONFIG['burst'])
+                cls._registry[name] = limiter
+            return limiter
+    
+    def configure(self, requests_per_minute=None, burst=None):
+        """修改限流速率，令牌桶重新装满
+        
+        Args:
+            requests_per_minute (float, optional): 每分钟允许的请求数，None表示不限流
+            burst (int, optional): 令牌桶容量
+        """
+        with self._lock:
+            self.rate = requests_per_minute / 60.0 if requests_per_minute else None
+            self.burst = max(1, burst or LLM_RATE_LIMIT_CONFIG['burst'])
+            self._tokens = float(self.burst)
+            self._updated_at = time.monotonic()
+    
+    def _reserve(self):
+        """预约一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+    
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def aacquire(self):
+        """异步获取一个令牌，令牌不足时挂起等待"""
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+# 当前上下文中模型调用的优先级，见PriorityScheduler.use
+_current_priority = contextvars.ContextVar('llm_priority', default=None)
+
+class PriorityScheduler:
+    """模型请求的优先级调度器：按优先级分类排队，加权公平地分配进程内的并发名额
+    
+    优先级分为interactive（用户正在等待的对话、回答分析）、normal（默认）和bulk（批量总结、后台任务、批量导入）。
+    每类有独立的等待队列、权重和并发上限（见LLM_SCHEDULER_CONFIG）。有空闲名额时，在未达到上限且有请求等待的类别中
+    选择虚拟时间最小的一类放行，放行后该类的虚拟时间增加1/权重，因此各类按权重比例分配名额，低优先级也不会饿死；
+    bulk的并发上限低于总名额，交互请求到达时总能较快拿到名额。
+    
+    同步调用（线程）和异步调用（协程，可以位于不同线程的事件循环中）共用同一个调度器。
+    调度只在单个进程内生效：另一个进程（例如GUI运行时在命令行执行的summarize_all）中的请求不经过本进程的调度器，
+    仍会与本进程的请求争用同一个API Key的限额；与GUI同时运行批量总结时，可以用summarize_all --rpm限制批量请求的速率。
+    """
+    
+    INTERACTIVE = 'interactive'
+    NORMAL = 'normal'
+    BULK = 'bulk'
+    
+    _registry = {}
+    _registry_lock = threading.Lock()
+    
+    def __init__(self, max_concurrency=None, classes=None):
+        """初始化调度器
+        
+        Args:
+            max_concurrency (int, optional): 同时进行中的请求总数上限
+            classes (dict, optional): 各优先级的权重和并发上限，按优先级从高到低排列
+        """
+        classes = classes or LLM_SCHEDULER_CONFIG['classes']
+        self.max_concurrency = max_concurrency or LLM_SCHEDULER_CONFIG['max_concurrency']
+        self.weights = {name: float(c['weight']) for name, c in classes.items()}
+        self.limits = {name: min(c['max_concurrency'], self.max_concurrency) for name, c in classes.items()}
+        self._order = list(classes)
+        self._queues = {name: deque() for name in classes}
+        self._running = {name: 0 for name in classes}
+        self._pass = {name: 0.0 for name in classes}
+        self._virtual_time = 0.0
+        self._waits = {name: deque(maxlen=LLM_SCHEDULER_CONFIG['stats_window']) for name in classes}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def get(cls, name):
+        """获取指定名称（通常为模型名）的进程内共享调度器
+        
+        Args:
+            name (str): 调度器名称
+            
+        Returns:
+            PriorityScheduler: 调度器实例
+        """
+        with cls._registry_lock:
+            scheduler = cls._registry.get(name)
+            if scheduler is None:
+                scheduler = cls()
+                cls._registry[name] = scheduler
+            return scheduler
+    
+    @staticmethod
+    @contextmanager
+    def use(priority):
+        """在with块内把未指定优先级的模型调用归为priority类
+        
+        优先级保存在上下文变量中，对块内创建的服务对象和asyncio任务同样有效；
+        新建的线程不会继承，需要在线程内部再次设置。
+        
+        Args:
+            priority (str): 优先级（interactive/normal/bulk）
+        """
+        token = _current_priority.set(priority)
+        try:
+            yield
+        finally:
+            _current_priority.reset(token)
+    
+    @staticmethod
+    def current():
+        """当前上下文的优先级，未设置时为None"""
+        return _current_priority.get()
+    
+    def priority_class(self, priority):
+        """校验优先级名称，None视为normal"""
+        priority = priority or self.NORMAL
+        if priority not in self._queues:
+            raise ValueError(f"未知的优先级: {priority}")
+        return priority
+    
+    def _submit(self, priority, grant):
+        """把请求加入对应类别的等待队列，grant为分到名额时调用的回调（在锁内调用，不能阻塞）"""
+        ticket = {'priority': self.priority_class(priority), 'grant': grant,
+                  'queued_at': time.monotonic(), 'granted': False}
+        with self._lock:
+            queue = self._queues[ticket['priority']]
+            # 由空闲转为排队的类别从当前虚拟时间开始计算，不能用空闲期间积累的额度插队
+            if not queue:
+                self._pass[ticket['priority']] = max(self._pass[ticket['priority']], self._virtual_time)
+            queue.append(ticket)
+            self._dispatch()
+        return ticket
+    
+    def _dispatch(self):
+        """在锁内分配空闲名额"""
+        while sum(self._running.values()) < self.max_concurrency:
+            candidates = [
+                name for name in self._order
+                if self._queues[name] and self._running[name] < self.limits[name]
+            ]
+            if not candidates:
+                return
+            # 虚拟时间相同时优先级高的类别优先
+            name = min(candidates, key=lambda n: (self._pass[n], self._order.index(n)))
+            ticket = self._queues[name].popleft()
+            try:
+                ticket['grant']()
+            except RuntimeError:
+                # 等待方的事件循环已经关闭，不再需要名额
+                continue
+            ticket['granted'] = True
+            self._running[name] += 1
+            self._virtual_time = self._pass[name]
+            self._pass[name] += 1.0 / self.weights[name]
+            self._waits[name].append(time.monotonic() - ticket['queued_at'])
+    
+    def _release(self, priority):
+        """归还名额"""
+        with self._lock:
+            self._running[priority] -= 1
+            self._dispatch()
+    
+    def _cancel(self, ticket):
+        """等待被中断时撤销请求：已分到名额的归还名额，否则移出等待队列"""
+        with self._lock:
+            if not ticket['granted']:
+                self._queues[ticket['priority']].remove(ticket)
+                return
+        self._release(ticket['priority'])
+    
+    @contextmanager
+    def slot(self, priority=None):
+        """在with块内占用一个并发名额，名额不足时阻塞等待
+        
+        Args:
+            priority (str, optional): 优先级，默认为normal
+        """
+        granted = threading.Event()
+        ticket = self._submit(priority, granted.set)
+        try:
+            granted.wait()
+        except BaseException:
+            self._cancel(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self._release(ticket['priority'])
+    
+    @asynccontextmanager
+    async def aslot(self, priority=None):
+        """异步版本的slot，名额不足时挂起等待
+        
+        Args:
+            priority (str, optional): 优先级，默认为normal
+        """
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        
+        def set_granted():
+            if not granted.done():
+                granted.set_result(True)
+        
+        # 名额可能由其他线程释放，需要通过call_soon_threadsafe通知事件循环
+        ticket = self._submit(priority, lambda: loop.call_soon_threadsafe(set_granted))
+        try:
+            await granted
+        except BaseException:
+            self._cancel(ticket)
+            raise
+        try:
+            yield
+        finally:
+            self._release(ticket['priority'])
+    
+    def stats(self):
+        """各优先级的排队数、执行数和最近的排队等待时间
+        
+        Returns:
+            dict: 优先级 -> {'waiting', 'running', 'wait_p50', 'wait_p95'}，等待时间单位为秒
+        """
+        with self._lock:
+            result = {}
+            for name in self._order:
+                waits = sorted(self._waits[name])
+                result[name] = {
+                    'waiting': len(self._queues[name]),
+                    'running': self._running[name],
+                    'wait_p50': waits[len(waits) // 2] if waits else 0.0,
+                    'wait_p95': waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0,
+                }
+            return result
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态时抛出，表示模型服务暂时不可用"""
+    
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"模型服务暂时不可用（已熔断），约{int(retry_after) + 1}秒后重试")
@@ -0,0 +1,308 @@
+# 简历目录服务类
+
+import os
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from utils.file_utils import FileUtils
+from config import RESUMES_DIR, RESUME_BLOBS_DIR, PROFILES_DIR, RESUME_CATALOG_PATH, SUPPORTED_RESUME_FORMATS
+
+try:
+    import fcntl  # 仅类Unix系统可用，用于跨进程互斥
+except ImportError:
+    fcntl = None
+
+class ResumeCatalog:
+    """简历目录，维护 简历ID -> 文件、哈希、大小、上传时间、提取结果 的索引
+    
+    目录保存为一个JSON文件，按简历ID直接查找，无需扫描简历目录；
+    写入时先加跨进程文件锁并重新读取，再原子替换，CLI和GUI进程可以同时使用。
+    
+    上传的简历按内容哈希存放在RESUME_BLOBS_DIR中，简历目录下只保存指向它的引用文件（.ref），
+    因此目录可以随时从磁盘重建。
+    """
+    
+    # 引用文件扩展名，内容为 {"blob": ..., "content_hash": ..., ...}
+    REF_EXTENSION = '.ref'
+    
+    # 简历可以是引用文件、旧版直接保存的文件，也可以是在GUI中创建的JSON
+    CATALOG_FORMATS = SUPPORTED_RESUME_FORMATS + ['.json', REF_EXTENSION]
+    
+    _lock = threading.Lock()
+    
+    # 各目录文件上次与磁盘同步时简历目录的修改时间（进程内共享），目录未变化时不必重新扫描
+    _synced_dir_mtimes = {}
+    
+    def __init__(self, catalog_path=None):
+        """初始化简历目录
+        
+        Args:
+            catalog_path (str, optional): 目录文件路径
+        """
+        self.catalog_path = catalog_path or RESUME_CATALOG_PATH
+        self._entries = None
+        self._signature = None
+    
+    @staticmethod
+    def resume_id_for(file_name):
+        """由简历文件名得到简历ID"""
+        return os.path.basename(file_name).split('.')[0]
+    
+    @contextmanager
+    def _locked(self):
+        """进程内加线程锁，进程间加文件锁"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.catalog_path), exist_ok=True)
+            with open(self.catalog_path + '.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _load(self):
+        """读取目录文件；文件未变化时直接使用内存中的副本，不存在时从磁盘重建"""
+        if not os.path.exists(self.catalog_path):
+            return self.rebuild()
+        
+        signature = self._file_signature()
+        if self._entries is None or signature != self._signature:
+            try:
+                self._entries = FileUtils.load_json(self.catalog_path).get('resumes', {})
+                self._signature = signature
+            except Exception as e:
+                print(f"加载简历目录失败，将从磁盘重建: {e}")
+                return self.rebuild()
+        
+        return self._entries
+    
+    def _write(self, entries):
+        """原子写入目录文件"""
+        temp_path = f"{self.catalog_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'resumes': entries}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.catalog_path)
+        self._entries = entries
+        self._signature = self._file_signature()
+    
+    def _file_signature(self):
+        """目录文件的修改时间和大小，用于判断其他进程是否更新过目录"""
+        stat = os.stat(self.catalog_path)
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _read_for_update(self):
+        """在锁内重新读取最新的目录内容（忽略内存副本）"""
+        self._entries = None
+        if not os.path.exists(self.catalog_path):
+            return {}
+        try:
+            return dict(FileUtils.load_json(self.catalog_path).get('resumes', {}))
+        except Exception:
+            return self._scan_disk({})
+    
+    def get(self, resume_id):
+        """按简历ID查找
+        
+        Args:
+            resume_id (str): 简历ID
+            
+        Returns:
+            dict: 目录条目，不存在时返回None
+        """
+        return self._load().get(resume_id)
+    
+    def list(self):
+        """列出全部简历条目，按上传时间倒序
+        
+        Returns:
+            list: 目录条目列表
+        """
+        entries = list(self._load().values())
+        entries.sort(key=lambda x: x.get('upload_time', ''), reverse=True)
+        return entries
+    
+    def file_path(self, entry):
+        """目录条目对应的简历内容文件路径（按内容哈希存放的文件，或旧版直接保存的文件）"""
+        if entry.get('blob'):
+            return os.path.join(RESUME_BLOBS_DIR, entry['blob'])
+        return os.path.join(RESUMES_DIR, entry['file_name'])
+    
+    def find_by_hash(self, content_hash):
+        """查找内容相同的简历
+        
+        Args:
+            content_hash (str): 文件内容的SHA-256哈希
+            
+        Returns:
+            dict: 最早上传的内容相同的目录条目，不存在时返回None
+        """
+        matches = [entry for entry in self._load().values() if entry.get('content_hash') == content_hash]
+        if not matches:
+            return None
+        return min(matches, key=lambda x: x.get('upload_time', ''))
+    
+    def blob_in_use(self, blob):
+        """判断是否还有简历引用该内容文件"""
+        return any(entry.get('blob') == blob for entry in self._load().values())
+    
+    def add(self, file_path, content_hash, size, original_filename=None, upload_time=None, blob=None):
+        """登记一份新保存的简历
+        
+        Args:
+            file_path (str): 简历目录下的文件路径（引用文件或简历文件）
+            content_hash (str): 文件内容的SHA-256哈希
+            size (int): 文件大小（字节）
+            original_filename (str, optional): 原始文件名
+            upload_time (str, optional): 上传时间
+            blob (str, optional): 按内容哈希存放的文件名
+            
+        Returns:
+            dict: 新的目录条目；按内容存放且已有相同内容的简历时返回已有条目
+        """
+        file_name = os.path.basename(file_path)
+        entry = {
+            'resume_id': self.resume_id_for(file_name),
+            'file_name': file_name,
+            'blob': blob,
+            'content_hash': content_hash,
+            'size': size,
+            'upload_time': upload_time or datetime.now().isoformat(),
+            'original_filename': original_filename,
+            'profile': self._profile_pointer(content_hash),
+        }
+        
+        with self._locked():
+            entries = self._read_for_update()
+            # 在锁内再检查一次，避免并发上传相同内容时登记出两份简历
+            if blob:
+                for existing in entries.values():
+                    if existing.get('content_hash') == content_hash:
+                        return existing
+            entries[entry['resume_id']] = entry
+            self._write(entries)
+        
+        return entry
+    
+    def update(self, resume_id, **fields):
+        """更新目录条目的字段（如提取结果指针）
+        
+        Args:
+            resume_id (str): 简历ID
+            **fields: 要更新的字段
+        """
+        with self._locked():
+            entries = self._read_for_update()
+            if resume_id in entries:
+                entries[resume_id].update(fields)
+                self._write(entries)
+    
+    def remove(self, resume_id):
+        """从目录中移除简历
+        
+        Args:
+            resume_id (str): 简历ID
+        """
+        with self._locked():
+            entries = self._read_for_update()
+            if entries.pop(resume_id, None) is not None:
+                self._write(entries)
+    
+    def refresh(self):
+        """增量同步：登记磁盘上未入目录的简历文件，移除文件已不存在的条目
+        
+        Returns:
+            dict: 同步后的全部条目
+        """
+        with self._locked():
+            # 在扫描之前记录修改时间，扫描期间的变化留到下次同步
+            dir_mtime = self._resumes_dir_mtime()
+            entries = self._scan_disk(self._read_for_update())
+            self._write(entries)
+        self._synced_dir_mtimes[self.catalog_path] = dir_mtime
+        return entries
+    
+    def refresh_if_changed(self):
+        """简历目录自上次同步后有文件增删时才增量同步，否则不扫描磁盘
+        
+        Returns:
+            dict: 同步后的全部条目，目录未变化时返回None
+        """
+        if self._synced_dir_mtimes.get(self.catalog_path) == self._resumes_dir_mtime():
+            return None
+        return self.refresh()
+    
+    def rebuild(self):
+        """忽略现有目录，完全根据磁盘上的简历文件重建
+        
+        Returns:
+            dict: 重建后的全部条目
+        """
+        with self._locked():
+            dir_mtime = self._resumes_dir_mtime()
+            entries = self._scan_disk({})
+            self._write(entries)
+        self._synced_dir_mtimes[self.catalog_path] = dir_mtime
+        return entries
+    
+    @staticmethod
+    def _resumes_dir_mtime():
+        """简历目录的修改时间，目录中有文件增删或改名时变化"""
+        return os.stat(RESUMES_DIR).st_mtime_ns
+    
+    def _scan_disk(self, entries):
+        """扫描简历目录，为未登记的文件计算哈希并登记，移除已删除文件的条目"""
+        on_disk = {}
+        for file_path in FileUtils.list_files(RESUMES_DIR, self.CATALOG_FORMATS):
+            on_disk[self.resume_id_for(file_path)] = file_path
+        
+        result = {}
+        for resume_id, file_path in on_disk.items():
+            entry = entries.get(resume_id)
+            if entry is None or entry.get('file_name') != os.path.basename(file_path):
+                try:
+                    entry = self._entry_from_disk(resume_id, file_path)
+                except Exception as e:
+                    print(f"登记简历文件失败 ({file_path}): {e}")
+                    continue
+            result[resume_id] = entry
+        
+        return result
+    
+    def _entry_from_disk(self, resume_id, file_path):
+        """根据磁盘上的引用文件或简历文件生成目录条目"""
+        file_name = os.path.basename(file_path)
+        if file_name.endswith(self.REF_EXTENSION):
+            ref = FileUtils.load_json(file_path)
+            return {
+                'resume_id': resume_id,
+                'file_name': file_name,
+                'blob': ref['blob'],
+                'content_hash': ref['content_hash'],
+                'size': ref.get('size'),
+                'upload_time': ref.get('upload_time'),
+                'original_filename': ref.get('original_filename'),
+                'profile': self._profile_pointer(ref['content_hash']),
+            }
+        
+        content_hash = FileUtils.hash_file(file_path)
+        return {
+            'resume_id': resume_id,
+            'file_name': file_name,
+            'blob': None,
+            'content_hash': content_hash,
+            'size': os.path.getsize(file_path),
+            'upload_time': datetime.fromtimestamp(os.path.getctime(file_path)).isoformat(),
+            'original_filename': None,
+            'profile': self._profile_pointer(content_hash),
+        }
+    
+    @staticmethod
+    def _profile_pointer(content_hash):
+        """已存在对应提取结果时返回其键（内容哈希），否则返回None"""
+        if os.path.exists(os.path.join(PROFILES_DIR, f"{content_hash}.json")):
+            return content_hash
+        return None
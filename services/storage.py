@@ -2,9 +2,11 @@
 
 import os
 import json
+import threading
 from datetime import datetime
 from utils.file_utils import FileUtils
-from config import RESUMES_DIR, INTERVIEWS_DIR, SUPPORTED_RESUME_FORMATS
+from services.resume_catalog import ResumeCatalog
+from config import RESUMES_DIR, RESUME_BLOBS_DIR, INTERVIEWS_DIR, PROFILES_DIR, SUPPORTED_RESUME_FORMATS
 
 class StorageService:
     """存储服务类，负责管理本地文件的存储和读取"""
@@ -13,32 +15,141 @@ class StorageService:
         """初始化存储服务"""
         # 确保数据目录存在
         os.makedirs(RESUMES_DIR, exist_ok=True)
+        os.makedirs(RESUME_BLOBS_DIR, exist_ok=True)
         os.makedirs(INTERVIEWS_DIR, exist_ok=True)
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        self._catalog = ResumeCatalog()
     
-    def save_resume(self, resume_content, original_filename=None):
+    def save_resume(self, resume_content, original_filename=None, source_path=None):
         """保存简历文件
         
         Args:
-            resume_content (bytes): 简历文件内容
+            resume_content (bytes): 简历文件内容（bytes或内存映射对象），用于计算哈希
             original_filename (str, optional): 原始文件名
+            source_path (str, optional): 源文件路径，提供时直接在内核中复制文件，不再从resume_content写出
             
         Returns:
             str: 保存后的文件路径
         """
+        return self.store_resume(resume_content, original_filename, source_path)['file_path']
+    
+    def store_resume(self, resume_content, original_filename=None, source_path=None):
+        """按内容哈希保存简历，内容与已有简历相同时不再保存，直接返回已有简历
+        
+        简历内容存放在RESUME_BLOBS_DIR/<哈希><扩展名>，简历目录下写入指向它的引用文件<简历ID>.ref。
+        
+        Args:
+            resume_content (bytes): 简历文件内容（bytes或内存映射对象），用于计算哈希
+            original_filename (str, optional): 原始文件名
+            source_path (str, optional): 源文件路径，提供时直接在内核中复制文件，不再从resume_content写出
+            
+        Returns:
+            dict: 目录条目（含file_path），duplicate为True表示是已有的简历
+        """
         # 验证文件格式
+        ext = ''
         if original_filename:
             ext = FileUtils.get_file_extension(original_filename)
             if ext not in SUPPORTED_RESUME_FORMATS:
                 raise ValueError(f"不支持的简历文件格式: {ext}，支持的格式: {SUPPORTED_RESUME_FORMATS}")
         
-        # 生成唯一文件名
-        filename = FileUtils.generate_unique_filename(original_filename)
-        file_path = os.path.join(RESUMES_DIR, filename)
+        # 先计算哈希，重复上传时不再复制文件
+        content_hash = FileUtils.compute_hash(resume_content)
+        existing = self._catalog.find_by_hash(content_hash)
+        if existing:
+            return dict(existing, file_path=self._catalog.file_path(existing), duplicate=True)
         
-        # 保存文件
-        FileUtils.save_file(resume_content, file_path)
+        blob = f"{content_hash}{ext}"
+        blob_path = os.path.join(RESUME_BLOBS_DIR, blob)
+        if not os.path.exists(blob_path):
+            # 同一进程中可能有多个线程同时写入相同内容，临时文件名需区分线程
+            temp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                if source_path:
+                    FileUtils.copy_file(source_path, temp_path)
+                else:
+                    FileUtils.save_file(resume_content, temp_path)
+                os.replace(temp_path, blob_path)
+            except OSError:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                # 另一线程或进程已写入相同内容的文件，视为成功
+                if not os.path.exists(blob_path):
+                    raise
         
-        return file_path
+        # 生成简历ID并写入引用文件
+        resume_id = FileUtils.generate_unique_filename()
+        ref_path = os.path.join(RESUMES_DIR, f"{resume_id}{ResumeCatalog.REF_EXTENSION}")
+        upload_time = datetime.now().isoformat()
+        FileUtils.save_json({
+            'blob': blob,
+            'content_hash': content_hash,
+            'size': len(resume_content),
+            'upload_time': upload_time,
+            'original_filename': original_filename,
+        }, ref_path)
+        
+        # 登记到简历目录
+        entry = self._catalog.add(ref_path, content_hash, len(resume_content), original_filename, upload_time, blob=blob)
+        if entry['resume_id'] != resume_id:
+            # 并发上传了相同内容，另一份已先登记
+            os.remove(ref_path)
+            return dict(entry, file_path=self._catalog.file_path(entry), duplicate=True)
+        return dict(entry, file_path=blob_path, duplicate=False)
+    
+    def register_resume(self, file_path, original_filename=None):
+        """将已写入简历目录的文件（如GUI中创建的JSON简历）登记到简历目录
+        
+        Args:
+            file_path (str): 简历文件路径
+            original_filename (str, optional): 原始文件名
+            
+        Returns:
+            dict: 目录条目
+        """
+        if not file_path.startswith(RESUMES_DIR):
+            raise ValueError("无效的简历文件路径")
+        
+        return self._catalog.add(file_path, FileUtils.hash_file(file_path), os.path.getsize(file_path), original_filename)
+    
+    def get_resume_entry(self, resume_id, refresh=True):
+        """按简历ID查找简历目录条目
+        
+        Args:
+            resume_id (str): 简历ID
+            refresh (bool, optional): 未找到且简历目录自上次同步后有文件增删时，是否先与磁盘同步再查找
+            
+        Returns:
+            dict: 目录条目（含file_path），不存在时返回None
+        """
+        entry = self._catalog.get(resume_id)
+        if entry is None and refresh:
+            # 目录之外写入的文件（如手动复制到简历目录）同步后即可找到；
+            # 简历目录未变化时不再扫描，不存在的ID直接返回None
+            entries = self._catalog.refresh_if_changed()
+            if entries is not None:
+                entry = entries.get(resume_id)
+        
+        if entry is None:
+            return None
+        return dict(entry, file_path=self._catalog.file_path(entry))
+    
+    def update_resume_entry(self, resume_id, **fields):
+        """更新简历目录条目的字段
+        
+        Args:
+            resume_id (str): 简历ID
+            **fields: 要更新的字段
+        """
+        self._catalog.update(resume_id, **fields)
+    
+    def rebuild_resume_catalog(self):
+        """根据磁盘上的简历文件重建简历目录
+        
+        Returns:
+            int: 目录中的简历数量
+        """
+        return len(self._catalog.rebuild())
     
     def get_resume(self, file_path):
         """获取简历文件内容
@@ -56,12 +167,54 @@ class StorageService:
         return FileUtils.read_file(file_path)
     
     def list_resumes(self):
-        """列出所有简历文件
+        """列出所有简历文件（按上传时间倒序）
         
         Returns:
             list: 简历文件路径列表
         """
-        return FileUtils.list_files(RESUMES_DIR, SUPPORTED_RESUME_FORMATS)
+        return [entry['file_path'] for entry in self.list_resume_entries()]
+    
+    def list_resume_entries(self):
+        """列出所有简历目录条目（按上传时间倒序）
+        
+        Returns:
+            list: 目录条目列表（含file_path）
+        """
+        return [dict(entry, file_path=self._catalog.file_path(entry)) for entry in self._catalog.list()]
+    
+    def save_profile(self, content_hash, profile_data):
+        """保存简历提取结果（按简历内容哈希存储）
+        
+        Args:
+            content_hash (str): 简历文件内容的SHA-256哈希
+            profile_data (dict): 提取结果记录
+            
+        Returns:
+            str: 保存后的文件路径
+        """
+        file_path = os.path.join(PROFILES_DIR, f"{content_hash}.json")
+        FileUtils.save_json(profile_data, file_path)
+        
+        return file_path
+    
+    def get_profile(self, content_hash):
+        """获取简历提取结果
+        
+        Args:
+            content_hash (str): 简历文件内容的SHA-256哈希
+            
+        Returns:
+            dict: 提取结果记录，不存在时返回None
+        """
+        file_path = os.path.join(PROFILES_DIR, f"{content_hash}.json")
+        if not os.path.exists(file_path):
+            return None
+        
+        try:
+            return FileUtils.load_json(file_path)
+        except Exception as e:
+            print(f"加载简历提取结果失败 ({file_path}): {e}")
+            return None
     
     def save_interview(self, interview_data):
         """保存面试数据
@@ -81,7 +234,7 @@ class StorageService:
         # 如果没有interview_id，生成一个
         if 'interview_id' not in interview_data:
             interview_data['interview_id'] = FileUtils.generate_unique_filename()
-            
+        
         # 添加保存时间
         interview_data['save_time'] = datetime.now().isoformat()
         
@@ -138,9 +291,35 @@ class StorageService:
         # 确保文件在RESUMES_DIR目录下（安全检查）
         if not file_path.startswith(RESUMES_DIR):
             raise ValueError("无效的简历文件路径")
+        # 按内容哈希存放的文件可能被多份简历引用，只能按简历ID删除
+        if file_path.startswith(RESUME_BLOBS_DIR):
+            raise ValueError("按内容存放的简历文件请使用delete_resume_entry按简历ID删除")
         
         if os.path.exists(file_path):
             os.remove(file_path)
+        
+        self._catalog.remove(ResumeCatalog.resume_id_for(file_path))
+    
+    def delete_resume_entry(self, resume_id):
+        """按简历ID删除简历，内容文件不再被任何简历引用时一并删除
+        
+        Args:
+            resume_id (str): 简历ID
+        """
+        entry = self._catalog.get(resume_id)
+        if entry is None:
+            return
+        
+        file_path = os.path.join(RESUMES_DIR, entry['file_name'])
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        self._catalog.remove(resume_id)
+        
+        blob = entry.get('blob')
+        if blob and not self._catalog.blob_in_use(blob):
+            blob_path = os.path.join(RESUME_BLOBS_DIR, blob)
+            if os.path.exists(blob_path):
+                os.remove(blob_path)
     
     def delete_interview(self, interview_id):
         """删除面试数据
@@ -1,14 +1,44 @@
 # 面试总结服务类
 
-from services.llm_service import LLMService
+import json
+import time
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.llm_service import StreamDelta
+from services.async_llm_service import AsyncLLMService
+from services.resilience import PriorityScheduler, RateLimiter
 from services.storage import StorageService
+from services.prompt_builder import PromptBuilder
+from config import SUMMARY_CONFIG
 
 class SummaryService:
-    """面试总结服务类，负责对面试问题和整场面试进行总结"""
+    """面试总结服务类，负责对面试问题和整场面试进行总结
     
-    def __init__(self):
-        """初始化总结服务"""
-        self.llm_service = LLMService()
+    面试内容较长时按token预算把问答分成若干段，各段并发总结（map），再合并各段总结（reduce），
+    总耗时取决于最长的一段而不是整场面试的长度。
+    
+    增量模式下每个问答（以及面试记录的每一段）单独生成摘要，按内容哈希保存在面试数据的qa_digests中，
+    再次总结时只为新增或修改过的问答生成摘要，然后合并全部摘要。
+    """
+    
+    # 摘要提示或格式变化后递增，使已保存的摘要失效
+    DIGEST_VERSION = 1
+    
+    # 整场面试总结的提示模板版本，修改提示后递增，使已保存的总结在下次总结时重新生成
+    SUMMARY_PROMPT_VERSION = 1
+    
+    # 整场面试总结的要求
+    INTERVIEW_SUMMARY_INSTRUCTIONS = "\n请从以下几个方面对整场面试进行总结：\n1. 面试的整体内容和重点领域\n2. 候选人在哪些方面表现较好\n3. 候选人在哪些方面需要改进\n4. 总体评价和建议\n5. 可能的面试结果预测"
+    
+    def __init__(self, priority=None, rate_limiter=None):
+        """初始化总结服务
+        
+        Args:
+            priority (str, optional): 模型请求优先级，见PriorityScheduler
+            rate_limiter (RateLimiter, optional): 只作用于本服务请求的限流器
+        """
+        self.llm_service = AsyncLLMService(priority=priority, rate_limiter=rate_limiter)
         self.storage_service = StorageService()
     
     def summarize_question_answer(self, question, answer):
@@ -24,41 +54,60 @@ class SummaryService:
         system_prompt = "你是一个专业的面试分析师。请总结下面的面试问题和回答，突出关键点和核心信息。"
         prompt = f"面试问题：{question}\n\n面试回答：{answer}\n\n请用简洁的语言总结这个问答的核心内容。"
         
-        return self.llm_service.generate_response(prompt, system_prompt)
+        return self.llm_service.generate_response(prompt, system_prompt, task='summary')
     
-    def summarize_interview(self, interview_id):
+    def summarize_interview(self, interview_id, on_delta=None, force=False):
         """总结整场面试
         
+        面试内容、提示模板版本和模型都与已保存的总结一致时直接返回已保存的总结，不调用模型。
+        
         Args:
             interview_id (str): 面试ID
+            on_delta (callable, optional): 流式回调，传入时以流式方式请求模型，每收到一段StreamDelta就调用一次
+            force (bool, optional): 是否忽略已保存的总结和各问答的摘要，全部重新请求模型生成
             
         Returns:
-            dict: 包含面试总结和分析的字典
+            dict: 包含面试总结和分析的字典，cached表示是否直接使用了已保存的总结
         """
         # 获取面试数据
         interview_data = self.storage_service.get_interview(interview_id)
         
-        # 构建面试内容文本
-        interview_content = []
-        interview_content.append(f"面试岗位: {interview_data.get('position', '未提供')}")
-        interview_content.append(f"面试公司: {interview_data.get('company', '未提供')}")
-        interview_content.append(f"面试日期: {interview_data.get('interview_date', '未提供')}")
-        interview_content.append(f"面试问答内容: {interview_data.get('interview_content', '未提供')}")
+        fingerprint = self.summary_fingerprint(interview_data)
+        if not force and self.is_summary_current(interview_data, fingerprint):
+            summary = interview_data['summary']
+            print("面试内容未变化，使用已保存的总结")
+            if on_delta:
+                on_delta(StreamDelta('content', summary))
+            return {
+                'interview_id': interview_id,
+                'summary': summary,
+                'key_points': self._extract_key_points(summary),
+                'qa_digests': interview_data.get('qa_digests', {}),
+                'summary_fingerprint': fingerprint,
+                'cached': True
+            }
         
-        for qa in interview_data.get('questions_answers', []):
-            interview_content.append(f"问题: {qa.get('question', '')}")
-            interview_content.append(f"回答: {qa.get('answer', '')}\n")
+        chunks = []
+        if SUMMARY_CONFIG['mode'] == 'auto':
+            chunks = self._chunk_interview(interview_data, SUMMARY_CONFIG['chunk_tokens'])
         
-        full_content = '\n'.join(interview_content)
+        if SUMMARY_CONFIG['mode'] == 'incremental':
+            summary = self._summarize_incremental(interview_data, on_delta, use_cache=not force)
+        elif len(chunks) > 1:
+            # 分段并发总结，再合并各段总结
+            partials = AsyncLLMService.run(self._asummarize_chunks(interview_data, chunks, use_cache=not force))
+            errors = [partial for partial in partials if partial.startswith("错误:")]
+            if errors:
+                summary = self._report_error(errors[0], on_delta)
+            else:
+                labeled = [(f"第{i}部分", partial) for i, partial in enumerate(partials, 1)]
+                summary = self._generate_summary(*self._reduce_prompts(interview_data, labeled), on_delta, use_cache=not force)
+        else:
+            summary = self._generate_summary(*self._interview_prompts(interview_data), on_delta, use_cache=not force)
         
-        # 生成面试总结
-        system_prompt = "你是一个经验丰富的面试教练。请对整场面试进行全面总结和分析。"
-        prompt = f"{full_content}\n\n请从以下几个方面对整场面试进行总结：\n1. 面试的整体内容和重点领域\n2. 候选人在哪些方面表现较好\n3. 候选人在哪些方面需要改进\n4. 总体评价和建议\n5. 可能的面试结果预测"
-        
-        summary = self.llm_service.generate_response(prompt, system_prompt)
-        
-        # 更新面试数据中的总结
+        # 更新面试数据中的总结，只为成功的总结记录指纹，失败时下次重新生成
         interview_data['summary'] = summary
+        interview_data['summary_fingerprint'] = None if summary.startswith("错误:") else fingerprint
         self.storage_service.save_interview(interview_data)
         
         # 提取关键信息
@@ -67,9 +116,199 @@ class SummaryService:
         return {
             'interview_id': interview_id,
             'summary': summary,
-            'key_points': key_points
+            'key_points': key_points,
+            'qa_digests': interview_data.get('qa_digests', {}),
+            'summary_fingerprint': interview_data['summary_fingerprint'],
+            'cached': False
         }
     
+    def summary_fingerprint(self, interview_data):
+        """计算面试总结的内容指纹：基本信息、面试记录和各问答的哈希，加上提示模板版本、总结模式和模型
+        
+        Args:
+            interview_data (dict): 面试数据
+            
+        Returns:
+            str: SHA-256指纹
+        """
+        def digest(text):
+            return hashlib.sha256(text.encode('utf-8')).hexdigest()
+        
+        content = {
+            'version': self.SUMMARY_PROMPT_VERSION,
+            'digest_version': self.DIGEST_VERSION,
+            'mode': SUMMARY_CONFIG['mode'],
+            'model': self.llm_service.model,
+            'header': self._interview_header(interview_data),
+            'interview_content': digest(interview_data.get('interview_content') or ''),
+            'questions_answers': [
+                digest(f"{qa.get('question', '')}\n{qa.get('answer', '')}")
+                for qa in interview_data.get('questions_answers', [])
+            ],
+        }
+        return digest(json.dumps(content, ensure_ascii=False, sort_keys=True))
+    
+    def is_summary_current(self, interview_data, fingerprint=None):
+        """判断已保存的总结是否与当前面试内容一致
+        
+        Args:
+            interview_data (dict): 面试数据
+            fingerprint (str, optional): 已计算好的内容指纹
+            
+        Returns:
+            bool: 已有总结且指纹一致时返回True
+        """
+        if not interview_data.get('summary') or not interview_data.get('summary_fingerprint'):
+            return False
+        return interview_data['summary_fingerprint'] == (fingerprint or self.summary_fingerprint(interview_data))
+    
+    def _summarize_incremental(self, interview_data, on_delta=None, use_cache=True):
+        """复用已保存的摘要，只为新增或修改过的内容生成摘要，再合并全部摘要
+        
+        interview_data中的qa_digests会被更新为当前内容对应的摘要（已删除问答的摘要一并清理）。
+        use_cache为False时不复用已保存的摘要，全部摘要和合并都重新请求模型。
+        """
+        units = self._digest_units(interview_data, SUMMARY_CONFIG['chunk_tokens'])
+        digests = dict(interview_data.get('qa_digests') or {}) if use_cache else {}
+        
+        missing = list({key: text for key, _, text in units if key not in digests}.items())
+        print(f"面试摘要：复用{len(units) - len(missing)}条，新生成{len(missing)}条")
+        error = None
+        if missing:
+            results = AsyncLLMService.run(self._adigest_units([text for _, text in missing], use_cache))
+            for (key, _), digest in zip(missing, results):
+                if digest.startswith("错误:"):
+                    error = error or digest
+                else:
+                    digests[key] = digest
+        
+        # 只保留当前内容对应的摘要；部分摘要生成失败时已成功的摘要同样保存，下次不再重复生成
+        interview_data['qa_digests'] = {key: digests[key] for key, _, _ in units if key in digests}
+        if error:
+            return self._report_error(error, on_delta)
+        
+        labeled = [(label, digests[key]) for key, label, _ in units]
+        return self._generate_summary(*self._reduce_prompts(interview_data, labeled), on_delta, use_cache)
+    
+    def _digest_units(self, interview_data, chunk_tokens):
+        """需要单独生成摘要的内容：面试记录按token预算分段，每个问答一段
+        
+        Returns:
+            list: (摘要键, 标签, 内容) 列表，摘要键为内容与摘要版本的哈希
+        """
+        units = []
+        if interview_data.get('interview_content'):
+            pieces = PromptBuilder.split_text(f"面试问答内容: {interview_data['interview_content']}\n\n", chunk_tokens)
+            units.extend((f"面试记录第{i}段", piece) for i, piece in enumerate(pieces, 1))
+        for i, qa in enumerate(interview_data.get('questions_answers', []), 1):
+            units.append((f"问答{i}", f"问题: {qa.get('question', '')}\n回答: {qa.get('answer', '')}\n\n"))
+        
+        return [(self._digest_key(text), label, text) for label, text in units]
+    
+    def _digest_key(self, text):
+        """摘要键：内容与摘要版本的SHA-256哈希"""
+        return hashlib.sha256(f"v{self.DIGEST_VERSION}|{text}".encode('utf-8')).hexdigest()
+    
+    async def _adigest_units(self, texts, use_cache=True):
+        """并发生成各段内容的摘要，返回与texts顺序一致的摘要"""
+        system_prompt = "你是一个专业的面试分析师。请总结下面的面试内容，突出涉及的领域、候选人回答的亮点和不足。"
+        
+        def prompt(text):
+            builder = PromptBuilder(task='summary')
+            builder.add(text, priority=1, name='面试内容')
+            builder.add("请用简洁的语言总结这部分面试内容的要点。", required=True)
+            return builder.build(system_prompt)
+        
+        return await asyncio.gather(*(
+            self.llm_service.agenerate_response(prompt(text), system_prompt, use_cache=use_cache, task='summary')
+            for text in texts
+        ))
+    
+    @staticmethod
+    def _report_error(error, on_delta=None):
+        """把错误信息作为总结返回，流式请求时同样通过回调输出"""
+        if on_delta:
+            on_delta(StreamDelta('content', error))
+        return error
+    
+    @staticmethod
+    def _interview_header(interview_data):
+        """面试的基本信息"""
+        return (
+            f"面试岗位: {interview_data.get('position', '未提供')}\n"
+            f"面试公司: {interview_data.get('company', '未提供')}\n"
+            f"面试日期: {interview_data.get('interview_date', '未提供')}\n"
+        )
+    
+    def _interview_prompts(self, interview_data):
+        """一次总结整场面试的提示，返回 (prompt, system_prompt)"""
+        # 按token预算构建面试内容：基本信息和要求必须包含，其次是全部问题，然后是回答，最后是面试问答记录
+        system_prompt = "你是一个经验丰富的面试教练。请对整场面试进行全面总结和分析。"
+        builder = PromptBuilder(task='summary')
+        builder.add(self._interview_header(interview_data), required=True)
+        builder.add(f"面试问答内容: {interview_data.get('interview_content', '未提供')}\n", priority=3, name='面试问答内容')
+        
+        for i, qa in enumerate(interview_data.get('questions_answers', []), 1):
+            builder.add(f"问题: {qa.get('question', '')}\n", priority=1, name=f"问题{i}")
+            builder.add(f"回答: {qa.get('answer', '')}\n\n", priority=2, name=f"回答{i}")
+        
+        builder.add(self.INTERVIEW_SUMMARY_INSTRUCTIONS, required=True)
+        
+        return builder.build(system_prompt), system_prompt
+    
+    @staticmethod
+    def _chunk_interview(interview_data, chunk_tokens):
+        """按token预算把面试问答记录和各个问答分段，单个问答过长时再按行切分
+        
+        Returns:
+            list: 各段面试内容
+        """
+        items = []
+        if interview_data.get('interview_content'):
+            items.extend(PromptBuilder.split_text(f"面试问答内容: {interview_data['interview_content']}\n\n", chunk_tokens))
+        for qa in interview_data.get('questions_answers', []):
+            items.extend(PromptBuilder.split_text(f"问题: {qa.get('question', '')}\n回答: {qa.get('answer', '')}\n\n", chunk_tokens))
+        return PromptBuilder.pack(items, chunk_tokens)
+    
+    async def _asummarize_chunks(self, interview_data, chunks, use_cache=True):
+        """并发总结各段面试内容（map），返回与chunks顺序一致的总结"""
+        system_prompt = "你是一个专业的面试分析师。下面是一场面试的一部分内容，请总结这部分问答的要点，包括涉及的领域、候选人回答的亮点和不足。"
+        header = self._interview_header(interview_data)
+        return await asyncio.gather(*(
+            self.llm_service.agenerate_response(
+                f"{header}（第{i}/{len(chunks)}部分）\n\n{chunk}请用简洁的语言总结这部分面试内容的要点。",
+                system_prompt,
+                use_cache=use_cache,
+                task='summary'
+            )
+            for i, chunk in enumerate(chunks, 1)
+        ))
+    
+    def _reduce_prompts(self, interview_data, partials):
+        """合并各段总结的提示（reduce），partials为按顺序排列的 (标签, 总结) 列表，返回 (prompt, system_prompt)"""
+        system_prompt = "你是一个经验丰富的面试教练。下面是一场面试按顺序分段总结的结果，请据此对整场面试进行全面总结和分析。"
+        builder = PromptBuilder(task='summary')
+        builder.add(self._interview_header(interview_data) + "\n", required=True)
+        for label, partial in partials:
+            builder.add(f"{label}总结：\n{partial}\n\n", priority=1, name=f"{label}总结")
+        builder.add(self.INTERVIEW_SUMMARY_INSTRUCTIONS, required=True)
+        
+        return builder.build(system_prompt), system_prompt
+    
+    def _generate_summary(self, prompt, system_prompt, on_delta=None, use_cache=True):
+        """请求模型生成总结，传入on_delta时以流式方式请求；use_cache为False时不使用响应缓存"""
+        if on_delta:
+            summary_parts = []
+            for delta in self.llm_service.generate_response(prompt, system_prompt, use_cache=use_cache, stream=True, task='summary'):
+                if delta.kind == 'content':
+                    summary_parts.append(delta.text)
+                on_delta(delta)
+            summary = ''.join(summary_parts)
+        else:
+            summary = self.llm_service.generate_response(prompt, system_prompt, use_cache=use_cache, task='summary')
+        
+        return summary
+    
     def analyze_answer_quality(self, question, answer):
         """分析面试回答质量，提供反馈和改进建议
         
@@ -82,6 +321,25 @@ class SummaryService:
         """
         return self.llm_service.analyze_interview_answer(question, answer)
     
+    def analyze_answers_quality(self, qa_pairs):
+        """并发分析多个问答的回答质量，每个问答单独请求，与analyze_answer_quality的提示和缓存相同
+        
+        Args:
+            qa_pairs (list): (面试问题, 面试回答) 列表
+            
+        Returns:
+            list: 分析结果，顺序与qa_pairs一致；分析失败的项为以“错误:”开头的信息
+        """
+        if not qa_pairs:
+            return []
+        return AsyncLLMService.run(self._aanalyze_answers(qa_pairs))
+    
+    async def _aanalyze_answers(self, qa_pairs):
+        """并发分析多个问答，同时进行的请求数受llm_service的信号量限制"""
+        return await asyncio.gather(*(
+            self.llm_service.aanalyze_interview_answer(question, answer) for question, answer in qa_pairs
+        ))
+    
     def _extract_key_points(self, summary):
         """从总结中提取关键点
         
@@ -104,28 +362,80 @@ class SummaryService:
         
         return key_points
     
-    def batch_summarize_interviews(self, interview_ids):
-        """批量总结多个面试
+    def batch_summarize_interviews(self, interview_ids, force=False, workers=None, requests_per_minute=None, on_result=None):
+        """并发批量总结多个面试，内容未变化的面试直接使用已保存的总结
+        
+        多个面试在有限大小的线程池中同时总结，模型请求速率由共享的令牌桶限流器控制（见LLM_RATE_LIMIT_CONFIG）；
+        指定requests_per_minute时另外为本次批量创建限流器，只限制本次批量的请求，不影响进程内的其他调用。
         
         Args:
             interview_ids (list): 面试ID列表
+            force (bool, optional): 是否全部强制重新生成
+            workers (int, optional): 同时总结的面试数，默认使用SUMMARY_CONFIG['batch_workers']
+            requests_per_minute (float, optional): 本次批量每分钟最多发起的模型请求数
+            on_result (callable, optional): 每完成一个面试调用一次，参数为该面试的结果字典和进度字典
             
         Returns:
-            list: 每个面试的总结结果
+            list: 每个面试的总结结果，顺序与interview_ids一致
         """
-        results = []
+        workers = max(1, workers or SUMMARY_CONFIG['batch_workers'])
+        rate_limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+        results = {}
+        started = time.monotonic()
         
-        for interview_id in interview_ids:
+        with ThreadPoolExecutor(max_workers=min(workers, len(interview_ids) or 1)) as pool:
+            futures = {pool.submit(self._summarize_one, interview_id, force, rate_limiter): interview_id for interview_id in interview_ids}
             try:
-                summary_result = self.summarize_interview(interview_id)
-                results.append({
-                    'interview_id': interview_id,
-                    'summary': summary_result['summary']
-                })
-            except Exception as e:
-                results.append({
+                for processed, future in enumerate(as_completed(futures), 1):
+                    result = future.result()
+                    results[futures[future]] = result
+                    
+                    if on_result:
+                        elapsed = time.monotonic() - started
+                        rate = processed / elapsed if elapsed > 0 else 0.0
+                        on_result(result, {
+                            'processed': processed,
+                            'total': len(interview_ids),
+                            'failed': sum(1 for r in results.values() if 'error' in r),
+                            'rate': rate,
+                            'eta': (len(interview_ids) - processed) / rate if rate > 0 else None,
+                        })
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                raise
+        
+        return [results[interview_id] for interview_id in interview_ids]
+    
+    @staticmethod
+    def _summarize_one(interview_id, force=False, rate_limiter=None):
+        """总结单个面试（在线程池中执行），返回结果字典；每个线程使用独立的服务实例，按bulk优先级调度"""
+        service = SummaryService(priority=PriorityScheduler.BULK, rate_limiter=rate_limiter)
+        started = time.monotonic()
+        try:
+            # 总结仍然有效的面试不需要模型服务
+            current = not force and service.is_summary_current(service.storage_service.get_interview(interview_id))
+            
+            # 模型服务熔断中时直接标记失败，不再逐个等待超时
+            if not current and not service.llm_service.is_available():
+                return {
                     'interview_id': interview_id,
-                    'error': str(e)
-                })
+                    'error': f"模型服务暂时不可用: {service.llm_service.breaker_state()}"
+                }
+            
+            summary_result = service.summarize_interview(interview_id, force=force)
+        except Exception as e:
+            return {
+                'interview_id': interview_id,
+                'error': str(e)
+            }
         
-        return results
\ No newline at end of file
+        result = {
+            'interview_id': interview_id,
+            'summary': summary_result['summary'],
+            'cached': summary_result['cached'],
+            'elapsed': time.monotonic() - started
+        }
+        if summary_result['summary'].startswith("错误:"):
+            result['error'] = summary_result['summary']
+        return result
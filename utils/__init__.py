@@ -1,5 +1,8 @@
 # 导入工具类
 from .file_utils import FileUtils
 from .file_parser import FileParser
+from .parse_cache import ParseCache
+from .rule_extractor import RuleExtractor
+from .resume_segmenter import ResumeSegmenter
 
-__all__ = ['FileUtils', 'FileParser']
\ No newline at end of file
+__all__ = ['FileUtils', 'FileParser', 'ParseCache', 'RuleExtractor', 'ResumeSegmenter']
\ No newline at end of file
@@ -0,0 +1,280 @@
+# Word 97-2003 (.doc) 文本提取工具
+
+import struct
+
+class CompoundFile:
+    """OLE复合文档（Compound File Binary）读取类，直接从内存中的字节读取各个流
+    
+    只实现读取流内容所需的部分：文件头、DIFAT/FAT扇区链、目录和迷你流。
+    """
+    
+    SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+    # 大于该值的扇区编号是特殊值（链结束、空闲扇区等）
+    MAX_REGULAR_SECTOR = 0xFFFFFFFA
+    
+    def __init__(self, data):
+        """解析复合文档的文件头、分配表和目录
+        
+        Args:
+            data (bytes): 复合文档的完整内容
+            
+        Raises:
+            ValueError: 不是有效的复合文档
+        """
+        if len(data) < 512 or data[:8] != self.SIGNATURE:
+            raise ValueError("不是有效的OLE复合文档")
+        
+        self.data = data
+        (sector_shift, mini_sector_shift) = struct.unpack_from('<HH', data, 0x1E)
+        (num_fat_sectors, first_dir_sector) = struct.unpack_from('<II', data, 0x2C)
+        (self.mini_stream_cutoff, first_mini_fat_sector, num_mini_fat_sectors,
+         first_difat_sector, num_difat_sectors) = struct.unpack_from('<IIIII', data, 0x38)
+        
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+        # 最多能容纳的扇区数，用于发现损坏文件中的循环链
+        self._max_sectors = len(data) // self.sector_size + 1
+        
+        self.fat = self._read_fat(num_fat_sectors, first_difat_sector, num_difat_sectors)
+        self.entries = self._read_directory(first_dir_sector)
+        
+        root = self.entries[0]
+        self.mini_stream = self._read_chain(root['start'], self.fat, self._sector)[:root['size']]
+        if num_mini_fat_sectors:
+            self.mini_fat = self._unpack_sectors(self._read_chain(first_mini_fat_sector, self.fat, self._sector))
+        else:
+            self.mini_fat = []
+    
+    def _sector(self, index):
+        """读取一个普通扇区"""
+        offset = (index + 1) * self.sector_size
+        if offset >= len(self.data):
+            raise ValueError(f"扇区编号超出文件范围: {index}")
+        return self.data[offset:offset + self.sector_size]
+    
+    def _mini_sector(self, index):
+        """读取一个迷你扇区"""
+        offset = index * self.mini_sector_size
+        return self.mini_stream[offset:offset + self.mini_sector_size]
+    
+    @staticmethod
+    def _unpack_sectors(raw):
+        """把字节解析为uint32扇区编号列表"""
+        return list(struct.unpack(f'<{len(raw) // 4}I', raw[:len(raw) // 4 * 4]))
+    
+    def _read_fat(self, num_fat_sectors, first_difat_sector, num_difat_sectors):
+        """根据DIFAT找到全部FAT扇区并读取FAT"""
+        difat = list(struct.unpack_from('<109I', self.data, 0x4C))
+        
+        sector = first_difat_sector
+        per_sector = self.sector_size // 4 - 1
+        for _ in range(min(num_difat_sectors, self._max_sectors)):
+            if sector > self.MAX_REGULAR_SECTOR:
+                break
+            values = self._unpack_sectors(self._sector(sector))
+            difat.extend(values[:per_sector])
+            sector = values[per_sector]
+        
+        fat_sectors = [s for s in difat[:num_fat_sectors] if s <= self.MAX_REGULAR_SECTOR]
+        return self._unpack_sectors(b''.join(self._sector(s) for s in fat_sectors))
+    
+    def _read_chain(self, start, table, read_sector):
+        """沿分配表读取一条扇区链"""
+        chunks = []
+        sector = start
+        for _ in range(max(self._max_sectors, len(table))):
+            if sector > self.MAX_REGULAR_SECTOR or sector >= len(table):
+                break
+            chunks.append(read_sector(sector))
+            sector = table[sector]
+        else:
+            raise ValueError("扇区链存在循环，文件可能已损坏")
+        return b''.join(chunks)
+    
+    def _read_directory(self, first_dir_sector):
+        """读取目录项"""
+        raw = self._read_chain(first_dir_sector, self.fat, self._sector)
+        entries = []
+        for offset in range(0, len(raw) - 127, 128):
+            name_length, entry_type = struct.unpack_from('<HB', raw, offset + 64)
+            start, size = struct.unpack_from('<II', raw, offset + 116)
+            name = raw[offset:offset + max(0, name_length - 2)].decode('utf-16-le', errors='ignore')
+            entries.append({'name': name, 'type': entry_type, 'start': start, 'size': size})
+        
+        if not entries or entries[0]['type'] != 5:
+            raise ValueError("OLE复合文档缺少根目录项")
+        return entries
+    
+    def list_streams(self):
+        """列出全部流的名称
+        
+        Returns:
+            list: 流名称列表
+        """
+        return [entry['name'] for entry in self.entries if entry['type'] == 2]
+    
+    def read_stream(self, name):
+        """读取指定名称的流
+        
+        Args:
+            name (str): 流名称
+            
+        Returns:
+            bytes: 流内容
+            
+        Raises:
+            KeyError: 流不存在
+        """
+        for entry in self.entries:
+            if entry['type'] == 2 and entry['name'] == name:
+                if entry['size'] < self.mini_stream_cutoff:
+                    raw = self._read_chain(entry['start'], self.mini_fat, self._mini_sector)
+                else:
+                    raw = self._read_chain(entry['start'], self.fat, self._sector)
+                return raw[:entry['size']]
+        raise KeyError(f"OLE复合文档中不存在流: {name}")
+
+class WordDocReader:
+    """Word 97-2003二进制文档的文本提取类
+    
+    从WordDocument流的FIB中找到表格流里的片段表（piece table），按片段读取正文，
+    不依赖Word程序或第三方库，在任意平台上都可以使用。
+    """
+    
+    WORD_IDENT = 0xA5EC
+    # Word 97及之后版本的最小nFib
+    MIN_NFIB = 0x00C1
+    # FibRgFcLcb97中fcClx/lcbClx是第33对
+    CLX_PAIR_INDEX = 33
+    
+    # 需要转换或删除的控制字符
+    _TRANSLATION = {
+        0x0D: '\n',  # 段落标记
+        0x0B: '\n',  # 手动换行
+        0x0C: '\n',  # 分页符/分节符
+        0x07: '\t',  # 表格单元格结束标记
+        0x1E: '-',  # 不间断连字符
+        0x1F: '',  # 可选连字符
+        0xA0: ' ',
+    }
+    
+    @staticmethod
+    def extract_text(data):
+        """从.doc文件内容中提取文本
+        
+        Args:
+            data (bytes): .doc文件内容
+            
+        Returns:
+            str: 提取的文本
+            
+        Raises:
+            ValueError: 不是Word 97-2003文档、文档已加密或结构损坏
+        """
+        ole = CompoundFile(data)
+        try:
+            word_document = ole.read_stream('WordDocument')
+        except KeyError:
+            raise ValueError("OLE复合文档中没有WordDocument流，不是Word文档")
+        
+        if len(word_document) < 0x200:
+            raise ValueError("WordDocument流长度不足")
+        
+        ident, nfib = struct.unpack_from('<HH', word_document, 0)
+        flags, = struct.unpack_from('<H', word_document, 0x0A)
+        if ident != WordDocReader.WORD_IDENT:
+            raise ValueError("WordDocument流标识无效")
+        if nfib < WordDocReader.MIN_NFIB:
+            raise ValueError("不支持Word 95及更早版本的文档")
+        if flags & 0x0100:
+            raise ValueError("文档已加密")
+        
+        table_name = '1Table' if flags & 0x0200 else '0Table'
+        try:
+            table = ole.read_stream(table_name)
+        except KeyError:
+            raise ValueError(f"Word文档缺少{table_name}流")
+        
+        fc_clx, lcb_clx = WordDocReader._clx_location(word_document)
+        if fc_clx + lcb_clx > len(table) or lcb_clx == 0:
+            raise ValueError("Word文档片段表位置无效")
+        
+        pieces = WordDocReader._read_pieces(table[fc_clx:fc_clx + lcb_clx])
+        text = ''.join(WordDocReader._piece_text(word_document, *piece) for piece in pieces)
+        return WordDocReader._clean(text)
+    
+    @staticmethod
+    def _clx_location(word_document):
+        """从FIB中读取片段表（Clx）在表格流中的偏移和长度"""
+        offset = 32
+        csw, = struct.unpack_from('<H', word_document, offset)
+        offset += 2 + csw * 2
+        cslw, = struct.unpack_from('<H', word_document, offset)
+        offset += 2 + cslw * 4
+        cb_rg_fc_lcb, = struct.unpack_from('<H', word_document, offset)
+        offset += 2
+        if cb_rg_fc_lcb <= WordDocReader.CLX_PAIR_INDEX:
+            raise ValueError("Word文档FIB不完整")
+        return struct.unpack_from('<II', word_document, offset + WordDocReader.CLX_PAIR_INDEX * 8)
+    
+    @staticmethod
+    def _read_pieces(clx):
+        """解析Clx：跳过Prc，读取Pcdt中的片段表
+        
+        Returns:
+            list: (字符数, 文件偏移, 是否为8位压缩文本) 列表
+        """
+        offset = 0
+        while offset < len(clx) and clx[offset] == 0x01:
+            cb_grpprl, = struct.unpack_from('<h', clx, offset + 1)
+            offset += 3 + cb_grpprl
+        
+        if offset >= len(clx) or clx[offset] != 0x02:
+            raise ValueError("Word文档片段表格式无效")
+        lcb, = struct.unpack_from('<I', clx, offset + 1)
+        plc = clx[offset + 5:offset + 5 + lcb]
+        
+        count = (len(plc) - 4) // 12
+        cps = struct.unpack_from(f'<{count + 1}I', plc, 0)
+        pieces = []
+        for i in range(count):
+            fc_value, = struct.unpack_from('<I', plc, (count + 1) * 4 + i * 8 + 2)
+            compressed = bool(fc_value & 0x40000000)
+            fc = fc_value & 0x3FFFFFFF
+            pieces.append((cps[i + 1] - cps[i], fc // 2 if compressed else fc, compressed))
+        return pieces
+    
+    @staticmethod
+    def _piece_text(word_document, length, fc, compressed):
+        """读取一个片段的文本"""
+        if compressed:
+            return word_document[fc:fc + length].decode('cp1252', errors='replace')
+        return word_document[fc:fc + length * 2].decode('utf-16-le', errors='replace')
+    
+    @staticmethod
+    def _clean(text):
+        """处理域代码和控制字符：保留域结果，去掉域指令"""
+        result = []
+        # 每层域是否处于指令部分（0x13开始到0x14分隔符之间）
+        fields = []
+        for char in text:
+            code = ord(char)
+            if code == 0x13:
+                fields.append(True)
+                continue
+            if code == 0x14:
+                if fields:
+                    fields[-1] = False
+                continue
+            if code == 0x15:
+                if fields:
+                    fields.pop()
+                continue
+            if fields and fields[-1]:
+                continue
+            
+            if code in WordDocReader._TRANSLATION:
+                result.append(WordDocReader._TRANSLATION[code])
+            elif code >= 0x20 or char in '\t\n':
+                result.append(char)
+        return ''.join(result)
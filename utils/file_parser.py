@@ -2,22 +2,77 @@
 
 import os
 import re
+import time
+import unicodedata
+import importlib.util
+import multiprocessing
+from functools import lru_cache
+from importlib import metadata
 from io import BytesIO
+from utils.file_utils import FileUtils
+from utils.doc_reader import WordDocReader
+from utils.parse_cache import ParseCache
+from utils.resume_segmenter import ResumeSegmenter
+from config import PARSE_CACHE_CONFIG, PDF_PARSE_CONFIG
 
 class FileParser:
     """文件解析类，支持多种格式的文件解析"""
     
+    # 解析逻辑版本，修改解析方式后递增，使已缓存的解析结果失效
+    PARSER_VERSION = 3
+    
+    # 解析失败时返回的提示文本的前缀，这类结果不写入缓存
+    _ERROR_PREFIXES = (
+        '解析TXT文件失败', '解析PDF文件', '使用pdfplumber解析', '使用PyPDF2解析',
+        '解析DOCX文件', '解析DOC文件', '解析Word文件失败', '无法解析的文件格式',
+        'PDF文件中未提取到文本内容', 'DOCX文件中未提取到文本内容', 'DOC文件中未提取到文本内容',
+    )
+    
+    # PDF超过时间预算只解析了部分页面时附加在文本末尾，这类结果同样不写入缓存
+    _PARTIAL_NOTE = "\n（PDF页数较多，解析超时，以上仅为部分页面的内容）"
+    
     @staticmethod
-    def parse_file(file_path, file_content=None):
+    def is_error_text(text):
+        """判断解析结果是否为解析失败时返回的错误信息
+        
+        Args:
+            text (str): parse_file返回的文本
+            
+        Returns:
+            bool: 是否为错误信息
+        """
+        return text.startswith(FileParser._ERROR_PREFIXES)
+    
+    @staticmethod
+    def parse_file(file_path, file_content=None, content_hash=None, use_cache=True):
         """解析文件内容
         
+        解析结果按 (文件内容哈希, 解析后端及版本) 缓存，同一份文件再次解析时直接读取缓存。
+        
         Args:
             file_path (str): 文件路径
-            file_content (bytes, optional): 文件内容，如果为None则从文件路径读取
+            file_content (bytes, optional): 文件内容（bytes或内存映射对象），如果为None则从文件路径读取
+            content_hash (str, optional): 文件内容的SHA-256哈希，已知时传入可省去一次哈希计算
+            use_cache (bool, optional): 是否使用解析结果缓存
             
         Returns:
             str: 解析后的文本内容
         """
+        return FileParser.parse_file_with_meta(file_path, file_content, content_hash, use_cache)[0]
+    
+    @staticmethod
+    def parse_file_with_meta(file_path, file_content=None, content_hash=None, use_cache=True):
+        """解析文件内容，同时返回解析信息（所用策略、重新提取的页面等，随缓存一起保存）
+        
+        Args:
+            file_path (str): 文件路径
+            file_content (bytes, optional): 文件内容（bytes或内存映射对象），如果为None则从文件路径读取
+            content_hash (str, optional): 文件内容的SHA-256哈希
+            use_cache (bool, optional): 是否使用解析结果缓存
+            
+        Returns:
+            tuple: (解析后的文本内容, 解析信息字典)
+        """
         # 获取文件扩展名
         _, ext = os.path.splitext(file_path.lower())
         
@@ -26,19 +81,99 @@ class FileParser:
             with open(file_path, 'rb') as f:
                 file_content = f.read()
         
+        backend = FileParser._backend(ext)
+        cache_key = None
+        if use_cache and PARSE_CACHE_CONFIG['enabled'] and backend:
+            cache = ParseCache.shared()
+            cache_key = ParseCache.make_key(content_hash or FileUtils.compute_hash(file_content), backend)
+            entry = cache.get(cache_key)
+            if entry is not None:
+                return entry['text'], dict(entry['meta'], cached=True)
+        
+        text, meta = FileParser._parse(ext, file_content)
+        meta['backend'] = backend
+        # 分段索引的偏移对应保留换行的清理结果，随解析结果一起缓存
+        if not FileParser.is_error_text(text):
+            meta['sections'] = ResumeSegmenter.index(FileParser.clean_text(text, keep_layout=True))
+        
+        # 只缓存完整的解析结果，缺少解析库、解析出错或超时时下次重新解析
+        if cache_key and not FileParser.is_error_text(text) and not meta.get('partial'):
+            ParseCache.shared().set(cache_key, text, meta)
+        
+        return text, dict(meta, cached=False)
+    
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _backend(ext):
+        """当前环境下解析该格式所用的后端标识（库名、库版本、解析策略与解析逻辑版本）
+        
+        Args:
+            ext (str): 文件扩展名
+            
+        Returns:
+            str: 后端标识，没有可用的解析库时返回None
+        """
+        if ext == '.pdf':
+            candidates = [('PyPDF2', 'PyPDF2'), ('pdfplumber', 'pdfplumber')]
+        elif ext == '.docx':
+            candidates = [('docx', 'python-docx')]
+        elif ext == '.doc':
+            return f"word97-v{FileParser.PARSER_VERSION}"
+        else:
+            return f"text-v{FileParser.PARSER_VERSION}"
+        
+        libraries = []
+        for module_name, dist_name in candidates:
+            if importlib.util.find_spec(module_name) is None:
+                continue
+            try:
+                version = metadata.version(dist_name)
+            except metadata.PackageNotFoundError:
+                version = 'unknown'
+            libraries.append(f"{dist_name}-{version}")
+        
+        if not libraries:
+            return None
+        if ext == '.pdf':
+            libraries.append(PDF_PARSE_CONFIG['strategy'])
+        return '+'.join(libraries) + f"-v{FileParser.PARSER_VERSION}"
+    
+    @staticmethod
+    def _parse(ext, file_content):
+        """按文件扩展名选择解析方法（不使用缓存）
+        
+        Args:
+            ext (str): 文件扩展名
+            file_content (bytes): 文件内容
+            
+        Returns:
+            tuple: (解析后的文本内容, 解析信息字典)
+        """
         # 根据文件扩展名选择不同的解析方法
         if ext == '.txt':
-            return FileParser._parse_txt(file_content)
+            return FileParser._parse_txt(file_content), {'strategy': 'text'}
         elif ext == '.pdf':
             return FileParser._parse_pdf(file_content)
         elif ext in ['.doc', '.docx']:
-            return FileParser._parse_doc(file_content, ext)
+            return FileParser._parse_doc(file_content, ext), {'strategy': 'python-docx' if ext == '.docx' else 'word97'}
         else:
             # 未知格式，尝试作为文本处理
             try:
-                return file_content.decode('utf-8', errors='ignore')
+                return str(file_content, 'utf-8', errors='ignore'), {'strategy': 'text'}
             except:
-                return f"无法解析的文件格式: {ext}"
+                return f"无法解析的文件格式: {ext}", {}
+    
+    @staticmethod
+    def _stream(file_content):
+        """把文件内容包装为可供解析库读取的文件对象
+        
+        bytes包装为BytesIO；内存映射对象（见FileUtils.map_file）本身支持read/seek，回到开头后直接使用，
+        不再复制一份内容。
+        """
+        if isinstance(file_content, (bytes, bytearray)):
+            return BytesIO(file_content)
+        file_content.seek(0)
+        return file_content
     
     @staticmethod
     def _parse_txt(file_content):
@@ -55,11 +190,11 @@ class FileParser:
             encodings = ['utf-8', 'gbk', 'latin-1']
             for encoding in encodings:
                 try:
-                    return file_content.decode(encoding)
+                    return str(file_content, encoding)
                 except UnicodeDecodeError:
                     continue
             # 如果所有编码都失败，使用ignore模式
-            return file_content.decode('utf-8', errors='ignore')
+            return str(file_content, 'utf-8', errors='ignore')
         except Exception as e:
             print(f"解析TXT文件失败: {e}")
             return f"解析TXT文件失败: {str(e)}"
@@ -68,43 +203,203 @@ class FileParser:
     def _parse_pdf(file_content):
         """解析PDF文件
         
+        自适应策略下先用速度更快的PyPDF2提取全部页面，按每页的质量信号（空白页、乱码比例）
+        找出提取效果差的页面，只对这些页面用pdfplumber重新提取。
+        
         Args:
             file_content (bytes): 文件内容
             
         Returns:
-            str: 解析后的文本内容
+            tuple: (解析后的文本内容, 解析信息字典)
         """
+        has_pdfplumber = importlib.util.find_spec('pdfplumber') is not None
+        has_pypdf2 = importlib.util.find_spec('PyPDF2') is not None
+        if not has_pdfplumber and not has_pypdf2:
+            return "解析PDF文件需要安装pdfplumber或PyPDF2库", {}
+        
         try:
-            # 尝试使用pdfplumber
-            try:
-                import pdfplumber
-                with pdfplumber.open(BytesIO(file_content)) as pdf:
-                    text = ""
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + '\n'
-                    return text if text else "PDF文件中未提取到文本内容"
-            except ImportError:
-                # 如果pdfplumber不可用，尝试使用PyPDF2
+            meta = {'strategy': 'pdfplumber', 'fallback_pages': []}
+            pages = None
+            # 超过时间预算未提取的页码，以及因此没有任何文本的页码
+            unfinished, missing = [], []
+            
+            if has_pypdf2 and (PDF_PARSE_CONFIG['strategy'] == 'adaptive' or not has_pdfplumber):
                 try:
-                    from PyPDF2 import PdfReader
-                    reader = PdfReader(BytesIO(file_content))
-                    text = ""
-                    for page in reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + '\n'
-                    return text if text else "PDF文件中未提取到文本内容"
-                except ImportError:
-                    return "解析PDF文件需要安装pdfplumber或PyPDF2库"
+                    pages = FileParser._extract_pdf_fast(file_content)
+                    meta['strategy'] = 'PyPDF2'
                 except Exception as e:
-                    return f"使用PyPDF2解析PDF文件失败: {str(e)}"
+                    if not has_pdfplumber:
+                        return f"使用PyPDF2解析PDF文件失败: {str(e)}", {}
+                    print(f"使用PyPDF2解析PDF文件失败，改用pdfplumber: {e}")
+            
+            try:
+                if pages is None:
+                    # 页数较多时按页码区间分给多个进程并行提取
+                    pages, unfinished = FileParser._extract_pdf_pdfplumber(file_content)
+                    missing = unfinished
+                elif has_pdfplumber:
+                    bad_pages = [i for i, page_text in enumerate(pages) if FileParser._is_bad_page(page_text)]
+                    if bad_pages:
+                        redone, unfinished = FileParser._extract_pdf_pdfplumber(file_content, bad_pages)
+                        for page_number, page_text in zip(bad_pages, redone):
+                            if page_text and not FileParser._is_bad_page(page_text):
+                                pages[page_number] = page_text
+                                meta['fallback_pages'].append(page_number + 1)
+                        meta['strategy'] = 'PyPDF2+pdfplumber'
+                        # 未来得及重新提取的页面仍保留PyPDF2的结果，只有其中没有文本的页面算作缺失
+                        missing = [page_number for page_number in unfinished if not (pages[page_number] or '').strip()]
             except Exception as e:
-                return f"使用pdfplumber解析PDF文件失败: {str(e)}"
+                return f"使用pdfplumber解析PDF文件失败: {str(e)}", {}
+            
+            meta['pages'] = len(pages)
+            # 有页面未完成提取时结果不写入缓存；只有确实缺少页面内容时才在文本末尾注明
+            meta['partial'] = bool(unfinished)
+            meta['missing_pages'] = [page_number + 1 for page_number in missing]
+            text = ''.join(page_text + '\n' for page_text in pages if page_text)
+            if not text:
+                return "PDF文件中未提取到文本内容", meta
+            return (text + FileParser._PARTIAL_NOTE if missing else text), meta
         except Exception as e:
             print(f"解析PDF文件失败: {e}")
-            return f"解析PDF文件失败: {str(e)}"
+            return f"解析PDF文件失败: {str(e)}", {}
+    
+    @staticmethod
+    def _extract_pdf_fast(file_content):
+        """用PyPDF2提取全部页面的文本
+        
+        Args:
+            file_content (bytes): PDF文件内容
+            
+        Returns:
+            list: 各页文本，与页码顺序一致
+        """
+        from PyPDF2 import PdfReader
+        reader = PdfReader(FileParser._stream(file_content))
+        return [page.extract_text() or '' for page in reader.pages]
+    
+    @staticmethod
+    def _is_bad_page(page_text):
+        """根据质量信号判断一页的提取结果是否需要用pdfplumber重新提取
+        
+        Args:
+            page_text (str): 页面文本
+            
+        Returns:
+            bool: 页面为空白，或乱码字符占比超过阈值时返回True
+        """
+        chars = [c for c in (page_text or '') if not c.isspace()]
+        if len(chars) < PDF_PARSE_CONFIG['min_page_chars']:
+            return True
+        
+        garbled = sum(1 for c in chars if FileParser._is_garbled_char(c))
+        garbled += 5 * len(re.findall(r'\(cid:\d+\)', page_text))
+        return garbled / len(chars) > PDF_PARSE_CONFIG['max_garbled_ratio']
+    
+    @staticmethod
+    def _is_garbled_char(c):
+        """字体映射缺失时常见的字符：替换符、私有区字符、控制字符和未分配码位"""
+        return c == '\ufffd' or unicodedata.category(c) in ('Co', 'Cc', 'Cn', 'Cs')
+    
+    @staticmethod
+    def _extract_pdf_pdfplumber(file_content, page_numbers=None):
+        """用pdfplumber提取指定页面的文本，页数较多时使用进程池并行提取
+        
+        Args:
+            file_content (bytes): PDF文件内容
+            page_numbers (list, optional): 要提取的页码（从0开始），默认全部页面
+            
+        Returns:
+            tuple: (与page_numbers顺序一致的各页文本列表, 超过时间预算未提取的页码列表)
+        """
+        import pdfplumber
+        with pdfplumber.open(FileParser._stream(file_content)) as pdf:
+            if page_numbers is None:
+                page_numbers = list(range(len(pdf.pages)))
+            parallel = FileParser._pdf_workers(len(page_numbers)) > 1
+            if not parallel:
+                return [pdf.pages[i].extract_text() for i in page_numbers], []
+        
+        # 内存映射对象无法传给工作进程，这里才转换为bytes
+        return FileParser._extract_pdf_parallel(bytes(file_content), page_numbers)
+    
+    @staticmethod
+    def _pdf_workers(page_count):
+        """并行提取PDF时使用的进程数，页数低于阈值或只有一个CPU时返回1（单进程提取）
+        
+        Args:
+            page_count (int): 需要提取的页数
+            
+        Returns:
+            int: 进程数
+        """
+        if not PDF_PARSE_CONFIG['parallel'] or page_count < PDF_PARSE_CONFIG['parallel_min_pages']:
+            return 1
+        workers = PDF_PARSE_CONFIG['max_workers'] or os.cpu_count() or 1
+        return max(1, min(workers, page_count))
+    
+    @staticmethod
+    def _extract_pdf_pages(file_content, page_numbers):
+        """在工作进程中用pdfplumber提取指定页面的文本
+        
+        Args:
+            file_content (bytes): PDF文件内容
+            page_numbers (list): 页码列表（从0开始）
+            
+        Returns:
+            list: 各页文本，与page_numbers顺序一致
+        """
+        import pdfplumber
+        with pdfplumber.open(BytesIO(file_content)) as pdf:
+            return [pdf.pages[i].extract_text() for i in page_numbers]
+    
+    @staticmethod
+    def _extract_pdf_parallel(file_content, page_numbers):
+        """把页码分段交给进程池并行提取，按页码顺序重新拼接
+        
+        超过时间预算后不再等待并结束全部工作进程，未完成的页面以None占位。
+        
+        Args:
+            file_content (bytes): PDF文件内容
+            page_numbers (list): 页码列表（从0开始）
+            
+        Returns:
+            tuple: (与page_numbers顺序一致的各页文本列表, 超过时间预算未提取的页码列表)
+        """
+        workers = FileParser._pdf_workers(len(page_numbers))
+        # 分段数取进程数的两倍，各进程负载更均衡，超时时丢弃的页面也更少
+        chunk_size = -(-len(page_numbers) // (workers * 2))
+        chunks = [page_numbers[i:i + chunk_size] for i in range(0, len(page_numbers), chunk_size)]
+        
+        results = {}
+        pool = multiprocessing.Pool(processes=workers)
+        try:
+            pending = [pool.apply_async(FileParser._extract_pdf_pages, (file_content, chunk)) for chunk in chunks]
+            deadline = time.monotonic() + PDF_PARSE_CONFIG['time_budget']
+            for index, result in enumerate(pending):
+                result.wait(max(0.0, deadline - time.monotonic()))
+                if not result.ready():
+                    continue
+                try:
+                    results[index] = result.get()
+                except Exception as e:
+                    print(f"提取PDF第{chunks[index][0] + 1}页起的页面失败: {e}")
+            timed_out = not all(result.ready() for result in pending)
+        finally:
+            # 直接结束工作进程，超时后仍在运行的分段不再继续占用CPU
+            pool.terminate()
+            pool.join()
+        
+        if timed_out:
+            print(f"PDF解析超过时间预算（{PDF_PARSE_CONFIG['time_budget']}秒），仅返回已完成的页面")
+        
+        pages, unfinished = [], []
+        for index, chunk in enumerate(chunks):
+            if index in results:
+                pages.extend(results[index])
+            else:
+                pages.extend([None] * len(chunk))
+                unfinished.extend(chunk)
+        return pages, unfinished
     
     @staticmethod
     def _parse_doc(file_content, ext):
@@ -122,7 +417,7 @@ class FileParser:
                 # 解析.docx文件
                 try:
                     import docx
-                    doc = docx.Document(BytesIO(file_content))
+                    doc = docx.Document(FileParser._stream(file_content))
                     text = ""
                     for paragraph in doc.paragraphs:
                         if paragraph.text:
@@ -133,7 +428,20 @@ class FileParser:
                 except Exception as e:
                     return f"解析DOCX文件失败: {str(e)}"
             else:  # .doc格式
-                # 解析.doc文件
+                # 扩展名为.doc但实际是.docx（ZIP）格式的文件
+                if file_content[:4] == b'PK\x03\x04':
+                    return FileParser._parse_doc(file_content, '.docx')
+                
+                # 直接从内存中读取OLE复合文档的WordDocument流，不启动Word程序
+                try:
+                    text = WordDocReader.extract_text(file_content)
+                    return text if text.strip() else "DOC文件中未提取到文本内容"
+                except Exception as e:
+                    if os.name != 'nt':
+                        return f"解析DOC文件失败: {str(e)}"
+                    print(f"直接读取DOC文件失败，尝试使用Word程序解析: {e}")
+                
+                # Windows上对无法直接读取的文档（如Word 95格式）使用Word COM对象解析
                 try:
                     import pywin32  # 仅Windows系统可用
                     import pythoncom
@@ -172,15 +480,21 @@ class FileParser:
             return f"解析Word文件失败: {str(e)}"
     
     @staticmethod
-    def clean_text(text):
+    def clean_text(text, keep_layout=False):
         """清理文本内容
         
         Args:
             text (str): 原始文本
+            keep_layout (bool, optional): 是否保留换行（只合并行内空白、去掉空行），分段需要保留换行
             
         Returns:
             str: 清理后的文本
         """
+        if keep_layout:
+            text = re.sub(r'[\x00-\x08\x0b-\x0c\x0e-\x1f]', '', text.replace('\r\n', '\n').replace('\r', '\n'))
+            lines = (re.sub(r'[^\S\n]+', ' ', line).strip() for line in text.split('\n'))
+            return '\n'.join(line for line in lines if line)
+        
         # 移除多余的空白字符
         text = re.sub(r'\s+', ' ', text)
         # 移除不可见字符
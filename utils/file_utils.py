@@ -2,7 +2,11 @@
 
 import os
 import json
+import mmap
 import uuid
+import shutil
+import hashlib
+from contextlib import contextmanager
 from datetime import datetime
 
 class FileUtils:
@@ -57,6 +61,66 @@ class FileUtils:
         with open(file_path, 'rb') as f:
             return f.read()
     
+    @staticmethod
+    @contextmanager
+    def map_file(file_path):
+        """以只读内存映射方式打开文件，内容由操作系统按需读入页缓存，不在进程内另存一份
+        
+        返回的对象支持切片、len、哈希计算和read/seek，可以直接交给FileParser解析。
+        """
+        with open(file_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # 空文件无法映射
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+    
+    @staticmethod
+    def copy_file(src_path, dst_path, chunk_size=1024 * 1024):
+        """复制文件，优先使用copy_file_range/sendfile在内核中完成复制，不经过用户态缓冲区"""
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        
+        with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+            size = os.fstat(src.fileno()).st_size
+            copied = 0
+            try:
+                if hasattr(os, 'copy_file_range'):
+                    while copied < size:
+                        sent = os.copy_file_range(src.fileno(), dst.fileno(), size - copied, copied, copied)
+                        if sent == 0:
+                            break
+                        copied += sent
+                elif hasattr(os, 'sendfile'):
+                    while copied < size:
+                        sent = os.sendfile(dst.fileno(), src.fileno(), copied, size - copied)
+                        if sent == 0:
+                            break
+                        copied += sent
+            except OSError:
+                # 跨文件系统或文件系统不支持时退回普通复制
+                pass
+            
+            # 剩余部分（或不支持内核复制时的全部内容）分块复制
+            if copied < size:
+                src.seek(copied)
+                dst.seek(copied)
+                shutil.copyfileobj(src, dst, chunk_size)
+    
+    @staticmethod
+    def compute_hash(content):
+        """计算内容的SHA-256哈希"""
+        return hashlib.sha256(content).hexdigest()
+    
+    @staticmethod
+    def hash_file(file_path, chunk_size=1024 * 1024):
+        """分块计算文件的SHA-256哈希"""
+        hasher = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+    
     @staticmethod
     def get_file_extension(filename):
         """获取文件扩展名"""
@@ -0,0 +1,186 @@
+# 文件解析结果缓存
+
+import os
+import json
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from config import PARSE_CACHE_CONFIG
+
+class ParseCache:
+    """文件解析结果缓存，按 (原始文件内容的SHA-256, 解析后端及版本) 寻址
+    
+    解析出的文本连同解析信息（所用策略等）经zlib压缩后存放在磁盘上（每个条目一个文件，原子写入，CLI和GUI进程共享），
+    前面再加一层进程内LRU，重复解析同一份文件只需计算一次哈希和一次读取。
+    磁盘条目超过上限时按最近访问时间淘汰。
+    """
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, cache_dir=None, memory_entries=None, max_entries=None):
+        """初始化缓存
+        
+        Args:
+            cache_dir (str, optional): 磁盘缓存目录
+            memory_entries (int, optional): 进程内LRU保留的条目数
+            max_entries (int, optional): 磁盘上保留的最大条目数
+        """
+        self.cache_dir = cache_dir or PARSE_CACHE_CONFIG['dir']
+        self.memory_entries = memory_entries or PARSE_CACHE_CONFIG['memory_entries']
+        self.max_entries = max_entries or PARSE_CACHE_CONFIG['max_entries']
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @classmethod
+    def shared(cls):
+        """获取进程内共享的默认缓存实例
+        
+        Returns:
+            ParseCache: 默认缓存实例
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+    
+    @staticmethod
+    def make_key(content_hash, backend):
+        """计算缓存键
+        
+        Args:
+            content_hash (str): 原始文件内容的SHA-256哈希
+            backend (str): 解析后端标识（库名、库版本与解析逻辑版本）
+            
+        Returns:
+            str: SHA-256缓存键
+        """
+        return hashlib.sha256(f"{content_hash}|{backend}".encode('utf-8')).hexdigest()
+    
+    def _path(self, key):
+        """缓存条目在磁盘上的路径"""
+        return os.path.join(self.cache_dir, f"{key}.json.z")
+    
+    def get(self, key):
+        """读取缓存
+        
+        Args:
+            key (str): 缓存键
+            
+        Returns:
+            dict: 缓存条目，包含text（解析出的文本）和meta（解析信息），未命中时返回None
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry
+        
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+            # 更新访问时间，供磁盘淘汰使用
+            os.utime(path)
+        except FileNotFoundError:
+            entry = None
+        except Exception as e:
+            print(f"读取解析缓存失败 ({path}): {e}")
+            entry = None
+        
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry
+    
+    def set(self, key, text, meta=None):
+        """写入缓存
+        
+        Args:
+            key (str): 缓存键
+            text (str): 解析出的文本
+            meta (dict, optional): 解析信息，如所用策略、重新提取的页面
+        """
+        entry = {'text': text, 'meta': meta or {}}
+        with self._lock:
+            self._remember(key, entry)
+        
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(zlib.compress(json.dumps(entry, ensure_ascii=False).encode('utf-8')))
+            os.replace(temp_path, path)
+            self._evict()
+        except Exception as e:
+            print(f"写入解析缓存失败 ({path}): {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _remember(self, key, entry):
+        """放入进程内LRU（调用方需持有锁）"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def _entries(self):
+        """磁盘上的缓存条目路径"""
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith('.json.z')
+        ]
+    
+    def _evict(self):
+        """磁盘条目超过上限时删除最久未访问的条目"""
+        paths = self._entries()
+        if len(paths) <= self.max_entries:
+            return
+        
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+        
+        paths.sort(key=mtime)
+        for path in paths[:len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def stats(self):
+        """获取缓存统计信息
+        
+        Returns:
+            dict: 包含本进程命中/未命中次数、磁盘条目数和总大小
+        """
+        paths = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(paths),
+            'bytes': sum(os.path.getsize(path) for path in paths if os.path.exists(path)),
+        }
+    
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._memory.clear()
+        for path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
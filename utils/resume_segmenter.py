@@ -0,0 +1,88 @@
+# 简历分段工具
+
+import re
+
+class ResumeSegmenter:
+    """简历分段类，根据“教育背景”“工作经历”等标题把保留换行的简历文本切分为若干段
+    
+    分段结果是 [段名, 起始偏移, 结束偏移] 的列表，偏移对应FileParser.clean_text(text, keep_layout=True)的结果，
+    体积很小，随解析结果一起缓存；提取或预测时只取需要的段落放入提示。
+    第一个标题之前的内容（通常是姓名和联系方式）记为header段。
+    """
+    
+    HEADER = 'header'
+    
+    # 段名及其标题关键词
+    SECTION_HEADINGS = {
+        'basic': ['基本信息', '个人信息', '个人资料', '联系方式', 'Personal Information', 'Contact'],
+        'summary': ['个人简介', '自我评价', '个人评价', '个人总结', '求职意向', 'Summary', 'Objective', 'Profile'],
+        'education': ['教育背景', '教育经历', '学历背景', '学习经历', 'Education'],
+        'work': ['工作经历', '工作经验', '实习经历', '职业经历', 'Work Experience', 'Experience', 'Employment'],
+        'project': ['项目经验', '项目经历', '项目', 'Project Experience', 'Projects'],
+        'skill': ['专业技能', '技能特长', '技能', 'Skills'],
+        'certificate': ['专业证书', '资格证书', '证书', '获奖情况', '荣誉奖项', 'Certifications', 'Certificates', 'Awards'],
+        'publication': ['学术著作', '学术成果', '发表论文', '科研成果', '论文', 'Publications', 'Research'],
+    }
+    
+    # 标题行：可带“一、”“1.”等序号和【】、[]等括号，可以以冒号结尾，整行只有标题
+    _KEYWORDS = sorted(
+        ((keyword, name) for name, keywords in SECTION_HEADINGS.items() for keyword in keywords),
+        key=lambda x: len(x[0]),
+        reverse=True
+    )
+    HEADING_PATTERN = re.compile(
+        r'^\s*(?:[一二三四五六七八九十\d]{1,2}\s*[、.．)）]\s*)?[【\[■●◆▌|]?\s*('
+        + '|'.join(re.escape(keyword) for keyword, _ in _KEYWORDS)
+        + r')\s*[】\]]?\s*[:：]?\s*$',
+        re.IGNORECASE
+    )
+    _SECTION_BY_KEYWORD = {keyword.lower(): name for keyword, name in _KEYWORDS}
+    
+    @staticmethod
+    def index(text):
+        """切分简历文本
+        
+        Args:
+            text (str): 保留换行的简历文本
+            
+        Returns:
+            list: [段名, 起始偏移, 结束偏移] 列表，按在文本中的顺序排列，没有识别到标题时返回空列表
+        """
+        headings = []
+        offset = 0
+        for line in text.split('\n'):
+            match = ResumeSegmenter.HEADING_PATTERN.match(line)
+            if match:
+                headings.append((ResumeSegmenter._SECTION_BY_KEYWORD[match.group(1).lower()], offset))
+            offset += len(line) + 1
+        
+        if not headings:
+            return []
+        
+        sections = []
+        if text[:headings[0][1]].strip():
+            sections.append([ResumeSegmenter.HEADER, 0, headings[0][1]])
+        for i, (name, start) in enumerate(headings):
+            end = headings[i + 1][1] if i + 1 < len(headings) else len(text)
+            sections.append([name, start, end])
+        return sections
+    
+    @staticmethod
+    def names(sections):
+        """分段结果中出现的段名"""
+        return {name for name, _, _ in sections}
+    
+    @staticmethod
+    def select(text, sections, names):
+        """取出指定的段落，按在原文中的顺序拼接
+        
+        Args:
+            text (str): 切分时使用的简历文本
+            sections (list): index的返回值
+            names (iterable): 需要的段名
+            
+        Returns:
+            str: 拼接后的段落文本，没有匹配的段落时返回空字符串
+        """
+        names = set(names)
+        return '\n'.join(text[start:end].strip() for name, start, end in sections if name in names).strip()
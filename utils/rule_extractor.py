@@ -0,0 +1,92 @@
+# 简历规则提取工具
+
+import re
+
+class RuleExtractor:
+    """基于正则表达式的简历信息提取类，在本地提取邮箱、电话、网址、日期、学历等格式固定的信息
+    
+    这些信息不需要理解上下文，用规则提取比调用大模型更快也更准确。
+    """
+    
+    EMAIL_PATTERN = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+    # 手机号：可带+86前缀，各段之间可以有空格或连字符
+    MOBILE_PATTERN = re.compile(r'(?<![\d+])(?:\+?86[-\s]?)?(1[3-9]\d)[-\s]?(\d{4})[-\s]?(\d{4})(?!\d)')
+    # 固定电话：区号-号码
+    LANDLINE_PATTERN = re.compile(r'(?<!\d)(0\d{2,3})[-\s](\d{7,8})(?!\d)')
+    URL_PATTERN = re.compile(r'(?:https?://|www\.)[^\s，。；、）)>"\']+|(?:github\.com|gitee\.com|linkedin\.com)/[^\s，。；、）)>"\']+', re.IGNORECASE)
+    # 年月：2020.09、2020-9、2020/09、2020年9月
+    DATE_PATTERN = re.compile(r'(?<!\d)((?:19|20)\d{2})\s*[./\-年]\s*(0?[1-9]|1[0-2])(?!\d)')
+    # 标注了“姓名”的姓名；中文姓名后面紧跟其他汉字时无法确定边界，交给大模型
+    NAME_PATTERN = re.compile(r'姓\s*名\s*[:：]\s*([一-龥]{2,3}(?:·[一-龥]{1,10})?(?![一-龥·])|[A-Za-z][A-Za-z .]{1,40}[A-Za-z])')
+    # 按从高到低排列的学历关键词
+    DEGREE_KEYWORDS = ['博士', '硕士', '研究生', '本科', '学士', '大专', '专科', 'PhD', 'MBA', 'Master', 'Bachelor']
+    # 英文关键词按整词匹配，避免把“Masterpiece”之类识别为学历
+    DEGREE_PATTERNS = [
+        (keyword, re.compile(rf'\b{keyword}\b' if keyword.isascii() else keyword, re.IGNORECASE))
+        for keyword in DEGREE_KEYWORDS
+    ]
+    
+    # 可以完全由规则确定的字段及其来源
+    FIELD_SOURCES = {
+        '姓名': 'name',
+        '联系方式': 'phones',
+        '邮箱': 'emails',
+    }
+    
+    @staticmethod
+    def _unique(values):
+        """去重并保持出现顺序"""
+        return list(dict.fromkeys(values))
+    
+    @staticmethod
+    def extract(text):
+        """从简历文本中提取格式固定的信息
+        
+        Args:
+            text (str): 简历文本
+            
+        Returns:
+            dict: 包含name、phones、emails、urls、dates、degrees的字典
+        """
+        emails = RuleExtractor._unique(RuleExtractor.EMAIL_PATTERN.findall(text))
+        
+        # 邮箱中的数字不应被识别为电话
+        text_without_emails = RuleExtractor.EMAIL_PATTERN.sub(' ', text)
+        phones = [''.join(m) for m in RuleExtractor.MOBILE_PATTERN.findall(text_without_emails)]
+        phones += ['-'.join(m) for m in RuleExtractor.LANDLINE_PATTERN.findall(text_without_emails)]
+        
+        urls = [url.rstrip('.,') for url in RuleExtractor.URL_PATTERN.findall(text)]
+        dates = [f"{year}-{int(month):02d}" for year, month in RuleExtractor.DATE_PATTERN.findall(text)]
+        degrees = [keyword for keyword, pattern in RuleExtractor.DEGREE_PATTERNS if pattern.search(text)]
+        
+        name = RuleExtractor.NAME_PATTERN.search(text)
+        
+        return {
+            'name': name.group(1).strip() if name else None,
+            'phones': RuleExtractor._unique(phones),
+            'emails': emails,
+            'urls': RuleExtractor._unique(urls),
+            'dates': RuleExtractor._unique(dates),
+            'degrees': degrees,
+        }
+    
+    @staticmethod
+    def fill_fields(rule_info, fields):
+        """用规则提取的结果填充能够确定的简历字段
+        
+        Args:
+            rule_info (dict): extract的返回值
+            fields (list): 需要的字段
+            
+        Returns:
+            dict: 规则能够确定的字段及其值，未找到的字段不包含在内（交给大模型提取）
+        """
+        filled = {}
+        for field in fields:
+            source = RuleExtractor.FIELD_SOURCES.get(field)
+            value = rule_info.get(source) if source else None
+            if isinstance(value, list):
+                value = '、'.join(value)
+            if value:
+                filled[field] = value
+        return filled